@@ -10,6 +10,7 @@ from werkzeug.exceptions import NotFound
 
 from configs import dify_config
 from constants.languages import languages
+from core.rag.datasource.keyword.jieba.jieba_inverted_index import JiebaInvertedIndex
 from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.models.document import Document
@@ -20,7 +21,7 @@ from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models import Tenant
-from models.dataset import Dataset, DatasetCollectionBinding, DocumentSegment
+from models.dataset import Dataset, DatasetCollectionBinding, DatasetKeywordTable, DocumentSegment
 from models.dataset import Document as DatasetDocument
 from models.model import Account, App, AppAnnotationSetting, AppMode, Conversation, MessageAnnotation
 from models.provider import Provider, ProviderModel
@@ -649,3 +650,62 @@ where sites.id is null limit 1000"""
                 break
 
     click.echo(click.style("Fix for missing app-related sites completed successfully!", fg="green"))
+
+
+@click.command("keyword-index-migrate", help="Migrate jieba keyword tables to the inverted keyword index.")
+def keyword_index_migrate():
+    """
+    Copy the keyword table of every dataset into posting rows of the jieba_inverted_index keyword store.
+    Keyword tables are kept, so KEYWORD_STORE can be switched back to jieba.
+    """
+    click.echo(click.style("Starting keyword index migration.", fg="green"))
+    create_count = 0
+    skipped_count = 0
+    total_count = 0
+    page = 1
+    while True:
+        try:
+            dataset_keyword_tables = DatasetKeywordTable.query.order_by(DatasetKeywordTable.id).paginate(
+                page=page, per_page=50
+            )
+        except NotFound:
+            break
+
+        page += 1
+        for dataset_keyword_table in dataset_keyword_tables:
+            total_count += 1
+            dataset_id = dataset_keyword_table.dataset_id
+            try:
+                dataset = db.session.query(Dataset).filter(Dataset.id == dataset_id).first()
+                keyword_table_dict = dataset_keyword_table.keyword_table_dict
+                if not dataset or not keyword_table_dict:
+                    skipped_count += 1
+                    click.echo("Dataset or keyword table not found: {}".format(dataset_id))
+                    continue
+
+                postings: dict[str, list[str]] = {}
+                for keyword, node_ids in keyword_table_dict["__data__"]["table"].items():
+                    for node_id in node_ids:
+                        postings.setdefault(node_id, []).append(keyword)
+
+                keyword_index = JiebaInvertedIndex(dataset)
+                keyword_index.delete()
+                keyword_index.update_segment_keywords_index_batch(postings)
+                click.echo(f"Migrated {len(postings)} segments of dataset {dataset_id}.")
+                create_count += 1
+            except Exception as e:
+                db.session.rollback()
+                click.echo(
+                    click.style(
+                        "Error migrating keyword index: {} {} {}".format(dataset_id, e.__class__.__name__, str(e)),
+                        fg="red",
+                    )
+                )
+                continue
+
+    click.echo(
+        click.style(
+            f"Migration complete. Migrated {create_count} keyword tables. Skipped {skipped_count} datasets.",
+            fg="green",
+        )
+    )
@@ -5,6 +5,7 @@ from pydantic import (
     Field,
     HttpUrl,
     NegativeInt,
+    NonNegativeFloat,
     NonNegativeInt,
     PositiveFloat,
     PositiveInt,
@@ -47,6 +48,17 @@ class SecurityConfig(BaseSettings):
         default=None,
     )
 
+    TENANT_KEY_CACHE_TTL: NonNegativeInt = Field(
+        description="Time in seconds the parsed private key of a workspace and the credential session keys"
+        " it decrypted are cached per process, 0 to disable",
+        default=120,
+    )
+
+    TENANT_KEY_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of workspace private keys cached per process",
+        default=1000,
+    )
+
 
 class AppExecutionConfig(BaseSettings):
     """
@@ -62,6 +74,17 @@ class AppExecutionConfig(BaseSettings):
         default=0,
     )
 
+    APP_MAX_REQUESTS_PER_SECOND: NonNegativeFloat = Field(
+        description="Maximum number of requests per second per app, enforced by a token bucket (0 for unlimited)",
+        default=0,
+    )
+
+    APP_REQUESTS_BURST: NonNegativeInt = Field(
+        description="Maximum number of requests per app admitted at once by the token bucket"
+        " (0 for one second worth of APP_MAX_REQUESTS_PER_SECOND)",
+        default=0,
+    )
+
 
 class CodeExecutionSandboxConfig(BaseSettings):
     """
@@ -133,6 +156,27 @@ class CodeExecutionSandboxConfig(BaseSettings):
         default=1000,
     )
 
+    JINJA2_LOCAL_RENDER_ENABLED: bool = Field(
+        description="Render Jinja2 templates in process with a sandboxed environment"
+        " instead of sending them to the code execution service",
+        default=False,
+    )
+
+    JINJA2_LOCAL_RENDER_CPU_TIME_LIMIT: PositiveFloat = Field(
+        description="Maximum CPU time in seconds of a Jinja2 template rendered in process",
+        default=5.0,
+    )
+
+    JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH: PositiveInt = Field(
+        description="Maximum output length in characters of a Jinja2 template rendered in process",
+        default=400000,
+    )
+
+    JINJA2_TEMPLATE_CACHE_SIZE: PositiveInt = Field(
+        description="Number of compiled Jinja2 templates cached per process for in process rendering",
+        default=256,
+    )
+
 
 class EndpointConfig(BaseSettings):
     """
@@ -314,6 +358,26 @@ class HttpConfig(BaseSettings):
         default=5,
     )
 
+    SSRF_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections of the pooled HTTP client for network requests (SSRF)",
+        default=100,
+    )
+
+    SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS: NonNegativeInt = Field(
+        description="Maximum number of idle keep-alive connections of the pooled HTTP client (SSRF)",
+        default=20,
+    )
+
+    SSRF_POOL_KEEPALIVE_EXPIRY: PositiveFloat = Field(
+        description="Time in seconds an idle keep-alive connection is kept open (SSRF)",
+        default=5.0,
+    )
+
+    SSRF_HTTP2_ENABLED: bool = Field(
+        description="Enable HTTP/2 for network requests (SSRF), requires the h2 package",
+        default=False,
+    )
+
     RESPECT_XFORWARD_HEADERS_ENABLED: bool = Field(
         description="Enable or disable the X-Forwarded-For Proxy Fix middleware from Werkzeug"
         " to respect X-* headers to redirect clients",
@@ -436,6 +500,11 @@ class WorkflowConfig(BaseSettings):
         default=3,
     )
 
+    WORKFLOW_GRAPH_CACHE_SIZE: NonNegativeInt = Field(
+        description="Maximum number of compiled workflow graphs kept in memory per process, 0 to disable",
+        default=128,
+    )
+
     MAX_VARIABLE_SIZE: PositiveInt = Field(
         description="Maximum size in bytes for a single variable in workflows. Default to 200 KB.",
         default=200 * 1024,
@@ -452,6 +521,16 @@ class WorkflowNodeExecutionConfig(BaseSettings):
         default=100,
     )
 
+    WORKFLOW_EXECUTOR_MAX_WORKERS: PositiveInt = Field(
+        description="Maximum number of threads per process running parallel branches and iterations of all workflows",
+        default=100,
+    )
+
+    WORKFLOW_EXECUTOR_MAX_WORKERS_PER_TENANT: PositiveInt = Field(
+        description="Maximum number of threads per process running parallel branches and iterations of one tenant",
+        default=20,
+    )
+
 
 class AuthConfig(BaseSettings):
     """
@@ -510,6 +589,29 @@ class ModerationConfig(BaseSettings):
     )
 
 
+class TokenizerConfig(BaseSettings):
+    """
+    Configuration for the gpt2 tokenizer counting tokens for the models without a tokenizer
+    """
+
+    TOKENIZER_CACHE_SIZE: NonNegativeInt = Field(
+        description="Maximum number of token counts of texts cached per process",
+        default=10000,
+    )
+
+    TOKENIZER_PROCESS_POOL_MAX_WORKERS: NonNegativeInt = Field(
+        description="Number of processes tokenizing large batches of texts, 0 to tokenize in the calling thread."
+        " The processes are spawned, not forked, so the pool can be used from gevent and threaded workers."
+        " They load only the gpt2 encoder, the first batch of a process waits for them to start",
+        default=0,
+    )
+
+    TOKENIZER_PROCESS_POOL_MIN_CHARS: PositiveInt = Field(
+        description="Minimum number of characters of a batch of texts to tokenize it in the process pool",
+        default=100000,
+    )
+
+
 class ToolConfig(BaseSettings):
     """
     Configuration for tool management
@@ -520,6 +622,16 @@ class ToolConfig(BaseSettings):
         default=3600,
     )
 
+    AGENT_TOOL_CALL_THREAD_POOL_MAX_WORKERS: PositiveInt = Field(
+        description="Maximum number of threads per process running the parallel tool calls of function calling agents",
+        default=20,
+    )
+
+    AGENT_TOOL_CALL_TIMEOUT: PositiveInt = Field(
+        description="Maximum time in seconds a function calling agent waits for its parallel tool calls",
+        default=300,
+    )
+
 
 class MailConfig(BaseSettings):
     """
@@ -650,6 +762,28 @@ class DataSetConfig(BaseSettings):
         default=30,
     )
 
+    DATASET_AVAILABLE_COUNT_CACHE_TTL: NonNegativeInt = Field(
+        description="Time in seconds to cache the available document and segment counts of a dataset,"
+        " checked before every retrieval. Set to 0 to count them on every retrieval",
+        default=3600,
+    )
+
+    RETRIEVAL_LOG_WRITE_BEHIND_ENABLED: bool = Field(
+        description="Buffer the segment hit counts and dataset queries of retrievals in Redis and write them"
+        " to the database in bulk with a periodic job, requires Celery beat",
+        default=False,
+    )
+
+    RETRIEVAL_LOG_FLUSH_INTERVAL: PositiveInt = Field(
+        description="Interval in seconds to write the buffered segment hit counts and dataset queries",
+        default=60,
+    )
+
+    RETRIEVAL_THREAD_POOL_MAX_WORKERS: PositiveInt = Field(
+        description="Maximum number of threads per process searching the datasets of multiple dataset retrievals",
+        default=50,
+    )
+
 
 class WorkspaceConfig(BaseSettings):
     """
@@ -677,6 +811,21 @@ class IndexingConfig(BaseSettings):
         default=50,
     )
 
+    EMBEDDING_CACHE_MEMORY_SIZE: NonNegativeInt = Field(
+        description="Maximum number of document embeddings kept in the in-process LRU cache, 0 to disable",
+        default=1000,
+    )
+
+    EMBEDDING_CACHE_BATCH_SIZE: PositiveInt = Field(
+        description="Number of text hashes looked up or written per query against the embeddings cache table",
+        default=500,
+    )
+
+    EMBEDDING_CACHE_STORAGE_DTYPE: Literal["float32", "float16"] = Field(
+        description="Precision of embeddings stored in the embeddings cache table and Redis ('float32' or 'float16')",
+        default="float32",
+    )
+
 
 class MultiModalTransferConfig(BaseSettings):
     MULTIMODAL_SEND_FORMAT: Literal["base64", "url"] = Field(
@@ -782,6 +931,14 @@ class AccountConfig(BaseSettings):
     )
 
 
+class OpsTraceConfig(BaseSettings):
+    OPS_TRACE_INSTANCE_CACHE_TTL: NonNegativeInt = Field(
+        description="Time in seconds the trace instance of an app, or its absence, is cached per process,"
+        " 0 to disable",
+        default=300,
+    )
+
+
 class FeatureConfig(
     # place the configs in alphabet order
     AppExecutionConfig,
@@ -800,9 +957,11 @@ class FeatureConfig(
     ModelLoadBalanceConfig,
     ModerationConfig,
     MultiModalTransferConfig,
+    OpsTraceConfig,
     PositionConfig,
     RagEtlConfig,
     SecurityConfig,
+    TokenizerConfig,
     ToolConfig,
     UpdateConfig,
     WorkflowConfig,
@@ -1,7 +1,7 @@
 from typing import Any, Literal, Optional
 from urllib.parse import quote_plus
 
-from pydantic import Field, NonNegativeInt, PositiveFloat, PositiveInt, computed_field
+from pydantic import Field, NonNegativeFloat, NonNegativeInt, PositiveFloat, PositiveInt, computed_field
 from pydantic_settings import BaseSettings
 
 from .cache.redis_config import RedisConfig
@@ -79,11 +79,27 @@ class VectorStoreConfig(BaseSettings):
         default=False,
     )
 
+    VECTOR_CLIENT_REGISTRY_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of vector store clients and connection pools shared per process.",
+        default=32,
+    )
+
+    VECTOR_CLIENT_IDLE_TIMEOUT: PositiveFloat = Field(
+        description="Seconds after which an unused shared vector store client is closed.",
+        default=600,
+    )
+
+    VECTOR_CLIENT_HEALTH_CHECK_INTERVAL: NonNegativeFloat = Field(
+        description="Minimum seconds between health checks of a shared vector store client when it is reused.",
+        default=60,
+    )
+
 
 class KeywordStoreConfig(BaseSettings):
     KEYWORD_STORE: str = Field(
         description="Method for keyword extraction and storage."
-        " Default is 'jieba', a Chinese text segmentation library.",
+        " Default is 'jieba', a Chinese text segmentation library."
+        " 'jieba_inverted_index' stores one row per keyword and segment instead of a single keyword table.",
         default="jieba",
     )
 
@@ -36,6 +36,7 @@ from core.errors.error import (
     ProviderTokenNotInitError,
     QuotaExceededError,
 )
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.indexing_runner import IndexingRunner
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
@@ -817,6 +818,7 @@ class DocumentStatusApi(DocumentResource):
                 document.disabled_by = None
                 document.updated_at = datetime.now(UTC).replace(tzinfo=None)
                 db.session.commit()
+                DatasetAvailableCountCache(dataset.id).delete()
 
                 # Set cache to prevent indexing the same document multiple times
                 redis_client.setex(indexing_cache_key, 600, 1)
@@ -834,6 +836,7 @@ class DocumentStatusApi(DocumentResource):
                 document.disabled_by = current_user.id
                 document.updated_at = datetime.now(UTC).replace(tzinfo=None)
                 db.session.commit()
+                DatasetAvailableCountCache(dataset.id).delete()
 
                 # Set cache to prevent indexing the same document multiple times
                 redis_client.setex(indexing_cache_key, 600, 1)
@@ -849,6 +852,7 @@ class DocumentStatusApi(DocumentResource):
                 document.archived_by = current_user.id
                 document.updated_at = datetime.now(UTC).replace(tzinfo=None)
                 db.session.commit()
+                DatasetAvailableCountCache(dataset.id).delete()
 
                 if document.enabled:
                     # Set cache to prevent indexing the same document multiple times
@@ -864,6 +868,7 @@ class DocumentStatusApi(DocumentResource):
                 document.archived_by = None
                 document.updated_at = datetime.now(UTC).replace(tzinfo=None)
                 db.session.commit()
+                DatasetAvailableCountCache(dataset.id).delete()
 
                 # Set cache to prevent indexing the same document multiple times
                 redis_client.setex(indexing_cache_key, 600, 1)
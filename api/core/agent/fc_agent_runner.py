@@ -1,9 +1,17 @@
+import concurrent.futures
+import contextvars
 import json
 import logging
+import os
+import threading
+import time
 from collections.abc import Generator
 from copy import deepcopy
 from typing import Any, Optional, Union
 
+from flask import Flask, current_app
+
+from configs import dify_config
 from core.agent.base_agent_runner import BaseAgentRunner
 from core.app.apps.base_app_queue_manager import PublishFrom
 from core.app.entities.queue_entities import QueueAgentThoughtEvent, QueueMessageEndEvent, QueueMessageFileEvent
@@ -23,13 +31,34 @@ from core.model_runtime.entities import (
     UserPromptMessage,
 )
 from core.model_runtime.entities.message_entities import ImagePromptMessageContent
+from core.ops.ops_trace_manager import TraceQueueManager
 from core.prompt.agent_history_prompt_transform import AgentHistoryPromptTransform
 from core.tools.entities.tool_entities import ToolInvokeMeta
+from core.tools.tool.tool import Tool
 from core.tools.tool_engine import ToolEngine
 from models.model import Message
 
 logger = logging.getLogger(__name__)
 
+_tool_call_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_tool_call_executor_pid: Optional[int] = None
+_tool_call_executor_lock = threading.Lock()
+
+
+def get_tool_call_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """
+    Process wide executor running the parallel tool calls of function calling agents
+    """
+    global _tool_call_executor, _tool_call_executor_pid
+    with _tool_call_executor_lock:
+        # threads do not survive a fork, forked workers create their own executor
+        if _tool_call_executor is None or _tool_call_executor_pid != os.getpid():
+            _tool_call_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=dify_config.AGENT_TOOL_CALL_THREAD_POOL_MAX_WORKERS, thread_name_prefix="AgentToolCall"
+            )
+            _tool_call_executor_pid = os.getpid()
+        return _tool_call_executor
+
 
 class FunctionCallAgentRunner(BaseAgentRunner):
     def run(self, message: Message, query: str, **kwargs: Any) -> Generator[LLMResultChunk, None, None]:
@@ -223,48 +252,21 @@ class FunctionCallAgentRunner(BaseAgentRunner):
 
             # call tools
             tool_responses = []
-            for tool_call_id, tool_call_name, tool_call_args in tool_calls:
-                tool_instance = tool_instances.get(tool_call_name)
-                if not tool_instance:
-                    tool_response = {
-                        "tool_call_id": tool_call_id,
-                        "tool_call_name": tool_call_name,
-                        "tool_response": f"there is not a tool named {tool_call_name}",
-                        "meta": ToolInvokeMeta.error_instance(f"there is not a tool named {tool_call_name}").to_dict(),
-                    }
-                else:
-                    # invoke tool
-                    tool_invoke_response, message_files, tool_invoke_meta = ToolEngine.agent_invoke(
-                        tool=tool_instance,
-                        tool_parameters=tool_call_args,
-                        user_id=self.user_id,
-                        tenant_id=self.tenant_id,
-                        message=self.message,
-                        invoke_from=self.application_generate_entity.invoke_from,
-                        agent_tool_callback=self.agent_callback,
-                        trace_manager=trace_manager,
+            for (tool_call_id, tool_call_name, _), (tool_response, message_files) in zip(
+                tool_calls, self._invoke_tool_calls(tool_calls, tool_instances, trace_manager)
+            ):
+                # publish files
+                for message_file_id, save_as in message_files:
+                    if save_as:
+                        if self.variables_pool:
+                            self.variables_pool.set_file(tool_name=tool_call_name, value=message_file_id, name=save_as)
+
+                    # publish message file
+                    self.queue_manager.publish(
+                        QueueMessageFileEvent(message_file_id=message_file_id), PublishFrom.APPLICATION_MANAGER
                     )
-                    # publish files
-                    for message_file_id, save_as in message_files:
-                        if save_as:
-                            if self.variables_pool:
-                                self.variables_pool.set_file(
-                                    tool_name=tool_call_name, value=message_file_id, name=save_as
-                                )
-
-                        # publish message file
-                        self.queue_manager.publish(
-                            QueueMessageFileEvent(message_file_id=message_file_id), PublishFrom.APPLICATION_MANAGER
-                        )
-                        # add message file ids
-                        message_file_ids.append(message_file_id)
-
-                    tool_response = {
-                        "tool_call_id": tool_call_id,
-                        "tool_call_name": tool_call_name,
-                        "tool_response": tool_invoke_response,
-                        "meta": tool_invoke_meta.to_dict(),
-                    }
+                    # add message file ids
+                    message_file_ids.append(message_file_id)
 
                 tool_responses.append(tool_response)
                 if tool_response["tool_response"] is not None:
@@ -319,6 +321,113 @@ class FunctionCallAgentRunner(BaseAgentRunner):
             PublishFrom.APPLICATION_MANAGER,
         )
 
+    def _invoke_tool_calls(
+        self,
+        tool_calls: list[tuple[str, str, dict[str, Any]]],
+        tool_instances: dict[str, Tool],
+        trace_manager: Optional[TraceQueueManager],
+    ) -> list[tuple[dict[str, Any], list[tuple[Any, str]]]]:
+        """
+        Invoke the tool calls of an iteration, in parallel when the model called several tools.
+        The agent thought is saved once with all the tool responses, the tools only run in the threads.
+
+        :param tool_calls: tool calls of the iteration
+        :param tool_instances: tools of the agent by name
+        :param trace_manager: trace manager
+        :return: tool response and message files of each tool call, in the order of the tool calls
+        """
+        if len(tool_calls) <= 1:
+            return [self._invoke_tool_call(*tool_call, tool_instances, trace_manager) for tool_call in tool_calls]
+
+        flask_app = current_app._get_current_object()  # type: ignore
+        executor = get_tool_call_executor()
+        futures = [
+            executor.submit(
+                self._invoke_tool_call_in_app_context,
+                flask_app,
+                contextvars.copy_context(),
+                tool_call,
+                tool_instances,
+                trace_manager,
+            )
+            for tool_call in tool_calls
+        ]
+
+        timeout = dify_config.AGENT_TOOL_CALL_TIMEOUT
+        deadline = time.monotonic() + timeout
+        results = []
+        for (tool_call_id, tool_call_name, _), future in zip(tool_calls, futures):
+            try:
+                results.append(future.result(timeout=max(deadline - time.monotonic(), 0)))
+            except concurrent.futures.TimeoutError:
+                # the tool keeps running in its thread, the agent goes on without its response
+                logger.warning(f"Tool call {tool_call_name} timed out after {timeout}s")
+                results.append(
+                    (
+                        self._error_tool_response(
+                            tool_call_id, tool_call_name, f"tool invoke timeout: no response in {timeout}s"
+                        ),
+                        [],
+                    )
+                )
+        return results
+
+    def _invoke_tool_call_in_app_context(
+        self,
+        flask_app: Flask,
+        context: contextvars.Context,
+        tool_call: tuple[str, str, dict[str, Any]],
+        tool_instances: dict[str, Tool],
+        trace_manager: Optional[TraceQueueManager],
+    ) -> tuple[dict[str, Any], list[tuple[Any, str]]]:
+        for var, val in context.items():
+            var.set(val)
+
+        with flask_app.app_context():
+            return self._invoke_tool_call(*tool_call, tool_instances, trace_manager)
+
+    def _invoke_tool_call(
+        self,
+        tool_call_id: str,
+        tool_call_name: str,
+        tool_call_args: dict[str, Any],
+        tool_instances: dict[str, Tool],
+        trace_manager: Optional[TraceQueueManager],
+    ) -> tuple[dict[str, Any], list[tuple[Any, str]]]:
+        tool_instance = tool_instances.get(tool_call_name)
+        if not tool_instance:
+            return self._error_tool_response(
+                tool_call_id, tool_call_name, f"there is not a tool named {tool_call_name}"
+            ), []
+
+        # invoke tool
+        tool_invoke_response, message_files, tool_invoke_meta = ToolEngine.agent_invoke(
+            tool=tool_instance,
+            tool_parameters=tool_call_args,
+            user_id=self.user_id,
+            tenant_id=self.tenant_id,
+            message=self.message,
+            invoke_from=self.application_generate_entity.invoke_from,
+            agent_tool_callback=self.agent_callback,
+            trace_manager=trace_manager,
+        )
+        tool_response = {
+            "tool_call_id": tool_call_id,
+            "tool_call_name": tool_call_name,
+            "tool_response": tool_invoke_response,
+            "meta": tool_invoke_meta.to_dict(),
+        }
+        return tool_response, message_files
+
+    @staticmethod
+    def _error_tool_response(tool_call_id: str, tool_call_name: str, error: str) -> dict[str, Any]:
+        return {
+            "tool_call_id": tool_call_id,
+            "tool_call_name": tool_call_name,
+            "tool_response": error,
+            "meta": ToolInvokeMeta.error_instance(error).to_dict(),
+        }
+
     def check_tool_calls(self, llm_result_chunk: LLMResultChunk) -> bool:
         """
         Check if there is any tool call in llm result chunk
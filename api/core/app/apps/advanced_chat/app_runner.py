@@ -79,6 +79,7 @@ class AdvancedChatAppRunner(WorkflowBasedAppRunner):
                 node_id=self.application_generate_entity.single_iteration_run.node_id,
                 user_inputs=self.application_generate_entity.single_iteration_run.inputs,
             )
+            graph_config = workflow.graph_dict
         else:
             inputs = self.application_generate_entity.inputs
             query = self.application_generate_entity.query
@@ -145,7 +146,9 @@ class AdvancedChatAppRunner(WorkflowBasedAppRunner):
             )
 
             # init graph
-            graph = self._init_graph(graph_config=workflow.graph_dict)
+            compiled_graph = self._get_compiled_graph(workflow)
+            graph = compiled_graph.graph
+            graph_config = compiled_graph.graph_config
 
         db.session.close()
 
@@ -156,7 +159,7 @@ class AdvancedChatAppRunner(WorkflowBasedAppRunner):
             workflow_id=workflow.id,
             workflow_type=WorkflowType.value_of(workflow.type),
             graph=graph,
-            graph_config=workflow.graph_dict,
+            graph_config=graph_config,
             user_id=self.application_generate_entity.user_id,
             user_from=(
                 UserFrom.ACCOUNT
@@ -1,12 +1,18 @@
 import queue
+import threading
 import time
 from abc import abstractmethod
+from collections.abc import Mapping
+from datetime import datetime
+from decimal import Decimal
 from enum import Enum
-from typing import Any
+from typing import Annotated, Any, ClassVar, Literal, get_args, get_origin
 
+from pydantic import BaseModel
 from sqlalchemy.orm import DeclarativeMeta
 
 from configs import dify_config
+from core.app.apps.task_stop_subscriber import TaskStopSubscriber, task_stop_subscriber
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import (
     AppQueueEvent,
@@ -18,6 +24,44 @@ from core.app.entities.queue_entities import (
 )
 from extensions.ext_redis import redis_client
 
+# seconds between stop flag reads while stop signals cannot be pushed
+STOP_FLAG_POLL_INTERVAL = 1
+
+# field types that can never hold a SQLAlchemy model instance
+_MODEL_SAFE_TYPES = (str, int, float, bool, bytes, type(None), Enum, datetime, Decimal)
+
+
+def _annotation_may_hold_models(annotation: Any, seen: set[type]) -> bool:
+    """
+    Whether a value validated against the annotation could be or contain a SQLAlchemy model instance
+    """
+    if annotation is Any or annotation is object:
+        return True
+
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return False
+    if origin is Annotated:
+        return _annotation_may_hold_models(get_args(annotation)[0], seen)
+    if origin is not None:
+        # containers and unions are safe as long as all of their type arguments are
+        return any(_annotation_may_hold_models(arg, seen) for arg in get_args(annotation) if arg is not Ellipsis)
+
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            if annotation in seen:
+                return False
+            seen.add(annotation)
+            if annotation.model_config.get("extra") == "allow":
+                return True
+            return any(
+                _annotation_may_hold_models(field.annotation, seen) for field in annotation.model_fields.values()
+            )
+        return not issubclass(annotation, _MODEL_SAFE_TYPES)
+
+    # type vars, forward references and other unresolved annotations
+    return True
+
 
 class PublishFrom(Enum):
     APPLICATION_MANAGER = 1
@@ -25,6 +69,8 @@ class PublishFrom(Enum):
 
 
 class AppQueueManager:
+    _model_unsafe_fields_cache: ClassVar[dict[type[AppQueueEvent], tuple[str, ...]]] = {}
+
     def __init__(self, task_id: str, user_id: str, invoke_from: InvokeFrom) -> None:
         if not user_id:
             raise ValueError("user is required")
@@ -42,6 +88,11 @@ class AppQueueManager:
 
         self._q = q
 
+        # registered to receive the pushed stop signals while listening, see listen
+        self._stopped_event = threading.Event()
+        self._stop_flag_checked_generation = -1
+        self._stop_flag_checked_at: float = 0
+
     def listen(self):
         """
         Listen to queue
@@ -51,27 +102,38 @@ class AppQueueManager:
         listen_timeout = dify_config.APP_MAX_EXECUTION_TIME
         start_time = time.time()
         last_ping_time: int | float = 0
-        while True:
-            try:
-                message = self._q.get(timeout=1)
-                if message is None:
-                    break
-
-                yield message
-            except queue.Empty:
-                continue
-            finally:
-                elapsed_time = time.time() - start_time
-                if elapsed_time >= listen_timeout or self._is_stopped():
-                    # publish two messages to make sure the client can receive the stop signal
-                    # and stop listening after the stop signal processed
-                    self.publish(
-                        QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE
-                    )
-
-                if elapsed_time // 10 > last_ping_time:
-                    self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
-                    last_ping_time = elapsed_time // 10
+        # registered only once iterated, so that the finally below always unregisters it
+        stopped_event = task_stop_subscriber.register(self._task_id)
+        if self._stopped_event.is_set():
+            stopped_event.set()
+        self._stopped_event = stopped_event
+        # signals published before the registration were not pushed to it, check the flag again
+        self._stop_flag_checked_generation = -1
+        self._stop_flag_checked_at = 0
+        try:
+            while True:
+                try:
+                    message = self._q.get(timeout=1)
+                    if message is None:
+                        break
+
+                    yield message
+                except queue.Empty:
+                    continue
+                finally:
+                    elapsed_time = time.time() - start_time
+                    if elapsed_time >= listen_timeout or self._is_stopped():
+                        # publish two messages to make sure the client can receive the stop signal
+                        # and stop listening after the stop signal processed
+                        self.publish(
+                            QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE
+                        )
+
+                    if elapsed_time // 10 > last_ping_time:
+                        self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
+                        last_ping_time = elapsed_time // 10
+        finally:
+            task_stop_subscriber.unregister(self._task_id)
 
     def stop_listen(self) -> None:
         """
@@ -96,7 +158,12 @@ class AppQueueManager:
         :param pub_from:
         :return:
         """
-        self._check_for_sqlalchemy_models(event.model_dump())
+        if dify_config.DEBUG:
+            # walk the whole event in debug mode to also catch models smuggled past the schema
+            self._check_for_sqlalchemy_models(event.model_dump())
+        else:
+            for field_name in self._get_model_unsafe_fields(type(event)):
+                self._check_for_sqlalchemy_models(getattr(event, field_name))
         self._publish(event, pub_from)
 
     @abstractmethod
@@ -125,15 +192,33 @@ class AppQueueManager:
 
         stopped_cache_key = cls._generate_stopped_cache_key(task_id)
         redis_client.setex(stopped_cache_key, 600, 1)
+        # push the signal to the subscribers of all worker processes
+        redis_client.publish(TaskStopSubscriber.CHANNEL, task_id)
 
     def _is_stopped(self) -> bool:
         """
         Check if task is stopped
         :return:
         """
+        if self._stopped_event.is_set():
+            return True
+
+        if task_stop_subscriber.subscribed:
+            # signals published before the current subscription could have been missed, check the flag once
+            if self._stop_flag_checked_generation == task_stop_subscriber.generation:
+                return False
+            self._stop_flag_checked_generation = task_stop_subscriber.generation
+        else:
+            # the subscriber is not connected, fall back to polling the flag at most once per interval
+            now = time.monotonic()
+            if now - self._stop_flag_checked_at < STOP_FLAG_POLL_INTERVAL:
+                return False
+            self._stop_flag_checked_at = now
+
         stopped_cache_key = AppQueueManager._generate_stopped_cache_key(self._task_id)
         result = redis_client.get(stopped_cache_key)
         if result is not None:
+            self._stopped_event.set()
             return True
 
         return False
@@ -156,14 +241,34 @@ class AppQueueManager:
         """
         return f"generate_task_stopped:{task_id}"
 
+    @classmethod
+    def _get_model_unsafe_fields(cls, event_class: type[AppQueueEvent]) -> tuple[str, ...]:
+        """
+        Get the fields of an event class whose schema allows SQLAlchemy model instances, cached per class
+        :param event_class: event class
+        :return:
+        """
+        unsafe_fields = cls._model_unsafe_fields_cache.get(event_class)
+        if unsafe_fields is None:
+            unsafe_fields = tuple(
+                field_name
+                for field_name, field in event_class.model_fields.items()
+                if _annotation_may_hold_models(field.annotation, set())
+            )
+            cls._model_unsafe_fields_cache[event_class] = unsafe_fields
+        return unsafe_fields
+
     def _check_for_sqlalchemy_models(self, data: Any):
         # from entity to dict or list
-        if isinstance(data, dict):
+        if isinstance(data, Mapping):
             for key, value in data.items():
                 self._check_for_sqlalchemy_models(value)
-        elif isinstance(data, list):
+        elif isinstance(data, list | tuple | set):
             for item in data:
                 self._check_for_sqlalchemy_models(item)
+        elif isinstance(data, BaseModel):
+            for field_name in type(data).model_fields:
+                self._check_for_sqlalchemy_models(getattr(data, field_name))
         else:
             if isinstance(data, DeclarativeMeta) or hasattr(data, "_sa_instance_state"):
                 raise TypeError(
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStopSubscriber:
+    """
+    Process-wide subscriber of task stop signals.
+
+    `AppQueueManager.set_stop_flag` publishes the stopped task id on a Redis channel; one daemon thread per
+    worker process listens on it and sets the local event of the matching task, so queue managers can check
+    the stop flag without a Redis round trip per message.
+    """
+
+    CHANNEL = "generate_task_stopped"
+    RECONNECT_INTERVAL = 1
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: dict[str, threading.Event] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._subscribed = threading.Event()
+        self._generation = 0
+
+    @property
+    def subscribed(self) -> bool:
+        """
+        Whether stop signals are currently delivered by push in this process
+        """
+        return self._pid == os.getpid() and self._subscribed.is_set()
+
+    @property
+    def generation(self) -> int:
+        """
+        Incremented on every (re)subscription, signals published before it may have been missed
+        """
+        return self._generation
+
+    def register(self, task_id: str) -> threading.Event:
+        """
+        Register a task and return the event set when it is stopped
+        :param task_id: task id
+        :return:
+        """
+        self._ensure_started()
+        with self._lock:
+            event = self._events.get(task_id)
+            if event is None:
+                event = threading.Event()
+                self._events[task_id] = event
+            return event
+
+    def unregister(self, task_id: str) -> None:
+        with self._lock:
+            self._events.pop(task_id, None)
+
+    def handle_message(self, message: dict[str, Any]) -> None:
+        if message.get("type") != "message":
+            return
+
+        data = message.get("data")
+        task_id = data.decode("utf-8") if isinstance(data, bytes) else str(data)
+        with self._lock:
+            event = self._events.get(task_id)
+        if event is not None:
+            event.set()
+
+    def _ensure_started(self) -> None:
+        # threads do not survive a fork, so the pid check restarts the subscriber in forked workers
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+
+            self._pid = os.getpid()
+            self._subscribed.clear()
+            self._thread = threading.Thread(target=self._run, name="TaskStopSubscriber", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                pubsub = redis_client.pubsub()
+                try:
+                    pubsub.subscribe(self.CHANNEL)
+                    for message in pubsub.listen():
+                        if message.get("type") == "subscribe":
+                            # only signals published after the confirmation are guaranteed to be delivered
+                            self._generation += 1
+                            self._subscribed.set()
+                            continue
+                        self.handle_message(message)
+                finally:
+                    self._subscribed.clear()
+                    pubsub.close()
+            except Exception:
+                logger.warning("Task stop subscriber lost its connection, reconnecting", exc_info=True)
+
+            time.sleep(self.RECONNECT_INTERVAL)
+
+
+task_stop_subscriber = TaskStopSubscriber()
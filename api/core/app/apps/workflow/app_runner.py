@@ -81,6 +81,7 @@ class WorkflowAppRunner(WorkflowBasedAppRunner):
                 node_id=self.application_generate_entity.single_iteration_run.node_id,
                 user_inputs=self.application_generate_entity.single_iteration_run.inputs,
             )
+            graph_config = workflow.graph_dict
         else:
             inputs = self.application_generate_entity.inputs
             files = self.application_generate_entity.files
@@ -102,7 +103,9 @@ class WorkflowAppRunner(WorkflowBasedAppRunner):
             )
 
             # init graph
-            graph = self._init_graph(graph_config=workflow.graph_dict)
+            compiled_graph = self._get_compiled_graph(workflow)
+            graph = compiled_graph.graph
+            graph_config = compiled_graph.graph_config
 
         # RUN WORKFLOW
         workflow_entry = WorkflowEntry(
@@ -111,7 +114,7 @@ class WorkflowAppRunner(WorkflowBasedAppRunner):
             workflow_id=workflow.id,
             workflow_type=WorkflowType.value_of(workflow.type),
             graph=graph,
-            graph_config=workflow.graph_dict,
+            graph_config=graph_config,
             user_id=self.application_generate_entity.user_id,
             user_from=(
                 UserFrom.ACCOUNT
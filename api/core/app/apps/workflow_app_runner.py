@@ -48,7 +48,7 @@ from core.workflow.graph_engine.entities.event import (
     ParallelBranchRunStartedEvent,
     ParallelBranchRunSucceededEvent,
 )
-from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.entities.graph import CompiledGraph, Graph, compiled_graph_cache
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.node_mapping import NODE_TYPE_CLASSES_MAPPING
 from core.workflow.workflow_entry import WorkflowEntry
@@ -81,6 +81,17 @@ class WorkflowBasedAppRunner(AppRunner):
 
         return graph
 
+    def _get_compiled_graph(self, workflow: Workflow) -> CompiledGraph:
+        """
+        Get the compiled graph of the workflow, shared by the runs of the same graph in this process
+        """
+
+        def compile_graph() -> CompiledGraph:
+            graph_config = workflow.graph_dict
+            return CompiledGraph(graph_config=graph_config, graph=self._init_graph(graph_config=graph_config))
+
+        return compiled_graph_cache.get_or_compile(workflow.graph_hash, compile_graph)
+
     def _get_graph_and_variable_pool_of_single_iteration(
         self,
         workflow: Workflow,
@@ -1,44 +1,111 @@
 import logging
+import math
 import time
 import uuid
 from collections.abc import Generator, Mapping
 from datetime import timedelta
 from typing import Any, Optional, Union
 
+from redis.commands.core import Script
+
+from configs import dify_config
 from core.errors.error import AppInvokeQuotaExceededError
 from extensions.ext_redis import redis_client
 
 logger = logging.getLogger(__name__)
 
 
+# Admits a request atomically: expires stale requests, checks the concurrency cap and the token bucket,
+# then records the request. Returns 1 if admitted, 0 over the concurrency cap, -1 over the request rate.
+_ENTER_SCRIPT = """
+local active_requests_key = KEYS[1]
+local bucket_key = KEYS[2]
+local max_active_requests = tonumber(ARGV[1])
+local request_id = ARGV[2]
+local now = tonumber(ARGV[3])
+local max_alive_time = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+local requests_per_second = tonumber(ARGV[6])
+local burst = tonumber(ARGV[7])
+
+if max_active_requests > 0 then
+    redis.call("ZREMRANGEBYSCORE", active_requests_key, "-inf", now - max_alive_time)
+    if redis.call("ZCARD", active_requests_key) >= max_active_requests then
+        return 0
+    end
+end
+
+if requests_per_second > 0 then
+    local bucket = redis.call("HMGET", bucket_key, "tokens", "timestamp")
+    local tokens = tonumber(bucket[1]) or burst
+    local timestamp = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - timestamp) * requests_per_second)
+    if tokens < 1 then
+        return -1
+    end
+    redis.call("HSET", bucket_key, "tokens", tokens - 1, "timestamp", now)
+    redis.call("EXPIRE", bucket_key, math.ceil(burst / requests_per_second) + 1)
+end
+
+if max_active_requests > 0 then
+    redis.call("ZADD", active_requests_key, now, request_id)
+    redis.call("EXPIRE", active_requests_key, ttl)
+end
+return 1
+"""
+
+
 class RateLimit:
     _MAX_ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:max_active_requests"
-    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:active_requests"
+    # hash tags keep the keys used by the enter script in the same cluster slot
+    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{{{}}}:active_request_set"
+    _REQUEST_BUCKET_KEY = "dify:rate_limit:{{{}}}:request_bucket"
     _UNLIMITED_REQUEST_ID = "unlimited_request_id"
     _REQUEST_MAX_ALIVE_TIME = 10 * 60  # 10 minutes
-    _ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL = 5 * 60  # recalculate request_count from request_detail every 5 minutes
+    _ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL = 5 * 60  # reload max_active_requests from redis every 5 minutes
+    _ACTIVE_REQUESTS_TTL = int(timedelta(days=1).total_seconds())
     _instance_dict: dict[str, "RateLimit"] = {}
+    _enter_script: Optional[Script] = None
 
-    def __new__(cls: type["RateLimit"], client_id: str, max_active_requests: int):
+    def __new__(cls: type["RateLimit"], client_id: str, max_active_requests: int, *args, **kwargs):
         if client_id not in cls._instance_dict:
             instance = super().__new__(cls)
             cls._instance_dict[client_id] = instance
         return cls._instance_dict[client_id]
 
-    def __init__(self, client_id: str, max_active_requests: int):
+    def __init__(
+        self,
+        client_id: str,
+        max_active_requests: int,
+        max_requests_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+    ):
+        """
+        :param client_id: client id, e.g. app id
+        :param max_active_requests: maximum number of concurrent requests, 0 for unlimited
+        :param max_requests_per_second: maximum sustained request rate, 0 for unlimited,
+            defaults to APP_MAX_REQUESTS_PER_SECOND
+        :param burst: maximum number of requests admitted at once by the request rate,
+            defaults to APP_REQUESTS_BURST or one second worth of requests
+        """
         self.max_active_requests = max_active_requests
+        if max_requests_per_second is None:
+            max_requests_per_second = dify_config.APP_MAX_REQUESTS_PER_SECOND
+        self.max_requests_per_second = max_requests_per_second
+        self.burst = burst or dify_config.APP_REQUESTS_BURST or max(1, math.ceil(max_requests_per_second))
         if hasattr(self, "initialized"):
             return
         self.initialized = True
         self.client_id = client_id
         self.active_requests_key = self._ACTIVE_REQUESTS_KEY.format(client_id)
+        self.request_bucket_key = self._REQUEST_BUCKET_KEY.format(client_id)
         self.max_active_requests_key = self._MAX_ACTIVE_REQUESTS_KEY.format(client_id)
         self.last_recalculate_time = float("-inf")
         self.flush_cache(use_local_value=True)
 
     def flush_cache(self, use_local_value=False):
         self.last_recalculate_time = time.time()
-        # flush max active requests
+        # flush max active requests, stale active requests are expired by every enter
         if use_local_value or not redis_client.exists(self.max_active_requests_key):
             with redis_client.pipeline() as pipe:
                 pipe.set(self.max_active_requests_key, self.max_active_requests)
@@ -49,40 +116,52 @@ class RateLimit:
                 self.max_active_requests = int(redis_client.get(self.max_active_requests_key).decode("utf-8"))
                 redis_client.expire(self.max_active_requests_key, timedelta(days=1))
 
-        # flush max active requests (in-transit request list)
-        if not redis_client.exists(self.active_requests_key):
-            return
-        request_details = redis_client.hgetall(self.active_requests_key)
-        redis_client.expire(self.active_requests_key, timedelta(days=1))
-        timeout_requests = [
-            k
-            for k, v in request_details.items()
-            if time.time() - float(v.decode("utf-8")) > RateLimit._REQUEST_MAX_ALIVE_TIME
-        ]
-        if timeout_requests:
-            redis_client.hdel(self.active_requests_key, *timeout_requests)
-
     def enter(self, request_id: Optional[str] = None) -> str:
         if time.time() - self.last_recalculate_time > RateLimit._ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL:
             self.flush_cache()
-        if self.max_active_requests <= 0:
+        if self.max_active_requests <= 0 and self.max_requests_per_second <= 0:
             return RateLimit._UNLIMITED_REQUEST_ID
         if not request_id:
             request_id = RateLimit.gen_request_key()
 
-        active_requests_count = redis_client.hlen(self.active_requests_key)
-        if active_requests_count >= self.max_active_requests:
+        admitted = self._get_enter_script()(
+            keys=[self.active_requests_key, self.request_bucket_key],
+            args=[
+                self.max_active_requests,
+                request_id,
+                time.time(),
+                RateLimit._REQUEST_MAX_ALIVE_TIME,
+                RateLimit._ACTIVE_REQUESTS_TTL,
+                self.max_requests_per_second,
+                self.burst,
+            ],
+        )
+        if admitted == 0:
             raise AppInvokeQuotaExceededError(
                 "Too many requests. Please try again later. The current maximum "
                 "concurrent requests allowed is {}.".format(self.max_active_requests)
             )
-        redis_client.hset(self.active_requests_key, request_id, str(time.time()))
+        if admitted < 0:
+            raise AppInvokeQuotaExceededError(
+                "Too many requests. Please try again later. The current maximum "
+                "requests per second allowed is {}.".format(self.max_requests_per_second)
+            )
+
+        if self.max_active_requests <= 0:
+            return RateLimit._UNLIMITED_REQUEST_ID
         return request_id
 
     def exit(self, request_id: str):
         if request_id == RateLimit._UNLIMITED_REQUEST_ID:
             return
-        redis_client.hdel(self.active_requests_key, request_id)
+        redis_client.zrem(self.active_requests_key, request_id)
+
+    @classmethod
+    def _get_enter_script(cls) -> Script:
+        # registered lazily, the redis client is initialized with the app
+        if cls._enter_script is None:
+            cls._enter_script = redis_client.register_script(_ENTER_SCRIPT)
+        return cls._enter_script
 
     @staticmethod
     def gen_request_key() -> str:
@@ -2,8 +2,9 @@ from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import QueueRetrieverResourcesEvent
 from core.rag.models.document import Document
+from core.rag.retrieval.retrieval_log_buffer import RetrievalLogBuffer
 from extensions.ext_database import db
-from models.dataset import DatasetQuery, DocumentSegment
+from models.dataset import DatasetQuery
 from models.model import DatasetRetrieverResource
 
 
@@ -34,24 +35,12 @@ class DatasetIndexToolCallbackHandler:
             created_by=self._user_id,
         )
 
-        db.session.add(dataset_query)
-        db.session.commit()
+        RetrievalLogBuffer.record_dataset_queries([dataset_query])
 
     def on_tool_end(self, documents: list[Document]) -> None:
         """Handle tool end."""
-        for document in documents:
-            if document.metadata is not None:
-                query = db.session.query(DocumentSegment).filter(
-                    DocumentSegment.index_node_id == document.metadata["doc_id"]
-                )
-
-                if "dataset_id" in document.metadata:
-                    query = query.filter(DocumentSegment.dataset_id == document.metadata["dataset_id"])
-
-                # add hit count to document segment
-                query.update({DocumentSegment.hit_count: DocumentSegment.hit_count + 1}, synchronize_session=False)
-
-                db.session.commit()
+        # add hit count to document segment
+        RetrievalLogBuffer.record_segment_hits(documents)
 
     def return_retriever_resource_info(self, resource: list):
         """Handle return_retriever_resource_info."""
@@ -10,6 +10,7 @@ from yarl import URL
 
 from configs import dify_config
 from core.helper.code_executor.javascript.javascript_transformer import NodeJsTemplateTransformer
+from core.helper.code_executor.jinja2.jinja2_sandbox import Jinja2LocalRenderer
 from core.helper.code_executor.jinja2.jinja2_transformer import Jinja2TemplateTransformer
 from core.helper.code_executor.python3.python3_transformer import Python3TemplateTransformer
 from core.helper.code_executor.template_transformer import TemplateTransformer
@@ -126,6 +127,12 @@ class CodeExecutor:
         :param inputs: inputs
         :return:
         """
+        if language == CodeLanguage.JINJA2 and dify_config.JINJA2_LOCAL_RENDER_ENABLED:
+            try:
+                return {"result": Jinja2LocalRenderer.render(code, inputs)}
+            except Exception as e:
+                raise CodeExecutionError(f"{type(e).__name__}: {e}")
+
         template_transformer = cls.code_template_transformers.get(language)
         if not template_transformer:
             raise CodeExecutionError(f"Unsupported language {language}")
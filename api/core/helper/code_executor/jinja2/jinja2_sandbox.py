@@ -0,0 +1,270 @@
+import functools
+import hashlib
+import operator
+import re
+import string
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from typing import Any, Optional
+
+from jinja2 import Template, nodes, pass_eval_context
+from jinja2.filters import FILTERS, make_attrgetter
+from jinja2.nodes import EvalContext
+from jinja2.sandbox import ImmutableSandboxedEnvironment, SecurityError
+from jinja2.visitor import NodeTransformer
+
+from configs import dify_config
+from core.helper.lru_cache import ThreadSafeLRUCache
+
+# conversion specifiers of printf style formatting, with their width and precision
+_PRINTF_SPEC_PATTERN = re.compile(r"%(?:\([^)]*\))?[#0\- +]*(\*|\d*)(?:\.(\*|\d*))?[hlL]?[a-zA-Z%]")
+
+
+class Jinja2RenderError(Exception):
+    pass
+
+
+class _RenderDeadline(threading.local):
+    deadline: Optional[float] = None
+
+
+_render_deadline = _RenderDeadline()
+
+
+def _check_deadline() -> None:
+    deadline = _render_deadline.deadline
+    if deadline is not None and time.thread_time() > deadline:
+        raise Jinja2RenderError(
+            f"Rendering exceeds the CPU time limit of {dify_config.JINJA2_LOCAL_RENDER_CPU_TIME_LIMIT}s"
+        )
+
+
+def _check_length(length: int) -> None:
+    max_length = dify_config.JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH
+    if length > max_length:
+        raise SecurityError(f"Value exceeds {max_length} characters")
+
+
+def _check_printf_format(value: str, args: Any) -> None:
+    for width, precision in _PRINTF_SPEC_PATTERN.findall(value):
+        for size in (width, precision):
+            if size.isdigit():
+                _check_length(int(size))
+            elif size == "*":
+                # the size is taken from the arguments
+                for arg in args if isinstance(args, tuple) else (args,):
+                    if isinstance(arg, int):
+                        _check_length(arg)
+
+
+def _check_format_string(value: str) -> None:
+    for _, _, format_spec, _ in string.Formatter().parse(value):
+        if not format_spec:
+            continue
+        if "{" in format_spec:
+            raise SecurityError("Nested replacement fields are not supported")
+        for size in re.findall(r"\d+", format_spec):
+            _check_length(int(size))
+
+
+def _checked_str_call(value: str, method_name: str, args: tuple, kwargs: dict) -> tuple:
+    """
+    Check the size of the result of a str method before building it
+
+    :return: the arguments to call the method with, iterables are read once to be checked
+    """
+    if method_name in {"ljust", "rjust", "center", "zfill"} and args and isinstance(args[0], int):
+        _check_length(args[0])
+    elif method_name == "expandtabs":
+        tab_size = args[0] if args else kwargs.get("tabsize", 8)
+        if isinstance(tab_size, int):
+            _check_length(len(value) + value.count("\t") * tab_size)
+    elif method_name == "replace" and len(args) >= 2 and isinstance(args[0], str) and isinstance(args[1], str):
+        count = args[2] if len(args) > 2 and args[2] >= 0 else len(value) + 1
+        _check_length(len(value) + min(count, len(value) + 1) * max(0, len(args[1]) - len(args[0])))
+    elif method_name == "join" and args:
+        items = list(args[0])
+        _check_length(len(value) * max(0, len(items) - 1) + sum(len(item) for item in items if isinstance(item, str)))
+        args = (items, *args[1:])
+    return args
+
+
+def _limited_filter(filter_func, check):
+    @functools.wraps(filter_func)
+    def wrapper(*args, **kwargs):
+        args = check(*args, **kwargs) or args
+        return filter_func(*args, **kwargs)
+
+    return wrapper
+
+
+def _check_center_filter(value: Any, width: int = 80, *args, **kwargs) -> None:
+    _check_length(width)
+
+
+def _check_indent_filter(value: Any, width: Any = 4, *args, **kwargs) -> None:
+    indention_length = width if isinstance(width, int) else len(str(width))
+    _check_length(len(str(value)) + (str(value).count("\n") + 1) * indention_length)
+
+
+def _check_format_filter(value: Any, *args, **kwargs) -> None:
+    _check_printf_format(str(value), kwargs or args)
+
+
+def _check_replace_filter(eval_ctx: Any, value: Any, old: Any, new: Any, count: Optional[int] = None) -> None:
+    _checked_str_call(str(value), "replace", (str(old), str(new), -1 if count is None else count), {})
+
+
+@pass_eval_context
+def _limited_join_filter(eval_ctx: EvalContext, value: Iterable, d: str = "", attribute: Any = None) -> str:
+    # the items are read once, measured with the separators and joined
+    if attribute is not None:
+        value = map(make_attrgetter(eval_ctx.environment, attribute), value)
+    items = [str(item) for item in value]
+    _check_length(len(str(d)) * max(0, len(items) - 1) + sum(len(item) for item in items))
+    return FILTERS["join"](eval_ctx, items, d)
+
+
+class _LimitedTemplateTransformer(NodeTransformer):
+    """
+    Makes the loops and concatenations of a template call the environment, to check the render limits
+    on every loop iteration and before building a concatenation.
+    """
+
+    def visit_For(self, node: nodes.For) -> nodes.Node:  # noqa: N802
+        self.generic_visit(node)
+        node.iter = nodes.Call(
+            nodes.EnvironmentAttribute("limited_iter"), [node.iter], [], None, None, lineno=node.iter.lineno
+        )
+        return node
+
+    def visit_Concat(self, node: nodes.Concat) -> nodes.Node:  # noqa: N802
+        self.generic_visit(node)
+        return nodes.Call(
+            nodes.EnvironmentAttribute("limited_concat"), list(node.nodes), [], None, None, lineno=node.lineno
+        )
+
+
+class _LimitedSandboxedEnvironment(ImmutableSandboxedEnvironment):
+    """
+    Sandboxed environment enforcing the render limits during execution, not only between output chunks.
+    The CPU time is checked on every call and loop iteration, operations and string methods able to build
+    values over the output size limit are refused before building them.
+    """
+
+    intercepted_binops = frozenset(["*", "**", "+", "%"])
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.filters["center"] = _limited_filter(FILTERS["center"], _check_center_filter)
+        self.filters["indent"] = _limited_filter(FILTERS["indent"], _check_indent_filter)
+        self.filters["format"] = _limited_filter(FILTERS["format"], _check_format_filter)
+        self.filters["replace"] = _limited_filter(FILTERS["replace"], _check_replace_filter)
+        self.filters["join"] = _limited_join_filter
+        # lipsum builds its text in a single call, out of the size and CPU time checks
+        self.globals.pop("lipsum", None)
+
+    def _parse(self, source: str, name: Optional[str], filename: Optional[str]) -> nodes.Template:
+        template = _LimitedTemplateTransformer().visit(super()._parse(source, name, filename))
+        template.set_environment(self)
+        return template
+
+    @staticmethod
+    def limited_iter(iterable: Iterable) -> Iterator:
+        for item in iterable:
+            _check_deadline()
+            yield item
+
+    @staticmethod
+    def limited_concat(*values: Any) -> str:
+        strings = [str(value) for value in values]
+        _check_length(sum(len(value) for value in strings))
+        return "".join(strings)
+
+    def call(__self, __context, __obj, *args, **kwargs):  # noqa: N805
+        _check_deadline()
+        if isinstance(getattr(__obj, "__self__", None), str):
+            args = _checked_str_call(__obj.__self__, __obj.__name__, args, kwargs)
+        return super().call(__context, __obj, *args, **kwargs)
+
+    def wrap_str_format(self, value: Any) -> Optional[Callable[..., str]]:
+        format_func = super().wrap_str_format(value)
+        if format_func is None:
+            return None
+
+        @functools.wraps(format_func)
+        def wrapper(*args, **kwargs) -> str:
+            _check_format_string(value.__self__)
+            return format_func(*args, **kwargs)
+
+        return wrapper
+
+    def call_binop(self, context, operator_name: str, left: Any, right: Any) -> Any:
+        if operator_name == "*":
+            for sequence, count in ((left, right), (right, left)):
+                if isinstance(sequence, str | list | tuple) and isinstance(count, int):
+                    _check_length(len(sequence) * count)
+            return operator.mul(left, right)
+
+        if operator_name == "+":
+            if isinstance(left, str | list | tuple) and isinstance(right, str | list | tuple):
+                _check_length(len(left) + len(right))
+            return operator.add(left, right)
+
+        if operator_name == "%":
+            if isinstance(left, str):
+                _check_printf_format(left, right)
+            return operator.mod(left, right)
+
+        if isinstance(left, int) and isinstance(right, int) and abs(left) > 1 and right > 0:
+            if right * (abs(left).bit_length() - 1) > dify_config.JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH * 4:
+                raise SecurityError("Power result is too large")
+        return operator.pow(left, right)
+
+
+class Jinja2LocalRenderer:
+    """
+    Renders Jinja2 templates in process with an immutable sandboxed environment, instead of sending them
+    to the code execution sandbox. Compiled templates are cached by template hash, rendering fails
+    when it takes more CPU time or builds more output than allowed.
+    """
+
+    _environment = _LimitedSandboxedEnvironment()
+    _templates = ThreadSafeLRUCache(capacity=dify_config.JINJA2_TEMPLATE_CACHE_SIZE)
+
+    @classmethod
+    def render(cls, template: str, inputs: Mapping[str, Any]) -> str:
+        """
+        Render template
+        :param template: template
+        :param inputs: inputs
+        :return: rendered text
+        """
+        max_output_length = dify_config.JINJA2_LOCAL_RENDER_MAX_OUTPUT_LENGTH
+        compiled_template = cls._get_template(template)
+
+        output = []
+        output_length = 0
+        # checked by the environment on every call and loop iteration of the template
+        _render_deadline.deadline = time.thread_time() + dify_config.JINJA2_LOCAL_RENDER_CPU_TIME_LIMIT
+        try:
+            for chunk in compiled_template.generate(**inputs):
+                output.append(chunk)
+                output_length += len(chunk)
+                if output_length > max_output_length:
+                    raise Jinja2RenderError(f"Output length exceeds {max_output_length} characters")
+                _check_deadline()
+        finally:
+            _render_deadline.deadline = None
+
+        return "".join(output)
+
+    @classmethod
+    def _get_template(cls, template: str) -> Template:
+        template_hash = hashlib.sha256(template.encode()).hexdigest()
+        compiled_template = cls._templates.get(template_hash)
+        if compiled_template is None:
+            compiled_template = cls._environment.from_string(template)
+            cls._templates.put(template_hash, compiled_template)
+        return compiled_template
@@ -0,0 +1,77 @@
+import json
+from json import JSONDecodeError
+from typing import Optional
+
+from configs import dify_config
+from extensions.ext_redis import redis_client
+
+
+class DatasetAvailableCountCache:
+    """
+    Available document and segment counts of a dataset, checked before every retrieval of the dataset.
+
+    The counts are deleted by the tasks changing the documents or segments of the dataset and counted again
+    on the next read, schedule.update_dataset_available_count_task recounts the cached datasets periodically.
+    """
+
+    DATASET_IDS_KEY = "dataset_available_count:dataset_ids"
+
+    def __init__(self, dataset_id: str):
+        self.dataset_id = dataset_id
+        self.cache_key = f"dataset_available_count:dataset_id:{dataset_id}"
+
+    def get(self) -> Optional[tuple[int, int]]:
+        """
+        Get cached available counts.
+
+        :return: available document count and available segment count
+        """
+        if not dify_config.DATASET_AVAILABLE_COUNT_CACHE_TTL:
+            return None
+
+        cached_counts = redis_client.get(self.cache_key)
+        if not cached_counts:
+            return None
+        try:
+            document_count, segment_count = json.loads(cached_counts.decode("utf-8"))
+        except (JSONDecodeError, ValueError):
+            return None
+
+        return document_count, segment_count
+
+    def set(self, document_count: int, segment_count: int) -> None:
+        """
+        Cache available counts.
+
+        :param document_count: available document count
+        :param segment_count: available segment count
+        :return:
+        """
+        if not dify_config.DATASET_AVAILABLE_COUNT_CACHE_TTL:
+            return
+
+        redis_client.setex(
+            self.cache_key, dify_config.DATASET_AVAILABLE_COUNT_CACHE_TTL, json.dumps([document_count, segment_count])
+        )
+        redis_client.sadd(self.DATASET_IDS_KEY, self.dataset_id)
+
+    def update(self, document_count: int, segment_count: int) -> bool:
+        """
+        Update cached available counts, keeping their expiry.
+
+        :param document_count: available document count
+        :param segment_count: available segment count
+        :return: False if the counts are not cached anymore
+        """
+        updated = redis_client.set(self.cache_key, json.dumps([document_count, segment_count]), xx=True, keepttl=True)
+        if not updated:
+            redis_client.srem(self.DATASET_IDS_KEY, self.dataset_id)
+        return bool(updated)
+
+    def delete(self) -> None:
+        """
+        Delete cached available counts.
+
+        :return:
+        """
+        redis_client.delete(self.cache_key)
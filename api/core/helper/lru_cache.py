@@ -1,3 +1,4 @@
+import threading
 from collections import OrderedDict
 from typing import Any
 
@@ -20,3 +21,24 @@ class LRUCache:
         self.cache[key] = value
         if len(self.cache) > self.capacity:
             self.cache.popitem(last=False)  # pop the first item
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+class ThreadSafeLRUCache(LRUCache):
+    def __init__(self, capacity: int):
+        super().__init__(capacity)
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            return super().get(key)
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            super().put(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
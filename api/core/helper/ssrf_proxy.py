@@ -2,8 +2,16 @@
 Proxy requests to avoid SSRF
 """
 
+import asyncio
 import logging
+import os
+import threading
 import time
+import weakref
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any
 
 import httpx
 
@@ -11,17 +19,10 @@ from configs import dify_config
 
 SSRF_DEFAULT_MAX_RETRIES = dify_config.SSRF_DEFAULT_MAX_RETRIES
 
-proxy_mounts = (
-    {
-        "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL),
-        "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL),
-    }
-    if dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL
-    else None
-)
-
 BACKOFF_FACTOR = 0.5
 STATUS_FORCELIST = [429, 500, 502, 503, 504]
+# hosts with request metrics kept per process
+MAX_METRIC_HOSTS = 1000
 
 
 class MaxRetriesExceededError(ValueError):
@@ -30,7 +31,163 @@ class MaxRetriesExceededError(ValueError):
     pass
 
 
-def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+def _proxy_mounts(transport_class: type[httpx.HTTPTransport] | type[httpx.AsyncHTTPTransport]) -> dict | None:
+    if not (dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL):
+        return None
+    return {
+        "http://": transport_class(proxy=dify_config.SSRF_PROXY_HTTP_URL, **_transport_kwargs()),
+        "https://": transport_class(proxy=dify_config.SSRF_PROXY_HTTPS_URL, **_transport_kwargs()),
+    }
+
+
+def _transport_kwargs() -> dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=dify_config.SSRF_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=dify_config.SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=dify_config.SSRF_POOL_KEEPALIVE_EXPIRY,
+        ),
+        "http2": dify_config.SSRF_HTTP2_ENABLED,
+    }
+
+
+def _client_kwargs(transport_class: type[httpx.HTTPTransport] | type[httpx.AsyncHTTPTransport]) -> dict[str, Any]:
+    # limits and http2 go to the client, which applies them to the proxies of the environment as well
+    kwargs: dict[str, Any] = _transport_kwargs()
+    if dify_config.SSRF_PROXY_ALL_URL:
+        kwargs["proxy"] = dify_config.SSRF_PROXY_ALL_URL
+    elif mounts := _proxy_mounts(transport_class):
+        kwargs["mounts"] = mounts
+    return kwargs
+
+
+def _block_cookies(client: httpx.Client | httpx.AsyncClient) -> None:
+    # the clients are shared by all tenants, never keep response cookies for later requests
+    client.cookies.jar.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+
+def _proxy_config_key() -> tuple:
+    return (
+        dify_config.SSRF_PROXY_ALL_URL,
+        dify_config.SSRF_PROXY_HTTP_URL,
+        dify_config.SSRF_PROXY_HTTPS_URL,
+    )
+
+
+_clients_lock = threading.Lock()
+_clients: dict[tuple, httpx.Client] = {}
+# the async clients of each event loop, with the async generator closing them when the loop shuts down
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple, tuple[httpx.AsyncClient, AsyncGenerator[None, None]]]
+] = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.Client:
+    """
+    Get the pooled client of the current proxy configuration.
+    Clients are keyed by process id as well, pooled connections must not be shared with forked workers.
+    """
+    key = (os.getpid(), *_proxy_config_key())
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = httpx.Client(**_client_kwargs(httpx.HTTPTransport))
+                _block_cookies(client)
+                _clients[key] = client
+    return client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the pooled async client of the current proxy configuration for the running event loop.
+    The client is closed when the loop shuts down its async generators, as asyncio.run does before closing it.
+    """
+    loop = asyncio.get_running_loop()
+    key = _proxy_config_key()
+    with _clients_lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        if key in loop_clients:
+            return loop_clients[key][0]
+
+        client = httpx.AsyncClient(**_client_kwargs(httpx.AsyncHTTPTransport))
+        _block_cookies(client)
+        closer = _close_on_loop_shutdown(client)
+        loop_clients[key] = (client, closer)
+
+    # started on the loop, so that the loop finalizes it with its other async generators
+    loop.create_task(_start(closer))
+    return client
+
+
+async def _start(closer: AsyncGenerator[None, None]) -> None:
+    await closer.__anext__()
+
+
+async def _close_on_loop_shutdown(client: httpx.AsyncClient):
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+class _HostMetrics:
+    def __init__(self, max_hosts: int = MAX_METRIC_HOSTS) -> None:
+        self._lock = threading.Lock()
+        self._max_hosts = max_hosts
+        # least recently requested hosts first, they are dropped beyond max_hosts
+        self._metrics: OrderedDict[str, dict[str, float]] = OrderedDict()
+
+    def record(self, url: Any, elapsed: float, failed: bool) -> None:
+        host = httpx.URL(url).host
+        with self._lock:
+            metrics = self._metrics.get(host)
+            if metrics is None:
+                metrics = self._metrics[host] = {"requests": 0, "failures": 0, "total_time": 0.0}
+                if len(self._metrics) > self._max_hosts:
+                    self._metrics.popitem(last=False)
+            else:
+                self._metrics.move_to_end(host)
+            metrics["requests"] += 1
+            metrics["failures"] += int(failed)
+            metrics["total_time"] += elapsed
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {host: dict(metrics) for host, metrics in self._metrics.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+
+host_metrics = _HostMetrics()
+
+
+def get_connection_metrics() -> dict[str, dict[str, float]]:
+    """
+    Per-host request metrics of this process and the connections currently held by the pooled client.
+    """
+    metrics = host_metrics.snapshot()
+    client = _clients.get((os.getpid(), *_proxy_config_key()))
+    if client is not None:
+        transports = [getattr(client, "_transport", None), *getattr(client, "_mounts", {}).values()]
+        for transport in transports:
+            pool = getattr(transport, "_pool", None)
+            for connection in getattr(pool, "connections", []):
+                origin = getattr(connection, "_origin", None)
+                if origin is None:
+                    continue
+                host_metric = metrics.setdefault(
+                    origin.host.decode("ascii"), {"requests": 0, "failures": 0, "total_time": 0.0}
+                )
+                host_metric["open_connections"] = host_metric.get("open_connections", 0) + 1
+                host_metric["idle_connections"] = host_metric.get("idle_connections", 0) + int(connection.is_idle())
+    return metrics
+
+
+def _prepare_kwargs(kwargs: dict[str, Any]) -> None:
     if "allow_redirects" in kwargs:
         allow_redirects = kwargs.pop("allow_redirects")
         if "follow_redirects" not in kwargs:
@@ -44,19 +201,19 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
             write=dify_config.SSRF_DEFAULT_WRITE_TIME_OUT,
         )
 
+    kwargs.pop("stream", False)
+
+
+def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    _prepare_kwargs(kwargs)
+
     retries = 0
-    stream = kwargs.pop("stream", False)
+    client = get_client()
     while retries <= max_retries:
+        start_time = time.perf_counter()
         try:
-            if dify_config.SSRF_PROXY_ALL_URL:
-                with httpx.Client(proxy=dify_config.SSRF_PROXY_ALL_URL) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            elif proxy_mounts:
-                with httpx.Client(mounts=proxy_mounts) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            else:
-                with httpx.Client() as client:
-                    response = client.request(method=method, url=url, **kwargs)
+            response = client.request(method=method, url=url, **kwargs)
+            host_metrics.record(url, time.perf_counter() - start_time, response.status_code in STATUS_FORCELIST)
 
             if response.status_code not in STATUS_FORCELIST:
                 return response
@@ -64,6 +221,7 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
                 logging.warning(f"Received status code {response.status_code} for URL {url} which is in the force list")
 
         except httpx.RequestError as e:
+            host_metrics.record(url, time.perf_counter() - start_time, True)
             logging.warning(f"Request to URL {url} failed on attempt {retries + 1}: {e}")
             if max_retries == 0:
                 raise
@@ -74,6 +232,34 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
 
 
+async def make_request_async(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    _prepare_kwargs(kwargs)
+
+    retries = 0
+    client = get_async_client()
+    while retries <= max_retries:
+        start_time = time.perf_counter()
+        try:
+            response = await client.request(method=method, url=url, **kwargs)
+            host_metrics.record(url, time.perf_counter() - start_time, response.status_code in STATUS_FORCELIST)
+
+            if response.status_code not in STATUS_FORCELIST:
+                return response
+            else:
+                logging.warning(f"Received status code {response.status_code} for URL {url} which is in the force list")
+
+        except httpx.RequestError as e:
+            host_metrics.record(url, time.perf_counter() - start_time, True)
+            logging.warning(f"Request to URL {url} failed on attempt {retries + 1}: {e}")
+            if max_retries == 0:
+                raise
+
+        retries += 1
+        if retries <= max_retries:
+            await asyncio.sleep(BACKOFF_FACTOR * (2 ** (retries - 1)))
+    raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
+
+
 def get(url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     return make_request("GET", url, max_retries=max_retries, **kwargs)
 
@@ -15,6 +15,7 @@ from sqlalchemy.orm.exc import ObjectDeletedError
 from configs import dify_config
 from core.entities.knowledge_entities import IndexingEstimate, PreviewDetail, QAPreviewDetail
 from core.errors.error import ProviderTokenNotInitError
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.rag.cleaner.clean_processor import CleanProcessor
@@ -618,9 +619,9 @@ class IndexingRunner:
 
             tokens = 0
             if embedding_model_instance:
-                tokens += sum(
-                    embedding_model_instance.get_text_embedding_num_tokens([document.page_content])
-                    for document in chunk_documents
+                # the documents of the chunk are counted in one batch
+                tokens += embedding_model_instance.get_text_embedding_num_tokens(
+                    [document.page_content for document in chunk_documents]
                 )
 
             # load index
@@ -672,6 +673,8 @@ class IndexingRunner:
 
         DatasetDocument.query.filter_by(id=document_id).update(update_params)
         db.session.commit()
+        if after_indexing_status == "completed":
+            DatasetAvailableCountCache(document.dataset_id).delete()
 
     @staticmethod
     def _update_segments_by_document(dataset_document_id: str, update_params: dict) -> None:
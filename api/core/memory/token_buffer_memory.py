@@ -1,8 +1,9 @@
+from collections import defaultdict
 from collections.abc import Sequence
 from typing import Optional
 
 from core.app.app_config.features.file_upload.manager import FileUploadConfigManager
-from core.file import file_manager
+from core.file import FileUploadConfig, file_manager
 from core.model_manager import ModelInstance
 from core.model_runtime.entities import (
     AssistantPromptMessage,
@@ -15,10 +16,14 @@ from core.model_runtime.entities import (
 )
 from core.prompt.utils.extract_thread_messages import extract_thread_messages
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from factories import file_factory
 from models.model import AppMode, Conversation, Message, MessageFile
 from models.workflow import WorkflowRun
 
+# token counts of the prompt messages of a message, a message does not change once it is in the history
+MESSAGE_TOKENS_CACHE_TTL = 86400
+
 
 class TokenBufferMemory:
     def __init__(self, conversation: Conversation, model_instance: ModelInstance) -> None:
@@ -67,24 +72,49 @@ class TokenBufferMemory:
             thread_messages.pop(0)
 
         messages = list(reversed(thread_messages))
+        if not messages:
+            return []
 
-        prompt_messages: list[PromptMessage] = []
+        # load the files of all the messages and the workflow runs of the messages with files at once
+        message_files: dict[str, list[MessageFile]] = defaultdict(list)
+        for message_file in db.session.query(MessageFile).filter(
+            MessageFile.message_id.in_([message.id for message in messages])
+        ):
+            message_files[message_file.message_id].append(message_file)
+
+        workflow_runs: dict[str, WorkflowRun] = {}
+        if self.conversation.mode in {AppMode.ADVANCED_CHAT, AppMode.WORKFLOW}:
+            workflow_run_ids = {
+                message.workflow_run_id
+                for message in messages
+                if message.workflow_run_id and message.id in message_files
+            }
+            if workflow_run_ids:
+                workflow_runs = {
+                    workflow_run.id: workflow_run
+                    for workflow_run in db.session.query(WorkflowRun).filter(WorkflowRun.id.in_(workflow_run_ids))
+                }
+
+        file_extra_configs: dict[str, Optional[FileUploadConfig]] = {}
+        message_prompt_messages: list[tuple[str, UserPromptMessage, AssistantPromptMessage]] = []
         for message in messages:
-            files = db.session.query(MessageFile).filter(MessageFile.message_id == message.id).all()
+            files = message_files.get(message.id)
             if files:
                 file_extra_config = None
                 if self.conversation.mode not in {AppMode.ADVANCED_CHAT, AppMode.WORKFLOW}:
                     file_extra_config = FileUploadConfigManager.convert(self.conversation.model_config)
                 else:
-                    if message.workflow_run_id:
-                        workflow_run = (
-                            db.session.query(WorkflowRun).filter(WorkflowRun.id == message.workflow_run_id).first()
-                        )
-
-                        if workflow_run and workflow_run.workflow:
-                            file_extra_config = FileUploadConfigManager.convert(
-                                workflow_run.workflow.features_dict, is_vision=False
+                    workflow_run = workflow_runs.get(message.workflow_run_id) if message.workflow_run_id else None
+                    if workflow_run:
+                        # the runs of a conversation mostly share their workflow, convert its features once
+                        if workflow_run.workflow_id not in file_extra_configs:
+                            workflow = workflow_run.workflow
+                            file_extra_configs[workflow_run.workflow_id] = (
+                                FileUploadConfigManager.convert(workflow.features_dict, is_vision=False)
+                                if workflow
+                                else None
                             )
+                        file_extra_config = file_extra_configs[workflow_run.workflow_id]
 
                 detail = ImagePromptMessageContent.DETAIL.LOW
                 if file_extra_config and app_record:
@@ -97,7 +127,7 @@ class TokenBufferMemory:
                     file_objs = []
 
                 if not file_objs:
-                    prompt_messages.append(UserPromptMessage(content=message.query))
+                    user_prompt_message = UserPromptMessage(content=message.query)
                 else:
                     prompt_message_contents: list[PromptMessageContent] = []
                     prompt_message_contents.append(TextPromptMessageContent(data=message.query))
@@ -108,26 +138,73 @@ class TokenBufferMemory:
                         )
                         prompt_message_contents.append(prompt_message)
 
-                    prompt_messages.append(UserPromptMessage(content=prompt_message_contents))
+                    user_prompt_message = UserPromptMessage(content=prompt_message_contents)
 
             else:
-                prompt_messages.append(UserPromptMessage(content=message.query))
+                user_prompt_message = UserPromptMessage(content=message.query)
 
-            prompt_messages.append(AssistantPromptMessage(content=message.answer))
-
-        if not prompt_messages:
-            return []
+            message_prompt_messages.append(
+                (message.id, user_prompt_message, AssistantPromptMessage(content=message.answer))
+            )
 
         # prune the chat message if it exceeds the max token limit
-        curr_message_tokens = self.model_instance.get_llm_num_tokens(prompt_messages)
+        return self._prune_prompt_messages(message_prompt_messages, max_token_limit)
 
-        if curr_message_tokens > max_token_limit:
-            pruned_memory = []
-            while curr_message_tokens > max_token_limit and len(prompt_messages) > 1:
-                pruned_memory.append(prompt_messages.pop(0))
-                curr_message_tokens = self.model_instance.get_llm_num_tokens(prompt_messages)
-
-        return prompt_messages
+    def _prune_prompt_messages(
+        self,
+        message_prompt_messages: list[tuple[str, UserPromptMessage, AssistantPromptMessage]],
+        max_token_limit: int,
+    ) -> list[PromptMessage]:
+        """
+        Drop the oldest messages until the rest fits in the max token limit, keeping at least one prompt message.
+        Without any cached count the whole history is counted at once, and kept when it fits.
+        Otherwise the tokens of the prompt messages of a message are counted once and cached by message id,
+        messages older than the limit are not counted at all.
+        :param message_prompt_messages: message id, user prompt message and assistant prompt message of each message
+        :param max_token_limit: max token limit
+        :return: kept prompt messages
+        """
+        prompt_messages: list[PromptMessage] = [
+            prompt_message
+            for _, user_prompt_message, assistant_prompt_message in message_prompt_messages
+            for prompt_message in (user_prompt_message, assistant_prompt_message)
+        ]
+        cache_keys = [
+            f"message_tokens:{self.model_instance.provider}:{self.model_instance.model}:{message_id}"
+            for message_id, _, _ in message_prompt_messages
+        ]
+        cached_token_counts = redis_client.mget(cache_keys)
+
+        # a history which fits is counted in one call, like a new conversation or after the counts expired
+        if not any(cached_token_counts) and self.model_instance.get_llm_num_tokens(prompt_messages) <= max_token_limit:
+            return prompt_messages
+
+        # sum the tokens from the newest message backwards, until the limit is exceeded
+        start_index = 0
+        curr_message_tokens = 0
+        counted_token_counts = {}
+        for index in range(len(message_prompt_messages) - 1, -1, -1):
+            cached_token_count = cached_token_counts[index]
+            if cached_token_count:
+                message_tokens = int(cached_token_count)
+            else:
+                _, user_prompt_message, assistant_prompt_message = message_prompt_messages[index]
+                message_tokens = self.model_instance.get_llm_num_tokens([user_prompt_message, assistant_prompt_message])
+                counted_token_counts[cache_keys[index]] = message_tokens
+
+            curr_message_tokens += message_tokens
+            if curr_message_tokens > max_token_limit:
+                # the prompt messages of a message are at index * 2 and index * 2 + 1
+                start_index = index * 2 + 2
+                break
+
+        if counted_token_counts:
+            pipeline = redis_client.pipeline(transaction=False)
+            for cache_key, message_tokens in counted_token_counts.items():
+                pipeline.setex(cache_key, MESSAGE_TOKENS_CACHE_TTL, message_tokens)
+            pipeline.execute()
+
+        return prompt_messages[min(start_index, len(prompt_messages) - 1) :]
 
     def get_history_prompt_text(
         self,
@@ -18,7 +18,7 @@ from core.model_runtime.entities.model_entities import (
     PriceType,
 )
 from core.model_runtime.errors.invoke import InvokeAuthorizationError, InvokeError
-from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+from core.model_runtime.model_providers.__base.tokenizers.tokenizer_service import TokenizerService
 from core.tools.utils.yaml_utils import load_yaml_file
 
 
@@ -332,4 +332,13 @@ class AIModel(ABC):
         :param text: plain text of prompt. You need to convert the original message to plain text
         :return: number of tokens
         """
-        return GPT2Tokenizer.get_num_tokens(text)
+        return TokenizerService.count(text)
+
+    def _get_num_tokens_by_gpt2_many(self, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens for each of the given texts by gpt2, tokenizing the texts together
+
+        :param texts: plain texts
+        :return: number of tokens of each text
+        """
+        return TokenizerService.count_many(texts)
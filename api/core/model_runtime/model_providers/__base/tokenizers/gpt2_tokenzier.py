@@ -1,11 +1,6 @@
-import logging
-from threading import Lock
 from typing import Any
 
-logger = logging.getLogger(__name__)
-
-_tokenizer: Any = None
-_lock = Lock()
+from core.model_runtime.utils.gpt2_encoder import get_gpt2_encoder
 
 
 class GPT2Tokenizer:
@@ -29,23 +24,4 @@ class GPT2Tokenizer:
 
     @staticmethod
     def get_encoder() -> Any:
-        global _tokenizer, _lock
-        with _lock:
-            if _tokenizer is None:
-                # Try to use tiktoken to get the tokenizer because it is faster
-                #
-                try:
-                    import tiktoken
-
-                    _tokenizer = tiktoken.get_encoding("gpt2")
-                except Exception:
-                    from os.path import abspath, dirname, join
-
-                    from transformers import GPT2Tokenizer as TransformerGPT2Tokenizer  # type: ignore
-
-                    base_path = abspath(__file__)
-                    gpt2_tokenizer_path = join(dirname(base_path), "gpt2")
-                    _tokenizer = TransformerGPT2Tokenizer.from_pretrained(gpt2_tokenizer_path)
-                    logger.info("Fallback to Transformers' GPT-2 tokenizer from tiktoken")
-
-            return _tokenizer
+        return get_gpt2_encoder()
@@ -0,0 +1,105 @@
+import concurrent.futures
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections.abc import Sequence
+from typing import Optional
+
+from configs import dify_config
+from core.helper.lru_cache import ThreadSafeLRUCache
+from core.model_runtime.utils.gpt2_encoder import count_gpt2_tokens
+
+# token counts by hash of the text
+_count_cache = ThreadSafeLRUCache(capacity=dify_config.TOKENIZER_CACHE_SIZE)
+
+_process_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_process_pool_pid: Optional[int] = None
+_process_pool_lock = threading.Lock()
+
+
+class TokenizerService:
+    """
+    Counts tokens with the gpt2 tokenizer, used by the model providers without a tokenizer of their own.
+    Counts are cached by text hash, the texts of a batch missing from the cache are tokenized together,
+    in the tokenizer process pool when they are large enough and the pool is enabled.
+    """
+
+    @classmethod
+    def count(cls, text: str) -> int:
+        """
+        Count the tokens of a text
+
+        :param text: text
+        :return: number of tokens
+        """
+        return cls.count_many([text])[0]
+
+    @classmethod
+    def count_many(cls, texts: Sequence[str]) -> list[int]:
+        """
+        Count the tokens of texts
+
+        :param texts: texts
+        :return: number of tokens of each text
+        """
+        counts = [0] * len(texts)
+        # indexes of the texts missing from the cache by hash, the same text is tokenized once
+        missing: dict[bytes, list[int]] = {}
+        for index, text in enumerate(texts):
+            if not text:
+                continue
+
+            text_hash = _hash_text(text)
+            count = _count_cache.get(text_hash)
+            if count is None:
+                missing.setdefault(text_hash, []).append(index)
+            else:
+                counts[index] = count
+
+        if missing:
+            missing_counts = cls._tokenize([texts[indexes[0]] for indexes in missing.values()])
+            for (text_hash, indexes), count in zip(missing.items(), missing_counts):
+                _count_cache.put(text_hash, count)
+                for index in indexes:
+                    counts[index] = count
+
+        return counts
+
+    @staticmethod
+    def _tokenize(texts: list[str]) -> list[int]:
+        max_workers = dify_config.TOKENIZER_PROCESS_POOL_MAX_WORKERS
+        if not max_workers or sum(len(text) for text in texts) < dify_config.TOKENIZER_PROCESS_POOL_MIN_CHARS:
+            return _count_tokens(texts)
+
+        # one slice per worker, so that the texts are pickled to the workers once
+        slice_size = -(-len(texts) // max_workers)
+        slices = [texts[start : start + slice_size] for start in range(0, len(texts), slice_size)]
+        return [count for counts in get_tokenizer_process_pool().map(count_gpt2_tokens, slices) for count in counts]
+
+
+def get_tokenizer_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Process wide pool tokenizing large batches out of the GIL of the process
+    """
+    global _process_pool, _process_pool_pid
+    with _process_pool_lock:
+        # forked workers create their own pool
+        if _process_pool is None or _process_pool_pid != os.getpid():
+            # spawned, forking a process running threads or gevent greenlets can copy locks held by them.
+            # the tasks are count_gpt2_tokens, the processes import its module and the gpt2 encoder only,
+            # not the model providers
+            _process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=dify_config.TOKENIZER_PROCESS_POOL_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _process_pool_pid = os.getpid()
+        return _process_pool
+
+
+def _hash_text(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def _count_tokens(texts: list[str]) -> list[int]:
+    return count_gpt2_tokens(texts)
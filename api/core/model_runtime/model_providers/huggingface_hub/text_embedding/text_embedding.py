@@ -55,10 +55,7 @@ class HuggingfaceHubTextEmbeddingModel(_CommonHuggingfaceHub, TextEmbeddingModel
         return TextEmbeddingResult(embeddings=self._mean_pooling(embeddings), usage=usage, model=model)
 
     def get_num_tokens(self, model: str, credentials: dict, texts: list[str]) -> int:
-        num_tokens = 0
-        for text in texts:
-            num_tokens += self._get_num_tokens_by_gpt2(text)
-        return num_tokens
+        return sum(self._get_num_tokens_by_gpt2_many(texts))
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         try:
@@ -102,11 +102,7 @@ class MinimaxTextEmbeddingModel(TextEmbeddingModel):
         :param texts: texts to embed
         :return:
         """
-        num_tokens = 0
-        for text in texts:
-            # use MinimaxTokenizer to get num tokens
-            num_tokens += self._get_num_tokens_by_gpt2(text)
-        return num_tokens
+        return sum(self._get_num_tokens_by_gpt2_many(texts))
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
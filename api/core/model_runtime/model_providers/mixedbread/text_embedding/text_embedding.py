@@ -103,7 +103,7 @@ class MixedBreadTextEmbeddingModel(TextEmbeddingModel):
         :param texts: texts to embed
         :return:
         """
-        return sum(self._get_num_tokens_by_gpt2(text) for text in texts)
+        return sum(self._get_num_tokens_by_gpt2_many(texts))
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
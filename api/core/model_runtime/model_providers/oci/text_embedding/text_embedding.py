@@ -105,7 +105,7 @@ class OCITextEmbeddingModel(TextEmbeddingModel):
         :param texts: texts to embed
         :return:
         """
-        return sum(self._get_num_tokens_by_gpt2(text) for text in texts)
+        return sum(self._get_num_tokens_by_gpt2_many(texts))
 
     def get_num_characters(self, model: str, credentials: dict, texts: list[str]) -> int:
         """
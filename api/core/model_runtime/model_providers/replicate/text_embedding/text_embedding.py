@@ -52,10 +52,7 @@ class ReplicateEmbeddingModel(_CommonReplicate, TextEmbeddingModel):
         return TextEmbeddingResult(model=model, embeddings=embeddings, usage=usage)
 
     def get_num_tokens(self, model: str, credentials: dict, texts: list[str]) -> int:
-        num_tokens = 0
-        for text in texts:
-            num_tokens += self._get_num_tokens_by_gpt2(text)
-        return num_tokens
+        return sum(self._get_num_tokens_by_gpt2_many(texts))
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         if "replicate_api_token" not in credentials:
@@ -87,11 +87,7 @@ class TongyiTextEmbeddingModel(_CommonTongyi, TextEmbeddingModel):
         """
         if len(texts) == 0:
             return 0
-        total_num_tokens = 0
-        for text in texts:
-            total_num_tokens += self._get_num_tokens_by_gpt2(text)
-
-        return total_num_tokens
+        return sum(self._get_num_tokens_by_gpt2_many(texts))
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
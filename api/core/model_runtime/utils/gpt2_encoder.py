@@ -0,0 +1,45 @@
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# the files of the transformers tokenizer, used when tiktoken can not load the encoding
+GPT2_TOKENIZER_PATH = Path(__file__).resolve().parents[1] / "model_providers" / "__base" / "tokenizers" / "gpt2"
+
+_encoder: Any = None
+_lock = Lock()
+
+
+def get_gpt2_encoder() -> Any:
+    """
+    Get the process wide gpt2 encoder.
+    This module imports nothing from the model providers, the tokenizer processes import it to start fast.
+    """
+    global _encoder
+    with _lock:
+        if _encoder is None:
+            # Try to use tiktoken to get the tokenizer because it is faster
+            try:
+                import tiktoken
+
+                _encoder = tiktoken.get_encoding("gpt2")
+            except Exception:
+                from transformers import GPT2Tokenizer as TransformerGPT2Tokenizer  # type: ignore
+
+                _encoder = TransformerGPT2Tokenizer.from_pretrained(str(GPT2_TOKENIZER_PATH))
+                logger.info("Fallback to Transformers' GPT-2 tokenizer from tiktoken")
+
+        return _encoder
+
+
+def count_gpt2_tokens(texts: list[str]) -> list[int]:
+    """
+    Count the gpt2 tokens of texts
+
+    :param texts: texts
+    :return: number of tokens of each text
+    """
+    encoder = get_gpt2_encoder()
+    return [len(encoder.encode(text)) for text in texts]
@@ -24,3 +24,11 @@ class BaseTraceInstance(ABC):
         Subclasses must implement specific tracing logic for activities.
         """
         ...
+
+    @abstractmethod
+    def flush(self):
+        """
+        Abstract method to wait until the traced activities are sent.
+        Subclasses must wait for the traces their clients send in background batches.
+        """
+        ...
@@ -439,6 +439,10 @@ class LangFuseDataTrace(BaseTraceInstance):
 
         generation.end(**format_generation_data)
 
+    def flush(self):
+        # the client ingests the queued events in batches from a background thread
+        self.langfuse_client.flush()
+
     def api_check(self):
         try:
             return self.langfuse_client.auth_check()
@@ -494,6 +494,11 @@ class LangSmithDataTrace(BaseTraceInstance):
         except Exception as e:
             raise ValueError(f"LangSmith Failed to update run: {str(e)}")
 
+    def flush(self):
+        # runs with a trace id and a dotted order are sent to the batch ingest endpoint from a background thread
+        if self.langsmith_client.tracing_queue is not None:
+            self.langsmith_client.tracing_queue.join()
+
     def api_check(self):
         try:
             random_project_name = f"test_project_{datetime.now().strftime('%Y%m%d%H%M%S')}"
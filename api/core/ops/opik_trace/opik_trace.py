@@ -453,6 +453,10 @@ class OpikDataTrace(BaseTraceInstance):
         except Exception as e:
             raise ValueError(f"Opik Failed to create span: {str(e)}")
 
+    def flush(self):
+        # the client sends the queued traces and spans in batches from background threads
+        self.opik_client.flush()
+
     def api_check(self):
         try:
             self.opik_client.auth_check()
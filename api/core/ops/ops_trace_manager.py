@@ -12,7 +12,9 @@ from flask import current_app
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from configs import dify_config
 from core.helper.encrypter import decrypt_token, encrypt_token, obfuscated_token
+from core.helper.lru_cache import ThreadSafeLRUCache
 from core.ops.entities.config_entity import (
     OPS_FILE_PATH,
     LangfuseConfig,
@@ -27,6 +29,7 @@ from core.ops.entities.trace_entity import (
     ModerationTraceInfo,
     SuggestedQuestionTraceInfo,
     TaskData,
+    TaskDataBatch,
     ToolTraceInfo,
     TraceTaskName,
     WorkflowTraceInfo,
@@ -36,10 +39,11 @@ from core.ops.langsmith_trace.langsmith_trace import LangSmithDataTrace
 from core.ops.opik_trace.opik_trace import OpikDataTrace
 from core.ops.utils import get_message_data
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
 from models.model import App, AppModelConfig, Conversation, Message, MessageFile, TraceAppConfig
 from models.workflow import WorkflowAppLog, WorkflowRun
-from tasks.ops_trace_task import process_trace_tasks
+from tasks.ops_trace_task import process_trace_batch
 
 provider_config_map: dict[str, dict[str, Any]] = {
     TracingProviderEnum.LANGFUSE.value: {
@@ -63,6 +67,12 @@ provider_config_map: dict[str, dict[str, Any]] = {
 }
 
 
+TRACE_CONFIG_VERSION_KEY = "ops_trace_config_version:{app_id}"
+
+# trace instances per app id, with the version of the tracing config they were created from and their expiry time
+trace_instance_cache = ThreadSafeLRUCache(capacity=1000)
+
+
 class OpsTraceManager:
     @classmethod
     def encrypt_tracing_config(
@@ -182,7 +192,7 @@ class OpsTraceManager:
         app_id: Optional[Union[UUID, str]] = None,
     ):
         """
-        Get ops trace through model config
+        Get ops trace through model config, cached per process until the tracing config of the app changes
         :param app_id: app_id
         :return:
         """
@@ -192,6 +202,25 @@ class OpsTraceManager:
         if app_id is None:
             return None
 
+        cache_ttl = dify_config.OPS_TRACE_INSTANCE_CACHE_TTL
+        if not cache_ttl:
+            return cls._create_ops_trace_instance(app_id)
+
+        # the version changes with the tracing config of the app, in any process
+        config_version = redis_client.get(TRACE_CONFIG_VERSION_KEY.format(app_id=app_id))
+        cached = trace_instance_cache.get(app_id)
+        if cached:
+            cached_config_version, expires_at, trace_instance = cached
+            if cached_config_version == config_version and expires_at > time.monotonic():
+                return trace_instance
+
+        # apps without tracing are cached as well, with no trace instance
+        trace_instance = cls._create_ops_trace_instance(app_id)
+        trace_instance_cache.put(app_id, (config_version, time.monotonic() + cache_ttl, trace_instance))
+        return trace_instance
+
+    @classmethod
+    def _create_ops_trace_instance(cls, app_id: str):
         app: Optional[App] = db.session.query(App).filter(App.id == app_id).first()
 
         if app is None:
@@ -219,6 +248,15 @@ class OpsTraceManager:
 
         return None
 
+    @staticmethod
+    def invalidate_ops_trace_instance(app_id: str):
+        """
+        Drop the cached trace instances of an app in all processes, after its tracing config changed
+        :param app_id: app id
+        :return:
+        """
+        redis_client.incr(TRACE_CONFIG_VERSION_KEY.format(app_id=app_id))
+
     @classmethod
     def get_app_config_through_message_id(cls, message_id: str):
         app_model_config = None
@@ -264,6 +302,7 @@ class OpsTraceManager:
             }
         )
         db.session.commit()
+        cls.invalidate_ops_trace_instance(app_id)
 
     @classmethod
     def get_app_tracing_config(cls, app_id: str):
@@ -792,20 +831,24 @@ class TraceQueueManager:
 
     def send_to_celery(self, tasks: list[TraceTask]):
         with self.flask_app.app_context():
+            task_data_list = []
             for task in tasks:
                 if task.app_id is None:
                     continue
-                file_id = uuid4().hex
                 trace_info = task.execute()
-                task_data = TaskData(
-                    app_id=task.app_id,
-                    trace_info_type=type(trace_info).__name__,
-                    trace_info=trace_info.model_dump() if trace_info else None,
+                task_data_list.append(
+                    TaskData(
+                        app_id=task.app_id,
+                        trace_info_type=type(trace_info).__name__,
+                        trace_info=trace_info.model_dump() if trace_info else None,
+                    )
                 )
-                file_path = f"{OPS_FILE_PATH}{task.app_id}/{file_id}.json"
-                storage.save(file_path, task_data.model_dump_json().encode("utf-8"))
-                file_info = {
-                    "file_id": file_id,
-                    "app_id": task.app_id,
-                }
-                process_trace_tasks.delay(file_info)
+            if not task_data_list:
+                return
+
+            # one file and one celery task for the whole batch instead of one per trace
+            file_id = uuid4().hex
+            file_path = f"{OPS_FILE_PATH}batches/{file_id}.json"
+            storage.save(file_path, TaskDataBatch(tasks=task_data_list).model_dump_json().encode("utf-8"))
+            process_trace_batch.delay({"file_id": file_id})
+            logging.debug(f"Sent trace batch {file_id} of {len(task_data_list)} traces")
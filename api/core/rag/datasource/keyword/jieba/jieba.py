@@ -3,6 +3,7 @@ from collections import defaultdict
 from typing import Any, Optional
 
 from pydantic import BaseModel
+from sqlalchemy import case, literal, update
 
 from configs import dify_config
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
@@ -13,6 +14,8 @@ from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
 from models.dataset import Dataset, DatasetKeywordTable, DocumentSegment
 
+SEGMENT_KEYWORDS_UPDATE_BATCH_SIZE = 500
+
 
 class KeywordTableConfig(BaseModel):
     max_keywords_per_chunk: int = 10
@@ -28,16 +31,18 @@ class Jieba(BaseKeyword):
         with redis_client.lock(lock_name, timeout=600):
             keyword_table_handler = JiebaKeywordTableHandler()
             keyword_table = self._get_dataset_keyword_table()
+            segment_keywords = {}
             for text in texts:
                 keywords = keyword_table_handler.extract_keywords(
                     text.page_content, self._config.max_keywords_per_chunk
                 )
                 if text.metadata is not None:
-                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
+                    segment_keywords[text.metadata["doc_id"]] = list(keywords)
                     keyword_table = self._add_text_to_keyword_table(
                         keyword_table or {}, text.metadata["doc_id"], list(keywords)
                     )
 
+            self._update_segments_keywords(self.dataset.id, segment_keywords)
             self._save_dataset_keyword_table(keyword_table)
 
             return self
@@ -49,6 +54,7 @@ class Jieba(BaseKeyword):
 
             keyword_table = self._get_dataset_keyword_table()
             keywords_list = kwargs.get("keywords_list")
+            segment_keywords = {}
             for i in range(len(texts)):
                 text = texts[i]
                 if keywords_list:
@@ -62,11 +68,12 @@ class Jieba(BaseKeyword):
                         text.page_content, self._config.max_keywords_per_chunk
                     )
                 if text.metadata is not None:
-                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
+                    segment_keywords[text.metadata["doc_id"]] = list(keywords)
                     keyword_table = self._add_text_to_keyword_table(
                         keyword_table or {}, text.metadata["doc_id"], list(keywords)
                     )
 
+            self._update_segments_keywords(self.dataset.id, segment_keywords)
             self._save_dataset_keyword_table(keyword_table)
 
     def text_exists(self, id: str) -> bool:
@@ -91,14 +98,26 @@ class Jieba(BaseKeyword):
 
         sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table or {}, query, k)
 
-        documents = []
-        for chunk_index in sorted_chunk_indices:
-            segment = (
-                db.session.query(DocumentSegment)
-                .filter(DocumentSegment.dataset_id == self.dataset.id, DocumentSegment.index_node_id == chunk_index)
-                .first()
+        return self._get_documents_by_index_node_ids(sorted_chunk_indices)
+
+    def _get_documents_by_index_node_ids(self, sorted_chunk_indices: list[str]) -> list[Document]:
+        if not sorted_chunk_indices:
+            return []
+
+        segments = (
+            db.session.query(DocumentSegment)
+            .filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(sorted_chunk_indices),
             )
+            .all()
+        )
+        segment_map = {segment.index_node_id: segment for segment in segments}
 
+        # keep the keyword match ranking
+        documents = []
+        for chunk_index in sorted_chunk_indices:
+            segment = segment_map.get(chunk_index)
             if segment:
                 documents.append(
                     Document(
@@ -221,6 +240,33 @@ class Jieba(BaseKeyword):
             db.session.add(document_segment)
             db.session.commit()
 
+    def _update_segments_keywords(self, dataset_id: str, segment_keywords: dict[str, list[str]]):
+        """
+        Update the keywords of many segments with one UPDATE statement per batch and a single commit.
+        :param dataset_id: dataset id
+        :param segment_keywords: index node id to keywords
+        """
+        if not segment_keywords:
+            return
+
+        node_ids = list(segment_keywords.keys())
+        for i in range(0, len(node_ids), SEGMENT_KEYWORDS_UPDATE_BATCH_SIZE):
+            batch_node_ids = node_ids[i : i + SEGMENT_KEYWORDS_UPDATE_BATCH_SIZE]
+            keywords_case = case(
+                {
+                    node_id: literal(segment_keywords[node_id], type_=DocumentSegment.keywords.type)
+                    for node_id in batch_node_ids
+                },
+                value=DocumentSegment.index_node_id,
+            )
+            db.session.execute(
+                update(DocumentSegment)
+                .where(DocumentSegment.dataset_id == dataset_id, DocumentSegment.index_node_id.in_(batch_node_ids))
+                .values(keywords=keywords_case)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+
     def create_segment_keywords(self, node_id: str, keywords: list[str]):
         keyword_table = self._get_dataset_keyword_table()
         self._update_segment_keywords(self.dataset.id, node_id, keywords)
@@ -0,0 +1,130 @@
+from collections.abc import Iterable
+from typing import Any
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from core.rag.datasource.keyword.jieba.jieba import Jieba
+from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.rag.datasource.keyword.keyword_base import BaseKeyword
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from models.dataset import DatasetKeywordIndex
+
+# keywords longer than the keyword column are not indexed
+MAX_KEYWORD_LENGTH = 255
+
+
+class JiebaInvertedIndex(Jieba):
+    """
+    Jieba keyword store keeping one posting row per keyword and segment in `dataset_keyword_indexes`,
+    so adds, deletes and searches only touch the rows of the affected keywords or segments
+    instead of loading and rewriting the whole keyword table of the dataset.
+    """
+
+    BATCH_SIZE = 1000
+
+    def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
+        self.add_texts(texts, **kwargs)
+        return self
+
+    def add_texts(self, texts: list[Document], **kwargs):
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords_list = kwargs.get("keywords_list")
+        postings: dict[str, list[str]] = {}
+        for i, text in enumerate(texts):
+            keywords = keywords_list[i] if keywords_list else None
+            if not keywords:
+                keywords = keyword_table_handler.extract_keywords(
+                    text.page_content, self._config.max_keywords_per_chunk
+                )
+            if text.metadata is not None:
+                postings[text.metadata["doc_id"]] = list(keywords)
+
+        self._update_segments_keywords(self.dataset.id, postings)
+        self._add_postings(postings)
+
+    def text_exists(self, id: str) -> bool:
+        stmt = select(DatasetKeywordIndex.id).where(
+            DatasetKeywordIndex.dataset_id == self.dataset.id, DatasetKeywordIndex.index_node_id == id
+        )
+        return db.session.execute(stmt.limit(1)).first() is not None
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        for i in range(0, len(ids), self.BATCH_SIZE):
+            db.session.execute(
+                delete(DatasetKeywordIndex).where(
+                    DatasetKeywordIndex.dataset_id == self.dataset.id,
+                    DatasetKeywordIndex.index_node_id.in_(ids[i : i + self.BATCH_SIZE]),
+                )
+            )
+        db.session.commit()
+
+    def search(self, query: str, **kwargs: Any) -> list[Document]:
+        k = kwargs.get("top_k", 4)
+
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords = [keyword for keyword in keyword_table_handler.extract_keywords(query) if keyword]
+        if not keywords:
+            return []
+
+        # rank segments by the number of matching query keywords, like the keyword table does
+        match_count = func.count(DatasetKeywordIndex.id).label("match_count")
+        stmt = (
+            select(DatasetKeywordIndex.index_node_id, match_count)
+            .where(DatasetKeywordIndex.dataset_id == self.dataset.id, DatasetKeywordIndex.keyword.in_(keywords))
+            .group_by(DatasetKeywordIndex.index_node_id)
+            .order_by(match_count.desc())
+            .limit(k)
+        )
+        sorted_chunk_indices = [row.index_node_id for row in db.session.execute(stmt)]
+
+        return self._get_documents_by_index_node_ids(sorted_chunk_indices)
+
+    def delete(self) -> None:
+        db.session.execute(delete(DatasetKeywordIndex).where(DatasetKeywordIndex.dataset_id == self.dataset.id))
+        db.session.commit()
+
+    def create_segment_keywords(self, node_id: str, keywords: list[str]):
+        self._update_segment_keywords(self.dataset.id, node_id, keywords)
+        self._add_postings({node_id: keywords})
+
+    def multi_create_segment_keywords(self, pre_segment_data_list: list):
+        keyword_table_handler = JiebaKeywordTableHandler()
+        postings: dict[str, list[str]] = {}
+        for pre_segment_data in pre_segment_data_list:
+            segment = pre_segment_data["segment"]
+            if pre_segment_data["keywords"]:
+                segment.keywords = pre_segment_data["keywords"]
+            else:
+                keywords = keyword_table_handler.extract_keywords(segment.content, self._config.max_keywords_per_chunk)
+                segment.keywords = list(keywords)
+            postings[segment.index_node_id] = segment.keywords
+        self._add_postings(postings)
+
+    def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
+        self._add_postings({node_id: keywords})
+
+    def update_segment_keywords_index_batch(self, postings: dict[str, list[str]]):
+        """
+        Index the keywords of many segments without touching the segments themselves.
+        :param postings: index node id to keywords
+        """
+        self._add_postings(postings)
+
+    def _add_postings(self, postings: dict[str, list[str]]) -> None:
+        """
+        Insert the posting rows of the given segments, one bulk statement per batch.
+        :param postings: index node id to keywords
+        """
+        rows = list(self._iter_posting_rows(postings))
+        for i in range(0, len(rows), self.BATCH_SIZE):
+            stmt = insert(DatasetKeywordIndex).values(rows[i : i + self.BATCH_SIZE])
+            db.session.execute(stmt.on_conflict_do_nothing(constraint="dataset_keyword_index_keyword_node_idx"))
+        db.session.commit()
+
+    def _iter_posting_rows(self, postings: dict[str, list[str]]) -> Iterable[dict[str, str]]:
+        for node_id, keywords in postings.items():
+            for keyword in set(keywords):
+                if keyword and len(keyword) <= MAX_KEYWORD_LENGTH:
+                    yield {"dataset_id": self.dataset.id, "keyword": keyword, "index_node_id": node_id}
@@ -37,6 +37,7 @@ class RetrievalService:
         reranking_model: Optional[dict] = None,
         reranking_mode: str = "reranking_model",
         weights: Optional[dict] = None,
+        query_vector: Optional[list[float]] = None,
     ):
         if not query:
             return []
@@ -78,6 +79,7 @@ class RetrievalService:
                     "all_documents": all_documents,
                     "retrieval_method": retrieval_method,
                     "exceptions": exceptions,
+                    "query_vector": query_vector,
                 },
             )
             threads.append(embedding_thread)
@@ -161,6 +163,7 @@ class RetrievalService:
         all_documents: list,
         retrieval_method: str,
         exceptions: list,
+        query_vector: Optional[list[float]] = None,
     ):
         with flask_app.app_context():
             try:
@@ -172,6 +175,7 @@ class RetrievalService:
 
                 documents = vector.search_by_vector(
                     cls.escape_query_for_search(query),
+                    query_vector=query_vector,
                     search_type="similarity_score_threshold",
                     top_k=top_k,
                     score_threshold=score_threshold,
@@ -257,83 +261,100 @@ class RetrievalService:
         records = []
         include_segment_ids = []
         segment_child_map = {}
+
+        # load the dataset documents, segments and child chunks of all the retrieved documents at once
+        document_ids = {document.metadata.get("document_id") for document in documents}
+        dataset_documents = {}
+        if document_ids:
+            dataset_documents = {
+                dataset_document.id: dataset_document
+                for dataset_document in db.session.query(DatasetDocument)
+                .filter(DatasetDocument.id.in_(document_ids))
+                .all()
+            }
+
+        child_index_node_ids = set()
+        index_node_ids = set()
+        dataset_ids = set()
         for document in documents:
-            document_id = document.metadata.get("document_id")
-            dataset_document = db.session.query(DatasetDocument).filter(DatasetDocument.id == document_id).first()
-            if dataset_document:
-                if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
-                    child_index_node_id = document.metadata.get("doc_id")
-                    result = (
-                        db.session.query(ChildChunk, DocumentSegment)
-                        .join(DocumentSegment, ChildChunk.segment_id == DocumentSegment.id)
-                        .filter(
-                            ChildChunk.index_node_id == child_index_node_id,
-                            DocumentSegment.dataset_id == dataset_document.dataset_id,
-                            DocumentSegment.enabled == True,
-                            DocumentSegment.status == "completed",
-                        )
-                        .first()
-                    )
-                    if result:
-                        child_chunk, segment = result
-                        if not segment:
-                            continue
-                        if segment.id not in include_segment_ids:
-                            include_segment_ids.append(segment.id)
-                            child_chunk_detail = {
-                                "id": child_chunk.id,
-                                "content": child_chunk.content,
-                                "position": child_chunk.position,
-                                "score": document.metadata.get("score", 0.0),
-                            }
-                            map_detail = {
-                                "max_score": document.metadata.get("score", 0.0),
-                                "child_chunks": [child_chunk_detail],
-                            }
-                            segment_child_map[segment.id] = map_detail
-                            record = {
-                                "segment": segment,
-                            }
-                            records.append(record)
-                        else:
-                            child_chunk_detail = {
-                                "id": child_chunk.id,
-                                "content": child_chunk.content,
-                                "position": child_chunk.position,
-                                "score": document.metadata.get("score", 0.0),
-                            }
-                            segment_child_map[segment.id]["child_chunks"].append(child_chunk_detail)
-                            segment_child_map[segment.id]["max_score"] = max(
-                                segment_child_map[segment.id]["max_score"], document.metadata.get("score", 0.0)
-                            )
-                    else:
-                        continue
-                else:
-                    index_node_id = document.metadata["doc_id"]
+            dataset_document = dataset_documents.get(document.metadata.get("document_id"))
+            if not dataset_document:
+                continue
+            dataset_ids.add(dataset_document.dataset_id)
+            if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
+                child_index_node_ids.add(document.metadata.get("doc_id"))
+            else:
+                index_node_ids.add(document.metadata["doc_id"])
 
-                    segment = (
-                        db.session.query(DocumentSegment)
-                        .filter(
-                            DocumentSegment.dataset_id == dataset_document.dataset_id,
-                            DocumentSegment.enabled == True,
-                            DocumentSegment.status == "completed",
-                            DocumentSegment.index_node_id == index_node_id,
-                        )
-                        .first()
-                    )
+        child_chunk_map = {}
+        if child_index_node_ids:
+            child_chunk_results = (
+                db.session.query(ChildChunk, DocumentSegment)
+                .join(DocumentSegment, ChildChunk.segment_id == DocumentSegment.id)
+                .filter(
+                    ChildChunk.index_node_id.in_(child_index_node_ids),
+                    DocumentSegment.dataset_id.in_(dataset_ids),
+                    DocumentSegment.enabled == True,
+                    DocumentSegment.status == "completed",
+                )
+                .all()
+            )
+            for child_chunk, segment in child_chunk_results:
+                child_chunk_map.setdefault((segment.dataset_id, child_chunk.index_node_id), (child_chunk, segment))
+
+        segment_map = {}
+        if index_node_ids:
+            segments = (
+                db.session.query(DocumentSegment)
+                .filter(
+                    DocumentSegment.dataset_id.in_(dataset_ids),
+                    DocumentSegment.enabled == True,
+                    DocumentSegment.status == "completed",
+                    DocumentSegment.index_node_id.in_(index_node_ids),
+                )
+                .all()
+            )
+            for segment in segments:
+                segment_map.setdefault((segment.dataset_id, segment.index_node_id), segment)
 
-                    if not segment:
-                        continue
+        # group the segments in the order of the retrieved documents
+        for document in documents:
+            dataset_document = dataset_documents.get(document.metadata.get("document_id"))
+            if not dataset_document:
+                continue
+            if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
+                result = child_chunk_map.get((dataset_document.dataset_id, document.metadata.get("doc_id")))
+                if not result:
+                    continue
+                child_chunk, segment = result
+                child_chunk_detail = {
+                    "id": child_chunk.id,
+                    "content": child_chunk.content,
+                    "position": child_chunk.position,
+                    "score": document.metadata.get("score", 0.0),
+                }
+                if segment.id not in include_segment_ids:
                     include_segment_ids.append(segment.id)
-                    record = {
-                        "segment": segment,
-                        "score": document.metadata.get("score", None),
+                    segment_child_map[segment.id] = {
+                        "max_score": document.metadata.get("score", 0.0),
+                        "child_chunks": [child_chunk_detail],
                     }
+                    records.append({"segment": segment})
+                else:
+                    segment_child_map[segment.id]["child_chunks"].append(child_chunk_detail)
+                    segment_child_map[segment.id]["max_score"] = max(
+                        segment_child_map[segment.id]["max_score"], document.metadata.get("score", 0.0)
+                    )
+            else:
+                segment = segment_map.get((dataset_document.dataset_id, document.metadata["doc_id"]))
+                if not segment:
+                    continue
+                include_segment_ids.append(segment.id)
+                records.append({"segment": segment, "score": document.metadata.get("score", None)})
 
-                    records.append(record)
-            for record in records:
-                if record["segment"].id in segment_child_map:
-                    record["child_chunks"] = segment_child_map[record["segment"].id].get("child_chunks", None)
-                    record["score"] = segment_child_map[record["segment"].id]["max_score"]
+        for record in records:
+            if record["segment"].id in segment_child_map:
+                record["child_chunks"] = segment_child_map[record["segment"].id].get("child_chunks", None)
+                record["score"] = segment_child_map[record["segment"].id]["max_score"]
 
         return [RetrievalSegments(**record) for record in records]
@@ -11,6 +11,7 @@ from pydantic import BaseModel, model_validator
 
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import vector_client_registry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -42,9 +43,20 @@ class ElasticSearchConfig(BaseModel):
 
 
 class ElasticSearchVector(BaseVector):
+    # server versions by connection config, checked once per shared client
+    _versions: dict[str, str] = {}
+
     def __init__(self, index_name: str, config: ElasticSearchConfig, attributes: list):
         super().__init__(index_name.lower())
-        self._client = self._init_client(config)
+        self._config_key = config.model_dump_json()
+        self._client = vector_client_registry.get_client(
+            VectorType.ELASTICSEARCH,
+            self._config_key,
+            create=lambda: self._init_client(config),
+            close=lambda client: client.close(),
+            health_check=lambda client: client.ping(),
+            owner=self,
+        )
         self._version = self._get_version()
         self._check_version()
         self._attributes = attributes
@@ -69,8 +81,12 @@ class ElasticSearchVector(BaseVector):
         return client
 
     def _get_version(self) -> str:
-        info = self._client.info()
-        return cast(str, info["version"]["number"])
+        version = self._versions.get(self._config_key)
+        if version is None:
+            info = self._client.info()
+            version = cast(str, info["version"]["number"])
+            self._versions[self._config_key] = version
+        return version
 
     def _check_version(self):
         if self._version < "8.0.0":
@@ -97,6 +113,12 @@ class ElasticSearchVector(BaseVector):
     def text_exists(self, id: str) -> bool:
         return bool(self._client.exists(index=self._collection_name, id=id))
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        response = self._client.mget(index=self._collection_name, ids=ids, source=False)
+        return {doc["_id"] for doc in response["docs"] if doc.get("found")}
+
     def delete_by_ids(self, ids: list[str]) -> None:
         if not ids:
             return
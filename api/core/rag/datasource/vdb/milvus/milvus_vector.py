@@ -10,6 +10,7 @@ from pymilvus.milvus_client import IndexParams  # type: ignore
 from configs import dify_config
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import vector_client_registry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -186,6 +187,21 @@ class MilvusVector(BaseVector):
 
         return len(result) > 0
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        """
+        Get the IDs of the texts that exist in the collection, in one query.
+        """
+        if not ids or not self._client.has_collection(self._collection_name):
+            return set()
+
+        result = self._client.query(
+            collection_name=self._collection_name,
+            filter=f'metadata["doc_id"] in {json.dumps(ids)}',
+            output_fields=[Field.METADATA_KEY.value],
+        )
+
+        return {item[Field.METADATA_KEY.value]["doc_id"] for item in result}
+
     def field_exists(self, field: str) -> bool:
         """
         Check if a field exists in the collection.
@@ -334,8 +350,15 @@ class MilvusVector(BaseVector):
         """
         Initialize and return a Milvus client.
         """
-        client = MilvusClient(uri=config.uri, user=config.user, password=config.password, db_name=config.database)
-        return client
+        return vector_client_registry.get_client(
+            VectorType.MILVUS,
+            config.model_dump_json(),
+            create=lambda: MilvusClient(
+                uri=config.uri, user=config.user, password=config.password, db_name=config.database
+            ),
+            close=lambda client: client.close(),
+            owner=self,
+        )
 
 
 class MilvusVectorFactory(AbstractVectorFactory):
@@ -158,6 +158,14 @@ class OracleVector(BaseVector):
             cur.execute(f"SELECT id FROM {self.table_name} WHERE id = '%s'" % (id,))
             return cur.fetchone() is not None
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        placeholders = ", ".join(f":{i + 1}" for i in range(len(ids)))
+        with self._get_cursor() as cur:
+            cur.execute(f"SELECT id FROM {self.table_name} WHERE id IN ({placeholders})", ids)
+            return {record[0] for record in cur}
+
     def get_by_ids(self, ids: list[str]) -> list[Document]:
         with self._get_cursor() as cur:
             cur.execute(f"SELECT meta, text FROM {self.table_name} WHERE id IN %s", (tuple(ids),))
@@ -1,4 +1,5 @@
 import json
+import threading
 import uuid
 from contextlib import contextmanager
 from typing import Any
@@ -9,6 +10,7 @@ from pydantic import BaseModel, model_validator
 
 from configs import dify_config
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import vector_client_registry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -58,6 +60,36 @@ CREATE TABLE IF NOT EXISTS {table_name} (
 """
 
 
+# seconds to wait for a free connection of a shared pool before failing
+GET_CONNECTION_TIMEOUT = 30
+
+
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    Connection pool shared by the vector instances of a config, a thread waits for a free connection
+    when all the max connections are in use instead of failing with PoolError
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=GET_CONNECTION_TIMEOUT):
+            raise psycopg2.pool.PoolError(f"no free connection in the pool after {GET_CONNECTION_TIMEOUT}s")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+
 class PGVector(BaseVector):
     def __init__(self, collection_name: str, config: PGVectorConfig):
         super().__init__(collection_name)
@@ -68,15 +100,39 @@ class PGVector(BaseVector):
         return VectorType.PGVECTOR
 
     def _create_connection_pool(self, config: PGVectorConfig):
-        return psycopg2.pool.SimpleConnectionPool(
-            config.min_connection,
-            config.max_connection,
+        return vector_client_registry.get_client(
+            VectorType.PGVECTOR,
+            config.model_dump_json(),
+            create=lambda: BlockingConnectionPool(
+                config.min_connection,
+                config.max_connection,
+                host=config.host,
+                port=config.port,
+                user=config.user,
+                password=config.password,
+                database=config.database,
+            ),
+            close=lambda pool: pool.closeall(),
+            health_check=lambda pool: PGVector._check_connection(config),
+            owner=self,
+        )
+
+    @staticmethod
+    def _check_connection(config: PGVectorConfig) -> None:
+        # a connection of its own, the check must not wait for or take a connection of the busy pool
+        conn = psycopg2.connect(
             host=config.host,
             port=config.port,
             user=config.user,
             password=config.password,
             database=config.database,
+            connect_timeout=5,
         )
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+        finally:
+            conn.close()
 
     @contextmanager
     def _get_cursor(self):
@@ -86,8 +142,10 @@ class PGVector(BaseVector):
             yield cur
         finally:
             cur.close()
-            conn.commit()
-            self.pool.putconn(conn)
+            if not conn.closed:
+                conn.commit()
+            # connections broken by a database restart are replaced instead of handed out again
+            self.pool.putconn(conn, close=bool(conn.closed))
 
     def create(self, texts: list[Document], embeddings: list[list[float]], **kwargs):
         dimension = len(embeddings[0])
@@ -120,6 +178,13 @@ class PGVector(BaseVector):
             cur.execute(f"SELECT id FROM {self.table_name} WHERE id = %s", (id,))
             return cur.fetchone() is not None
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        with self._get_cursor() as cur:
+            cur.execute(f"SELECT id FROM {self.table_name} WHERE id IN %s", (tuple(ids),))
+            return {str(record[0]) for record in cur}
+
     def get_by_ids(self, ids: list[str]) -> list[Document]:
         with self._get_cursor() as cur:
             cur.execute(f"SELECT meta, text FROM {self.table_name} WHERE id IN %s", (tuple(ids),))
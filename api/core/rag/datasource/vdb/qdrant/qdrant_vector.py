@@ -22,6 +22,7 @@ from qdrant_client.local.qdrant_local import QdrantLocal
 from configs import dify_config
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_client_registry import vector_client_registry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -71,13 +72,27 @@ class QdrantVector(BaseVector):
     def __init__(self, collection_name: str, group_id: str, config: QdrantConfig, distance_func: str = "Cosine"):
         super().__init__(collection_name)
         self._client_config = config
-        self._client = qdrant_client.QdrantClient(**self._client_config.to_qdrant_params())
+        self._client = self._init_client(config)
         self._distance_func = distance_func.upper()
         self._group_id = group_id
 
     def get_type(self) -> str:
         return VectorType.QDRANT
 
+    def _init_client(self, config: QdrantConfig) -> qdrant_client.QdrantClient:
+        params = config.to_qdrant_params()
+        if "path" in params:
+            # the local mode reloads the collection files on every search, it is not shared between vectors
+            return qdrant_client.QdrantClient(**params)
+
+        return vector_client_registry.get_client(
+            VectorType.QDRANT,
+            config.model_dump_json(),
+            create=lambda: qdrant_client.QdrantClient(**params),
+            close=lambda client: client.close(),
+            owner=self,
+        )
+
     def to_index_struct(self) -> dict:
         return {"type": self.get_type(), "vector_store": {"class_prefix": self._collection_name}}
 
@@ -320,6 +335,19 @@ class QdrantVector(BaseVector):
 
         return len(response) > 0
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        collections_response = self._client.get_collections()
+        if self._collection_name not in {collection.name for collection in collections_response.collections}:
+            return set()
+        # point ids are the doc ids
+        response = self._client.retrieve(
+            collection_name=self._collection_name, ids=ids, with_payload=False, with_vectors=False
+        )
+
+        return {str(point.id) for point in response}
+
     def search_by_vector(self, query_vector: list[float], **kwargs: Any) -> list[Document]:
         from qdrant_client.http import models
 
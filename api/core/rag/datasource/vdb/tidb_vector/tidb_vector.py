@@ -4,7 +4,7 @@ from typing import Any
 
 import sqlalchemy
 from pydantic import BaseModel, model_validator
-from sqlalchemy import JSON, TEXT, Column, DateTime, String, Table, create_engine, insert
+from sqlalchemy import JSON, TEXT, Column, DateTime, String, Table, bindparam, create_engine, insert
 from sqlalchemy import text as sql_text
 from sqlalchemy.orm import Session, declarative_base
 
@@ -141,6 +141,16 @@ class TiDBVector(BaseVector):
         result = self.get_ids_by_metadata_field("doc_id", id)
         return bool(result)
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        with Session(self._engine) as session:
+            select_statement = sql_text(
+                f"""SELECT meta->>'$.doc_id' FROM {self._collection_name} WHERE meta->>'$.doc_id' IN :ids"""
+            ).bindparams(bindparam("ids", expanding=True))
+            result = session.execute(select_statement, {"ids": ids}).fetchall()
+        return {item[0] for item in result}
+
     def delete_by_ids(self, ids: list[str]) -> None:
         with Session(self._engine) as session:
             ids_str = ",".join(f"'{doc_id}'" for doc_id in ids)
@@ -26,6 +26,16 @@ class BaseVector(ABC):
     def text_exists(self, id: str) -> bool:
         raise NotImplementedError
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        """
+        Get the ids of the texts that exist in the collection.
+        Vector stores supporting multi-id lookups override this to check all ids in one round trip.
+
+        :param ids: text ids
+        :return: existing text ids
+        """
+        return {id for id in ids if self.text_exists(id)}
+
     @abstractmethod
     def delete_by_ids(self, ids: list[str]) -> None:
         raise NotImplementedError
@@ -50,14 +60,12 @@ class BaseVector(ABC):
         raise NotImplementedError
 
     def _filter_duplicate_texts(self, texts: list[Document]) -> list[Document]:
-        for text in texts.copy():
-            if text.metadata and "doc_id" in text.metadata:
-                doc_id = text.metadata["doc_id"]
-                exists_duplicate_node = self.text_exists(doc_id)
-                if exists_duplicate_node:
-                    texts.remove(text)
-
-        return texts
+        existing_ids = self.existing_ids(self._get_uuids(texts))
+        return [
+            text
+            for text in texts
+            if not (text.metadata and "doc_id" in text.metadata and text.metadata["doc_id"] in existing_ids)
+        ]
 
     def _get_uuids(self, texts: list[Document]) -> list[str]:
         return [text.metadata["doc_id"] for text in texts if text.metadata and "doc_id" in text.metadata]
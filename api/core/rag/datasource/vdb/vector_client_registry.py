@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, Optional, TypeVar
+
+from configs import dify_config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Entry:
+    def __init__(
+        self,
+        backend: str,
+        client: Any,
+        close: Optional[Callable[[Any], None]],
+        health_check: Optional[Callable[[Any], Any]],
+    ) -> None:
+        self.backend = backend
+        self.client = client
+        self.close = close
+        self.health_check = health_check
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.last_checked_at = self.created_at
+        self.uses = 0
+        # vector instances holding the client, it is closed once it is evicted and no longer held
+        self.holders = 0
+        self.evicted = False
+
+
+class VectorClientRegistry:
+    """
+    Process wide registry of vector store clients and connection pools, keyed by backend and connection config.
+
+    Vector instances are created for every retrieval and indexing batch, the registry lets them share one
+    client per connection config instead of connecting again. Clients idle for longer than the idle timeout
+    and the least recently used clients over the max size are evicted, clients are health checked
+    at most once per interval when they are reused and recreated if the check fails.
+    An evicted client is closed once the last vector instance holding it is garbage collected.
+    Registered clients must be safe to use from multiple threads.
+    """
+
+    def __init__(self, max_size: int, idle_timeout: float, health_check_interval: float) -> None:
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        # reentrant, the owners' finalizers release their clients whenever they are garbage collected
+        self._lock = threading.RLock()
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        # serializes creating and health checking the client of a config, out of the registry lock
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._pid = os.getpid()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "health_check_failures": 0}
+
+    def get_client(
+        self,
+        backend: str,
+        config_key: str,
+        create: Callable[[], T],
+        close: Optional[Callable[[T], None]] = None,
+        health_check: Optional[Callable[[T], Any]] = None,
+        owner: Optional[object] = None,
+    ) -> T:
+        """
+        Get the shared client of the connection config, creating it on first use
+        :param backend: vector store type
+        :param config_key: serialized connection config, e.g. the config model as json
+        :param create: creates the client
+        :param close: closes the client when it is evicted and no longer held
+        :param health_check: raises or returns False if the client can not be used anymore
+        :param owner: object holding the client, e.g. the vector instance, the client is not closed before
+            the owner is garbage collected, close and health_check are kept with the client and must not reference it
+        :return: client
+        """
+        key = (backend, config_key)
+        with self._lock:
+            self._check_pid()
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            to_close: list[_Entry] = []
+            with self._lock:
+                now = time.monotonic()
+                to_close.extend(self._evict_idle(now))
+                entry = self._entries.get(key)
+                check = entry is not None and self._should_check(entry, now)
+            self._close_all(to_close)
+            to_close = []
+
+            if entry is not None and check and not self._is_healthy(entry):
+                with self._lock:
+                    self._stats["health_check_failures"] += 1
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                    to_close.extend(self._evict(entry))
+                entry = None
+
+            if entry is None:
+                client = create()
+                with self._lock:
+                    self._stats["misses"] += 1
+                    entry = _Entry(backend, client, close, health_check)
+                    self._entries[key] = entry
+                    while len(self._entries) > self.max_size:
+                        _, evicted = self._entries.popitem(last=False)
+                        self._stats["evictions"] += 1
+                        to_close.extend(self._evict(evicted))
+                    self._hold(entry, owner)
+            else:
+                with self._lock:
+                    self._stats["hits"] += 1
+                    if self._entries.get(key) is entry:
+                        self._entries.move_to_end(key)
+                    self._hold(entry, owner)
+            self._close_all(to_close)
+            return entry.client
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Registry counters and the registered clients, identified by a hash of their connection config
+        """
+        with self._lock:
+            now = time.monotonic()
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "clients": [
+                    {
+                        "backend": backend,
+                        "config_hash": hashlib.sha256(config_key.encode()).hexdigest()[:12],
+                        "uses": entry.uses,
+                        "holders": entry.holders,
+                        "age": now - entry.created_at,
+                        "idle": now - entry.last_used_at,
+                    }
+                    for (backend, config_key), entry in self._entries.items()
+                ],
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            to_close = [closed for entry in self._entries.values() for closed in self._evict(entry)]
+            self._entries.clear()
+        self._close_all(to_close)
+
+    def _hold(self, entry: _Entry, owner: Optional[object]) -> None:
+        entry.last_used_at = time.monotonic()
+        entry.uses += 1
+        if owner is not None:
+            entry.holders += 1
+            weakref.finalize(owner, self._release, entry)
+
+    def _release(self, entry: _Entry) -> None:
+        with self._lock:
+            entry.holders -= 1
+            entry.last_used_at = time.monotonic()
+            to_close = [entry] if entry.evicted and entry.holders == 0 else []
+        self._close_all(to_close)
+
+    @staticmethod
+    def _evict(entry: _Entry) -> list[_Entry]:
+        # the entries to close now, a held client is closed when it is released
+        entry.evicted = True
+        return [entry] if entry.holders == 0 else []
+
+    def _should_check(self, entry: _Entry, now: float) -> bool:
+        if entry.health_check is None or now - entry.last_checked_at < self.health_check_interval:
+            return False
+        entry.last_checked_at = now
+        return True
+
+    @staticmethod
+    def _is_healthy(entry: _Entry) -> bool:
+        try:
+            return entry.health_check(entry.client) is not False  # type: ignore[misc]
+        except Exception:
+            logger.warning(f"Health check of the {entry.backend} client failed", exc_info=True)
+            return False
+
+    def _evict_idle(self, now: float) -> list[_Entry]:
+        idle_keys = [
+            key
+            for key, entry in self._entries.items()
+            if entry.holders == 0 and now - entry.last_used_at > self.idle_timeout
+        ]
+        to_close = []
+        for key in idle_keys:
+            self._stats["evictions"] += 1
+            to_close.extend(self._evict(self._entries.pop(key)))
+        return to_close
+
+    def _check_pid(self) -> None:
+        # connections must not be shared with forked workers, drop the parent's clients without closing them
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._entries.clear()
+            self._key_locks.clear()
+
+    @staticmethod
+    def _close_all(entries: list[_Entry]) -> None:
+        for entry in entries:
+            if entry.close is None:
+                continue
+            try:
+                entry.close(entry.client)
+            except Exception:
+                logger.warning(f"Failed to close the {entry.backend} client", exc_info=True)
+
+
+vector_client_registry = VectorClientRegistry(
+    max_size=dify_config.VECTOR_CLIENT_REGISTRY_MAX_SIZE,
+    idle_timeout=dify_config.VECTOR_CLIENT_IDLE_TIMEOUT,
+    health_check_interval=dify_config.VECTOR_CLIENT_HEALTH_CHECK_INTERVAL,
+)
@@ -26,6 +26,9 @@ class AbstractVectorFactory(ABC):
 
 
 class Vector:
+    # ids checked per existing_ids call of the duplicate check
+    EXISTING_IDS_BATCH_SIZE = 1000
+
     def __init__(self, dataset: Dataset, attributes: Optional[list] = None):
         if attributes is None:
             attributes = ["doc_id", "dataset_id", "document_id", "doc_hash"]
@@ -172,8 +175,9 @@ class Vector:
     def delete_by_metadata_field(self, key: str, value: str) -> None:
         self._vector_processor.delete_by_metadata_field(key, value)
 
-    def search_by_vector(self, query: str, **kwargs: Any) -> list[Document]:
-        query_vector = self._embeddings.embed_query(query)
+    def search_by_vector(self, query: str, query_vector: Optional[list[float]] = None, **kwargs: Any) -> list[Document]:
+        if query_vector is None:
+            query_vector = self._embeddings.embed_query(query)
         return self._vector_processor.search_by_vector(query_vector, **kwargs)
 
     def search_by_full_text(self, query: str, **kwargs: Any) -> list[Document]:
@@ -198,16 +202,12 @@ class Vector:
         return CacheEmbedding(embedding_model)
 
     def _filter_duplicate_texts(self, texts: list[Document]) -> list[Document]:
-        for text in texts.copy():
-            if text.metadata is None:
-                continue
-            doc_id = text.metadata["doc_id"]
-            if doc_id:
-                exists_duplicate_node = self.text_exists(doc_id)
-                if exists_duplicate_node:
-                    texts.remove(text)
-
-        return texts
+        doc_ids = [text.metadata["doc_id"] for text in texts if text.metadata is not None and text.metadata["doc_id"]]
+        existing_ids: set[str] = set()
+        for i in range(0, len(doc_ids), self.EXISTING_IDS_BATCH_SIZE):
+            existing_ids.update(self._vector_processor.existing_ids(doc_ids[i : i + self.EXISTING_IDS_BATCH_SIZE]))
+
+        return [text for text in texts if text.metadata is None or text.metadata["doc_id"] not in existing_ids]
 
     def __getattr__(self, name):
         if self._vector_processor is not None:
@@ -164,6 +164,32 @@ class WeaviateVector(BaseVector):
 
         return True
 
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        collection_name = self._collection_name
+        schema = self._default_schema(self._collection_name)
+
+        # check whether the index already exists
+        if not ids or not self._client.schema.contains(schema):
+            return set()
+        # doc_id is word tokenized, Equal on every id instead of ContainsAny on their tokens, which matches
+        # ids sharing a token and would fill the limit with them
+        result = (
+            self._client.query.get(collection_name, ["doc_id"])
+            .with_where(
+                {
+                    "operator": "Or",
+                    "operands": [{"path": ["doc_id"], "operator": "Equal", "valueText": id} for id in ids],
+                }
+            )
+            .with_limit(len(ids))
+            .do()
+        )
+
+        if "errors" in result:
+            raise ValueError(f"Error during query: {result['errors']}")
+
+        return {entry["doc_id"] for entry in result["data"]["Get"][collection_name]} & set(ids)
+
     def delete_by_ids(self, ids: list[str]) -> None:
         # check whether the index already exists
         schema = self._default_schema(self._collection_name)
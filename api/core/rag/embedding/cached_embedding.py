@@ -1,16 +1,21 @@
 import base64
 import logging
-from typing import Any, Optional, cast
+import threading
+from collections.abc import Mapping
+from typing import Any, Optional, Union, cast
 
 import numpy as np
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
 from configs import dify_config
 from core.entities.embedding_type import EmbeddingInputType
+from core.helper.lru_cache import ThreadSafeLRUCache
 from core.model_manager import ModelInstance
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from core.rag.embedding.embedding_base import Embeddings
+from core.rag.embedding.embedding_codec import decode_embedding, encode_embedding, is_compact_embedding
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from libs import helper
@@ -19,6 +24,67 @@ from models.dataset import Embedding
 logger = logging.getLogger(__name__)
 
 
+class EmbeddingCacheStats:
+    """
+    Process-wide hit counters of the document embedding cache tiers.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.database_hits = 0
+        self.misses = 0
+
+    def record(self, memory_hits: int = 0, redis_hits: int = 0, database_hits: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.redis_hits += redis_hits
+            self.database_hits += database_hits
+            self.misses += misses
+
+    @property
+    def lookups(self) -> int:
+        return self.memory_hits + self.redis_hits + self.database_hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.lookups
+        if not lookups:
+            return 0.0
+        return (lookups - self.misses) / lookups
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "redis_hits": self.redis_hits,
+                "database_hits": self.database_hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.memory_hits = 0
+            self.redis_hits = 0
+            self.database_hits = 0
+            self.misses = 0
+
+
+def _decode_cached_vector(value: bytes) -> np.ndarray:
+    if is_compact_embedding(value):
+        return decode_embedding(value)
+    # values cached before the compact format are base64 encoded float64 buffers
+    return np.frombuffer(base64.b64decode(value), dtype="float")
+
+
+DOCUMENT_EMBEDDING_REDIS_TTL = 600
+
+embedding_cache_stats = EmbeddingCacheStats()
+_document_embedding_memory_cache = ThreadSafeLRUCache(dify_config.EMBEDDING_CACHE_MEMORY_SIZE)
+
+
 class CacheEmbedding(Embeddings):
     def __init__(self, model_instance: ModelInstance, user: Optional[str] = None) -> None:
         self._model_instance = model_instance
@@ -28,18 +94,12 @@ class CacheEmbedding(Embeddings):
         """Embed search docs in batches of 10."""
         # use doc embedding cache or store if not exists
         text_embeddings: list[Any] = [None for _ in range(len(texts))]
+        text_hashes = [helper.generate_text_hash(text) for text in texts]
+        cached_embeddings = self._get_cached_document_embeddings(text_hashes)
         embedding_queue_indices = []
-        for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = (
-                db.session.query(Embedding)
-                .filter_by(
-                    model_name=self._model_instance.model, hash=hash, provider_name=self._model_instance.provider
-                )
-                .first()
-            )
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
+        for i, hash in enumerate(text_hashes):
+            if hash in cached_embeddings:
+                text_embeddings[i] = cached_embeddings[hash]
             else:
                 embedding_queue_indices.append(i)
         if embedding_queue_indices:
@@ -76,23 +136,11 @@ class CacheEmbedding(Embeddings):
                             db.session.rollback()
                         except Exception as e:
                             logging.exception("Failed transform embedding")
-                cache_embeddings = []
-                try:
-                    for i, n_embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
-                        text_embeddings[i] = n_embedding
-                        hash = helper.generate_text_hash(texts[i])
-                        if hash not in cache_embeddings:
-                            embedding_cache = Embedding(
-                                model_name=self._model_instance.model,
-                                hash=hash,
-                                provider_name=self._model_instance.provider,
-                            )
-                            embedding_cache.set_embedding(n_embedding)
-                            db.session.add(embedding_cache)
-                            cache_embeddings.append(hash)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
+                new_embeddings: dict[str, list[float]] = {}
+                for i, n_embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
+                    text_embeddings[i] = n_embedding
+                    new_embeddings.setdefault(text_hashes[i], n_embedding)
+                self._store_document_embeddings(new_embeddings)
             except Exception as ex:
                 db.session.rollback()
                 logger.exception("Failed to embed documents: %s")
@@ -100,6 +148,128 @@ class CacheEmbedding(Embeddings):
 
         return text_embeddings
 
+    def _memory_cache_key(self, hash: str) -> tuple[str, str, str]:
+        return self._model_instance.provider, self._model_instance.model, hash
+
+    def _redis_cache_key(self, hash: str) -> str:
+        return f"document_embedding_{self._model_instance.provider}_{self._model_instance.model}_{hash}"
+
+    def _get_cached_document_embeddings(self, hashes: list[str]) -> dict[str, list[float]]:
+        """
+        Resolve embeddings of the given text hashes through the cache tiers:
+        the in-process LRU, then Redis, then one bulk query per batch against the embeddings table.
+        Entries found in a slower tier are promoted to the faster ones.
+        """
+        cached: dict[str, list[float]] = {}
+        pending = list(dict.fromkeys(hashes))
+        if not pending:
+            return cached
+
+        # tier 1: in-process LRU
+        missing = []
+        for hash in pending:
+            embedding = _document_embedding_memory_cache.get(self._memory_cache_key(hash))
+            if embedding is not None:
+                cached[hash] = embedding.tolist()
+            else:
+                missing.append(hash)
+        memory_hits = len(pending) - len(missing)
+
+        # tier 2: redis
+        redis_hits = 0
+        if missing:
+            try:
+                values = redis_client.mget([self._redis_cache_key(hash) for hash in missing])
+            except Exception:
+                logger.warning("Failed to read document embeddings from redis", exc_info=True)
+                values = [None] * len(missing)
+            still_missing = []
+            for hash, value in zip(missing, values):
+                if value:
+                    embedding_array = _decode_cached_vector(value)
+                    cached[hash] = embedding_array.tolist()
+                    _document_embedding_memory_cache.put(self._memory_cache_key(hash), embedding_array)
+                    redis_hits += 1
+                else:
+                    still_missing.append(hash)
+            missing = still_missing
+
+        # tier 3: embeddings table, one IN query per batch
+        database_embeddings: dict[str, np.ndarray] = {}
+        batch_size = dify_config.EMBEDDING_CACHE_BATCH_SIZE
+        for i in range(0, len(missing), batch_size):
+            batch_hashes = missing[i : i + batch_size]
+            embeddings = (
+                db.session.query(Embedding)
+                .filter(
+                    Embedding.model_name == self._model_instance.model,
+                    Embedding.provider_name == self._model_instance.provider,
+                    Embedding.hash.in_(batch_hashes),
+                )
+                .all()
+            )
+            for embedding in embeddings:
+                database_embeddings[embedding.hash] = embedding.get_embedding_array()
+        if database_embeddings:
+            cached.update({hash: embedding.tolist() for hash, embedding in database_embeddings.items()})
+            self._put_memory_and_redis(database_embeddings)
+
+        embedding_cache_stats.record(
+            memory_hits=memory_hits,
+            redis_hits=redis_hits,
+            database_hits=len(database_embeddings),
+            misses=len(missing) - len(database_embeddings),
+        )
+        return cached
+
+    def _store_document_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        """
+        Write newly computed embeddings to every cache tier, using one bulk upsert per batch for the table.
+        """
+        if not embeddings:
+            return
+
+        try:
+            hashes = list(embeddings.keys())
+            batch_size = dify_config.EMBEDDING_CACHE_BATCH_SIZE
+            for i in range(0, len(hashes), batch_size):
+                rows = []
+                for hash in hashes[i : i + batch_size]:
+                    embedding_cache = Embedding(
+                        model_name=self._model_instance.model,
+                        hash=hash,
+                        provider_name=self._model_instance.provider,
+                    )
+                    embedding_cache.set_embedding(embeddings[hash])
+                    rows.append(
+                        {
+                            "model_name": embedding_cache.model_name,
+                            "hash": embedding_cache.hash,
+                            "provider_name": embedding_cache.provider_name,
+                            "embedding": embedding_cache.embedding,
+                        }
+                    )
+                stmt = insert(Embedding).values(rows).on_conflict_do_nothing(constraint="embedding_hash_idx")
+                db.session.execute(stmt)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+        self._put_memory_and_redis(embeddings)
+
+    def _put_memory_and_redis(self, embeddings: Mapping[str, Union[list[float], np.ndarray]]) -> None:
+        try:
+            with redis_client.pipeline(transaction=False) as pipe:
+                for hash, embedding in embeddings.items():
+                    encoded_embedding = encode_embedding(embedding, dify_config.EMBEDDING_CACHE_STORAGE_DTYPE)
+                    _document_embedding_memory_cache.put(
+                        self._memory_cache_key(hash), decode_embedding(encoded_embedding)
+                    )
+                    pipe.setex(self._redis_cache_key(hash), DOCUMENT_EMBEDDING_REDIS_TTL, encoded_embedding)
+                pipe.execute()
+        except Exception:
+            logger.warning("Failed to cache document embeddings in redis", exc_info=True)
+
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
         # use doc embedding cache or store if not exists
@@ -108,8 +278,7 @@ class CacheEmbedding(Embeddings):
         embedding = redis_client.get(embedding_cache_key)
         if embedding:
             redis_client.expire(embedding_cache_key, 600)
-            decoded_embedding = np.frombuffer(base64.b64decode(embedding), dtype="float")
-            return [float(x) for x in decoded_embedding]
+            return cast(list[float], _decode_cached_vector(embedding).tolist())
         try:
             embedding_result = self._model_instance.invoke_text_embedding(
                 texts=[text], user=self._user, input_type=EmbeddingInputType.QUERY
@@ -126,14 +295,8 @@ class CacheEmbedding(Embeddings):
             raise ex
 
         try:
-            # encode embedding to base64
-            embedding_vector = np.array(embedding_results)
-            vector_bytes = embedding_vector.tobytes()
-            # Transform to Base64
-            encoded_vector = base64.b64encode(vector_bytes)
-            # Transform to string
-            encoded_str = encoded_vector.decode("utf-8")
-            redis_client.setex(embedding_cache_key, 600, encoded_str)
+            encoded_embedding = encode_embedding(embedding_results, dify_config.EMBEDDING_CACHE_STORAGE_DTYPE)
+            redis_client.setex(embedding_cache_key, 600, encoded_embedding)
         except Exception as ex:
             if dify_config.DEBUG:
                 logging.exception(f"Failed to add embedding to redis for the text '{text[:10]}...({len(text)} chars)'")
@@ -0,0 +1,55 @@
+import struct
+from typing import Literal, Union
+
+import numpy as np
+
+# Compact embedding layout, all little-endian:
+#   magic (4 bytes) | version (uint8) | dtype code (uint8) | dimension (uint32) | vector data
+# The first magic byte is neither a pickle opcode nor a base64 character,
+# so legacy values can always be told apart from compact ones.
+EMBEDDING_MAGIC = b"\x00EMB"
+EMBEDDING_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sBBI")
+
+EmbeddingDtype = Literal["float32", "float16"]
+
+_DTYPE_CODES: dict[str, int] = {"float32": 1, "float16": 2}
+_CODE_DTYPES: dict[int, np.dtype] = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+
+
+def is_compact_embedding(data: bytes) -> bool:
+    return data[: len(EMBEDDING_MAGIC)] == EMBEDDING_MAGIC
+
+
+def encode_embedding(embedding: Union[list[float], np.ndarray], dtype: EmbeddingDtype = "float32") -> bytes:
+    """
+    Encode an embedding vector into the compact binary format.
+
+    :param embedding: list of floats or a 1-d numpy array
+    :param dtype: storage precision, float32 or float16
+    :return: header followed by the raw vector bytes
+    """
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    dtype_code = _DTYPE_CODES[dtype]
+    vector = np.asarray(embedding, dtype=_CODE_DTYPES[dtype_code])
+    if vector.ndim != 1:
+        raise ValueError("Embedding must be a 1-d vector")
+    return _HEADER.pack(EMBEDDING_MAGIC, EMBEDDING_FORMAT_VERSION, dtype_code, vector.shape[0]) + vector.tobytes()
+
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    """
+    Decode a compact embedding into a read-only numpy view over the given buffer, no per-element conversion.
+
+    :param data: bytes produced by `encode_embedding`
+    :return: 1-d numpy array of float32 or float16
+    """
+    if len(data) < _HEADER.size or not is_compact_embedding(data):
+        raise ValueError("Not a compact embedding")
+    _, version, dtype_code, dimension = _HEADER.unpack_from(data)
+    if version != EMBEDDING_FORMAT_VERSION:
+        raise ValueError(f"Unsupported embedding format version: {version}")
+    if dtype_code not in _CODE_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype code: {dtype_code}")
+    return np.frombuffer(data, dtype=_CODE_DTYPES[dtype_code], count=dimension, offset=_HEADER.size)
@@ -1,10 +1,14 @@
+import logging
 import math
+import os
 import threading
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Optional, cast
 
 from flask import Flask, current_app
 
+from configs import dify_config
 from core.app.app_config.entities import DatasetEntity, DatasetRetrieveConfigEntity
 from core.app.entities.app_invoke_entities import InvokeFrom, ModelConfigWithCredentialsEntity
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
@@ -20,9 +24,11 @@ from core.ops.utils import measure_time
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.embedding.cached_embedding import CacheEmbedding
 from core.rag.entities.context_entities import DocumentContext
 from core.rag.models.document import Document
 from core.rag.rerank.rerank_type import RerankMode
+from core.rag.retrieval.retrieval_log_buffer import RetrievalLogBuffer
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from core.rag.retrieval.router.multi_dataset_function_call_router import FunctionCallMultiDatasetRouter
 from core.rag.retrieval.router.multi_dataset_react_route import ReactMultiDatasetRouter
@@ -30,10 +36,12 @@ from core.tools.tool.dataset_retriever.dataset_multi_retriever_tool import Datas
 from core.tools.tool.dataset_retriever.dataset_retriever_base_tool import DatasetRetrieverBaseTool
 from core.tools.tool.dataset_retriever.dataset_retriever_tool import DatasetRetrieverTool
 from extensions.ext_database import db
-from models.dataset import Dataset, DatasetQuery, DocumentSegment
+from models.dataset import Dataset, DatasetQuery
 from models.dataset import Document as DatasetDocument
 from services.external_knowledge_service import ExternalDatasetService
 
+logger = logging.getLogger(__name__)
+
 default_retrieval_model: dict[str, Any] = {
     "search_method": RetrievalMethod.SEMANTIC_SEARCH.value,
     "reranking_enable": False,
@@ -43,6 +51,26 @@ default_retrieval_model: dict[str, Any] = {
 }
 
 
+_retrieval_executor: Optional[ThreadPoolExecutor] = None
+_retrieval_executor_pid: Optional[int] = None
+_retrieval_executor_lock = threading.Lock()
+
+
+def get_retrieval_executor() -> ThreadPoolExecutor:
+    """
+    Process wide executor running the dataset searches of multiple dataset retrievals
+    """
+    global _retrieval_executor, _retrieval_executor_pid
+    with _retrieval_executor_lock:
+        # threads do not survive a fork, forked workers create their own executor
+        if _retrieval_executor is None or _retrieval_executor_pid != os.getpid():
+            _retrieval_executor = ThreadPoolExecutor(
+                max_workers=dify_config.RETRIEVAL_THREAD_POOL_MAX_WORKERS, thread_name_prefix="DatasetRetrieval"
+            )
+            _retrieval_executor_pid = os.getpid()
+        return _retrieval_executor
+
+
 class DatasetRetrieval:
     def __init__(self, application_generate_entity=None):
         self.application_generate_entity = application_generate_entity
@@ -351,7 +379,6 @@ class DatasetRetrieval:
     ):
         if not available_datasets:
             return []
-        threads = []
         all_documents: list[Document] = []
         dataset_ids = [dataset.id for dataset in available_datasets]
         index_type_check = all(
@@ -385,22 +412,27 @@ class DatasetRetrieval:
                     ].embedding_model_provider
                     weights["vector_setting"]["embedding_model_name"] = available_datasets[0].embedding_model
 
+        flask_app = current_app._get_current_object()  # type: ignore
+        executor = get_retrieval_executor()
+        query_vectors = self._embed_query_by_model(flask_app, executor, available_datasets, query)
+        futures = []
         for dataset in available_datasets:
             index_type = dataset.indexing_technique
-            retrieval_thread = threading.Thread(
-                target=self._retriever,
-                kwargs={
-                    "flask_app": current_app._get_current_object(),  # type: ignore
-                    "dataset_id": dataset.id,
-                    "query": query,
-                    "top_k": top_k,
-                    "all_documents": all_documents,
-                },
+            futures.append(
+                executor.submit(
+                    self._retriever,
+                    flask_app=flask_app,
+                    dataset_id=dataset.id,
+                    query=query,
+                    top_k=top_k,
+                    all_documents=all_documents,
+                    query_vector=query_vectors.get(self._embedding_model_key(dataset)),
+                )
             )
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
+        for future, dataset in zip(futures, available_datasets):
+            exception = future.exception()
+            if exception:
+                logger.error(f"Failed to retrieve from dataset {dataset.id}", exc_info=exception)
 
         with measure_time() as timer:
             if reranking_enable:
@@ -428,20 +460,8 @@ class DatasetRetrieval:
     ) -> None:
         """Handle retrieval end."""
         dify_documents = [document for document in documents if document.provider == "dify"]
-        for document in dify_documents:
-            if document.metadata is not None:
-                query = db.session.query(DocumentSegment).filter(
-                    DocumentSegment.index_node_id == document.metadata["doc_id"]
-                )
-
-                # if 'dataset_id' in document.metadata:
-                if "dataset_id" in document.metadata:
-                    query = query.filter(DocumentSegment.dataset_id == document.metadata["dataset_id"])
-
-                # add hit count to document segment
-                query.update({DocumentSegment.hit_count: DocumentSegment.hit_count + 1}, synchronize_session=False)
-
-                db.session.commit()
+        # add hit count to document segment
+        RetrievalLogBuffer.record_segment_hits(dify_documents)
 
         # get tracing instance
         trace_manager: Optional[TraceQueueManager] = (
@@ -471,11 +491,64 @@ class DatasetRetrieval:
                 created_by=user_id,
             )
             dataset_queries.append(dataset_query)
-        if dataset_queries:
-            db.session.add_all(dataset_queries)
-        db.session.commit()
+        RetrievalLogBuffer.record_dataset_queries(dataset_queries)
+
+    @staticmethod
+    def _embedding_model_key(dataset: Dataset) -> Optional[tuple[str, str, str]]:
+        if dataset.provider == "external" or dataset.indexing_technique != "high_quality":
+            return None
+        retrieval_model = dataset.retrieval_model or default_retrieval_model
+        if not RetrievalMethod.is_support_semantic_search(retrieval_model["search_method"]):
+            return None
+        return dataset.tenant_id, dataset.embedding_model_provider, dataset.embedding_model
+
+    def _embed_query_by_model(
+        self, flask_app: Flask, executor: ThreadPoolExecutor, datasets: list[Dataset], query: str
+    ) -> dict[tuple[str, str, str], list[float]]:
+        """
+        Embed the query once per embedding model of the datasets searched by vector
+        :param flask_app: flask app
+        :param executor: retrieval executor
+        :param datasets: datasets
+        :param query: query
+        :return: query vector of each embedding model
+        """
+        embedding_model_keys = {self._embedding_model_key(dataset) for dataset in datasets}
+        futures = {
+            embedding_model_key: executor.submit(self._embed_query, flask_app, *embedding_model_key, query)
+            for embedding_model_key in embedding_model_keys
+            if embedding_model_key is not None
+        }
+
+        query_vectors = {}
+        for embedding_model_key, future in futures.items():
+            try:
+                query_vectors[embedding_model_key] = future.result()
+            except Exception:
+                # the datasets of the model embed the query on their own, raising the error of their model
+                logger.warning(f"Failed to embed query with {embedding_model_key[1]}/{embedding_model_key[2]}")
+        return query_vectors
+
+    @staticmethod
+    def _embed_query(flask_app: Flask, tenant_id: str, provider: str, model: str, query: str) -> list[float]:
+        with flask_app.app_context():
+            embedding_model = ModelManager().get_model_instance(
+                tenant_id=tenant_id,
+                provider=provider,
+                model_type=ModelType.TEXT_EMBEDDING,
+                model=model,
+            )
+            return CacheEmbedding(embedding_model).embed_query(RetrievalService.escape_query_for_search(query))
 
-    def _retriever(self, flask_app: Flask, dataset_id: str, query: str, top_k: int, all_documents: list):
+    def _retriever(
+        self,
+        flask_app: Flask,
+        dataset_id: str,
+        query: str,
+        top_k: int,
+        all_documents: list,
+        query_vector: Optional[list[float]] = None,
+    ):
         with flask_app.app_context():
             dataset = db.session.query(Dataset).filter(Dataset.id == dataset_id).first()
 
@@ -528,6 +601,7 @@ class DatasetRetrieval:
                             else None,
                             reranking_mode=retrieval_model.get("reranking_mode") or "reranking_model",
                             weights=retrieval_model.get("weights", None),
+                            query_vector=query_vector,
                         )
 
                         all_documents.extend(documents)
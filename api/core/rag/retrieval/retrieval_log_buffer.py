@@ -0,0 +1,181 @@
+import datetime
+import json
+from collections import Counter, defaultdict
+
+from redis.exceptions import ResponseError
+
+from configs import dify_config
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import DatasetQuery, DocumentSegment
+
+
+class RetrievalLogBuffer:
+    """
+    Records the segment hit counts and dataset queries of retrievals.
+
+    With RETRIEVAL_LOG_WRITE_BEHIND_ENABLED, hit counts are aggregated in a Redis hash and queries are appended
+    to a Redis list instead of being written in the request, schedule.flush_retrieval_log_task writes them
+    to the database in bulk.
+    """
+
+    SEGMENT_HITS_KEY = "retrieval_log:segment_hits"
+    DATASET_QUERIES_KEY = "retrieval_log:dataset_queries"
+    FLUSHING_SEGMENT_HITS_KEY = "retrieval_log:segment_hits:flushing"
+    FLUSHING_DATASET_QUERIES_KEY = "retrieval_log:dataset_queries:flushing"
+    FLUSH_LOCK_KEY = "retrieval_log:flush_lock"
+
+    @classmethod
+    def record_segment_hits(cls, documents: list[Document]) -> None:
+        """
+        Add one hit to the segments of the retrieved documents.
+
+        :param documents: retrieved documents
+        :return:
+        """
+        hits: Counter[tuple[str, str]] = Counter(
+            (document.metadata.get("dataset_id", ""), document.metadata["doc_id"])
+            for document in documents
+            if document.metadata is not None
+        )
+        if not hits:
+            return
+
+        if dify_config.RETRIEVAL_LOG_WRITE_BEHIND_ENABLED:
+            pipeline = redis_client.pipeline(transaction=False)
+            for (dataset_id, index_node_id), count in hits.items():
+                pipeline.hincrby(cls.SEGMENT_HITS_KEY, f"{dataset_id}:{index_node_id}", count)
+            pipeline.execute()
+            return
+
+        cls._update_hit_counts(hits)
+
+    @classmethod
+    def record_dataset_queries(cls, dataset_queries: list[DatasetQuery]) -> None:
+        """
+        Save the queries of a retrieval.
+
+        :param dataset_queries: dataset queries
+        :return:
+        """
+        if not dataset_queries:
+            return
+
+        if dify_config.RETRIEVAL_LOG_WRITE_BEHIND_ENABLED:
+            created_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None).isoformat()
+            redis_client.rpush(
+                cls.DATASET_QUERIES_KEY,
+                *(
+                    json.dumps(
+                        {
+                            "dataset_id": dataset_query.dataset_id,
+                            "content": dataset_query.content,
+                            "source": dataset_query.source,
+                            "source_app_id": dataset_query.source_app_id,
+                            "created_by_role": dataset_query.created_by_role,
+                            "created_by": dataset_query.created_by,
+                            "created_at": created_at,
+                        }
+                    )
+                    for dataset_query in dataset_queries
+                ),
+            )
+            return
+
+        db.session.add_all(dataset_queries)
+        db.session.commit()
+
+    @classmethod
+    def flush(cls, batch_size: int = 1000) -> tuple[int, int]:
+        """
+        Write the buffered hit counts and queries to the database.
+
+        Buffered entries are moved to a processing key first and removed from it only once they are committed,
+        the entries of a failed flush are written by the next one.
+
+        :param batch_size: number of queries inserted per commit
+        :return: number of flushed segment hit counts and number of flushed queries
+        """
+        lock = redis_client.lock(name=cls.FLUSH_LOCK_KEY, timeout=600)
+        if not lock.acquire(blocking=False):
+            # another worker is flushing
+            return 0, 0
+        try:
+            return cls._flush_segment_hits(), cls._flush_dataset_queries(batch_size)
+        finally:
+            lock.release()
+
+    @classmethod
+    def _flush_segment_hits(cls) -> int:
+        # take the current hits atomically, retrievals keep counting into a new hash meanwhile.
+        # the hits left by a failed flush are written before taking new ones
+        if not redis_client.exists(cls.FLUSHING_SEGMENT_HITS_KEY):
+            try:
+                redis_client.rename(cls.SEGMENT_HITS_KEY, cls.FLUSHING_SEGMENT_HITS_KEY)
+            except ResponseError:
+                # no hits since the last flush
+                return 0
+
+        hits: Counter[tuple[str, str]] = Counter()
+        for field, count in redis_client.hgetall(cls.FLUSHING_SEGMENT_HITS_KEY).items():
+            dataset_id, index_node_id = field.decode("utf-8").split(":", 1)
+            hits[(dataset_id, index_node_id)] = int(count)
+
+        for dataset_id, count, index_node_ids in cls._group_hits(hits):
+            cls._update_hit_count(dataset_id, count, index_node_ids)
+            # committed, a retry must not add these hits again
+            redis_client.hdel(
+                cls.FLUSHING_SEGMENT_HITS_KEY, *(f"{dataset_id}:{index_node_id}" for index_node_id in index_node_ids)
+            )
+        redis_client.delete(cls.FLUSHING_SEGMENT_HITS_KEY)
+        return len(hits)
+
+    @classmethod
+    def _flush_dataset_queries(cls, batch_size: int) -> int:
+        flushed_count = 0
+        while True:
+            values = redis_client.lrange(cls.FLUSHING_DATASET_QUERIES_KEY, 0, -1)
+            if not values:
+                # move the next batch atomically, in the order of the queries
+                pipeline = redis_client.pipeline(transaction=True)
+                for _ in range(batch_size):
+                    pipeline.lmove(cls.DATASET_QUERIES_KEY, cls.FLUSHING_DATASET_QUERIES_KEY, "LEFT", "RIGHT")
+                values = [value for value in pipeline.execute() if value is not None]
+                if not values:
+                    return flushed_count
+
+            dataset_queries = []
+            for value in values:
+                dataset_query = json.loads(value)
+                dataset_query["created_at"] = datetime.datetime.fromisoformat(dataset_query["created_at"])
+                dataset_queries.append(DatasetQuery(**dataset_query))
+            db.session.add_all(dataset_queries)
+            db.session.commit()
+            redis_client.delete(cls.FLUSHING_DATASET_QUERIES_KEY)
+            flushed_count += len(dataset_queries)
+
+    @classmethod
+    def _update_hit_counts(cls, hits: Counter[tuple[str, str]]) -> None:
+        for dataset_id, count, index_node_ids in cls._group_hits(hits):
+            cls._update_hit_count(dataset_id, count, index_node_ids)
+
+    @staticmethod
+    def _group_hits(hits: Counter[tuple[str, str]]) -> list[tuple[str, int, list[str]]]:
+        # one update per dataset and increment, segments of the same dataset mostly have the same number of hits
+        index_node_ids_by_increment: defaultdict[tuple[str, int], list[str]] = defaultdict(list)
+        for (dataset_id, index_node_id), count in hits.items():
+            index_node_ids_by_increment[(dataset_id, count)].append(index_node_id)
+        return [
+            (dataset_id, count, index_node_ids)
+            for (dataset_id, count), index_node_ids in index_node_ids_by_increment.items()
+        ]
+
+    @staticmethod
+    def _update_hit_count(dataset_id: str, count: int, index_node_ids: list[str]) -> None:
+        # each update is committed on its own so no transaction holds the row locks of several updates
+        query = db.session.query(DocumentSegment).filter(DocumentSegment.index_node_id.in_(index_node_ids))
+        if dataset_id:
+            query = query.filter(DocumentSegment.dataset_id == dataset_id)
+        query.update({DocumentSegment.hit_count: DocumentSegment.hit_count + count}, synchronize_session=False)
+        db.session.commit()
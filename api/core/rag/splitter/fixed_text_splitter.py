@@ -5,7 +5,7 @@ from __future__ import annotations
 from typing import Any, Optional
 
 from core.model_manager import ModelInstance
-from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+from core.model_runtime.model_providers.__base.tokenizers.tokenizer_service import TokenizerService
 from core.rag.splitter.text_splitter import (
     TS,
     Collection,
@@ -37,7 +37,7 @@ class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
             if embedding_model_instance:
                 return embedding_model_instance.get_text_embedding_num_tokens(texts=[text])
             else:
-                return GPT2Tokenizer.get_num_tokens(text)
+                return TokenizerService.count(text)
 
         if issubclass(cls, TokenTextSplitter):
             extra_kwargs = {
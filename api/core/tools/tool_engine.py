@@ -282,6 +282,7 @@ class ToolEngine:
         :return: message files, should save as variable
         """
         result = []
+        message_files: list[tuple[MessageFile, str]] = []
 
         for message in tool_messages:
             if "image" in message.mimetype:
@@ -313,10 +314,13 @@ class ToolEngine:
             )
 
             db.session.add(message_file)
-            db.session.commit()
-            db.session.refresh(message_file)
+            message_files.append((message_file, message.save_as))
 
-            result.append((message_file.id, message.save_as))
+        if message_files:
+            # the ids are generated by the database, commit the message files of the tool call at once
+            db.session.flush()
+            result = [(message_file.id, save_as) for message_file, save_as in message_files]
+            db.session.commit()
 
         db.session.close()
 
@@ -1,12 +1,22 @@
+import hashlib
 import logging
+import os
+import pickle
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 import yaml  # type: ignore
 from yaml import YAMLError
 
 logger = logging.getLogger(__name__)
 
+# the api directory, paths in the yaml bundle are relative to it
+YAML_BUNDLE_ROOT = Path(__file__).resolve().parents[3]
+YAML_BUNDLE_PATH = YAML_BUNDLE_ROOT / ".yaml_bundle.pickle"
+
+_NOT_BUNDLED = object()
+
 
 def load_yaml_file(file_path: str, ignore_error: bool = True, default_value: Any = {}) -> Any:
     """
@@ -24,12 +34,80 @@ def load_yaml_file(file_path: str, ignore_error: bool = True, default_value: Any
         else:
             raise FileNotFoundError(f"File not found: {file_path}")
 
-    with open(file_path, encoding="utf-8") as yaml_file:
+    raw_content = Path(file_path).read_bytes()
+
+    # the content parsed at build time, as long as the file did not change since
+    bundled_content = _get_bundled_content(file_path, raw_content)
+    if bundled_content is not _NOT_BUNDLED:
+        return bundled_content or default_value
+
+    try:
+        yaml_content = yaml.safe_load(raw_content.decode("utf-8"))
+        return yaml_content or default_value
+    except Exception as e:
+        if ignore_error:
+            return default_value
+        else:
+            raise YAMLError(f"Failed to load YAML file {file_path}: {e}") from e
+
+
+def build_yaml_bundle(source_dir: Optional[Path] = None, bundle_path: Optional[Path] = None) -> int:
+    """
+    Parse the YAML files of the model providers, tool providers... once at build time and save them in one
+    bundle, load_yaml_file then reads a file from the bundle instead of parsing it when its content hash matches.
+    Each file is pickled on its own, so loading the bundle does not build the objects of files never read.
+
+    :param source_dir: directory searched for YAML files, default to the core directory
+    :param bundle_path: path of the bundle, default to YAML_BUNDLE_PATH
+    :return: number of bundled YAML files
+    """
+    source_dir = source_dir or YAML_BUNDLE_ROOT / "core"
+    bundle_path = bundle_path or YAML_BUNDLE_PATH
+    entries: dict[str, tuple[str, bytes]] = {}
+    for yaml_path in sorted(source_dir.rglob("*.yaml")):
+        raw_content = yaml_path.read_bytes()
         try:
-            yaml_content = yaml.safe_load(yaml_file)
-            return yaml_content or default_value
-        except Exception as e:
-            if ignore_error:
-                return default_value
-            else:
-                raise YAMLError(f"Failed to load YAML file {file_path}: {e}") from e
+            yaml_content = yaml.safe_load(raw_content.decode("utf-8"))
+        except Exception:
+            # invalid files are left out, loading them reports the error as usual
+            logger.warning(f"Skip invalid YAML file {yaml_path} in the bundle")
+            continue
+        entries[_get_bundle_key(yaml_path)] = (
+            hashlib.sha256(raw_content).hexdigest(),
+            pickle.dumps(yaml_content, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+
+    temp_path = bundle_path.with_name(f"{bundle_path.name}.tmp")
+    temp_path.write_bytes(pickle.dumps(entries, protocol=pickle.HIGHEST_PROTOCOL))
+    os.replace(temp_path, bundle_path)
+    _load_yaml_bundle.cache_clear()
+    return len(entries)
+
+
+@cache
+def _load_yaml_bundle() -> dict[str, tuple[str, bytes]]:
+    if not YAML_BUNDLE_PATH.exists():
+        return {}
+
+    try:
+        return pickle.loads(YAML_BUNDLE_PATH.read_bytes())
+    except Exception:
+        logger.warning(f"Failed to load the YAML bundle {YAML_BUNDLE_PATH}, YAML files are parsed instead")
+        return {}
+
+
+def _get_bundle_key(file_path: str | Path) -> str:
+    return os.path.relpath(os.path.abspath(file_path), YAML_BUNDLE_ROOT)
+
+
+def _get_bundled_content(file_path: str, raw_content: bytes) -> Any:
+    bundle = _load_yaml_bundle()
+    if not bundle:
+        return _NOT_BUNDLED
+
+    entry = bundle.get(_get_bundle_key(file_path))
+    if not entry or entry[0] != hashlib.sha256(raw_content).hexdigest():
+        return _NOT_BUNDLED
+
+    # unpickled on every read, callers get their own copy to modify
+    return pickle.loads(entry[1])
@@ -1,11 +1,14 @@
+import threading
 import uuid
 from collections import defaultdict
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping
+from concurrent.futures import Future
 from typing import Any, Optional, cast
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from configs import dify_config
+from core.helper.lru_cache import ThreadSafeLRUCache
 from core.workflow.graph_engine.entities.run_condition import RunCondition
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.answer.answer_stream_generate_router import AnswerStreamGeneratorRouter
@@ -53,6 +56,8 @@ class Graph(BaseModel):
     answer_stream_generate_routes: AnswerStreamGenerateRoute = Field(..., description="answer stream generate routes")
     end_stream_param: EndStreamParam = Field(..., description="end stream param")
 
+    _compiled_graph: Optional["CompiledGraph"] = PrivateAttr(default=None)
+
     @classmethod
     def init(cls, graph_config: Mapping[str, Any], root_node_id: Optional[str] = None) -> "Graph":
         """
@@ -204,6 +209,21 @@ class Graph(BaseModel):
 
         return graph
 
+    def init_sub_graph(self, graph_config: Mapping[str, Any], root_node_id: str) -> "Graph":
+        """
+        Init the graph starting from another root node of the same graph config, e.g. the graph of an iteration.
+        The graph is reused when this graph is compiled from the same config.
+
+        :param graph_config: graph config
+        :param root_node_id: root node id
+        :return: graph
+        """
+        # node init params hold a copy of the config, compare by value, the nested lists are shared so it is cheap
+        if self._compiled_graph is not None and self._compiled_graph.graph_config == graph_config:
+            return self._compiled_graph.get_graph(root_node_id)
+
+        return Graph.init(graph_config=graph_config, root_node_id=root_node_id)
+
     def add_extra_edge(
         self, source_node_id: str, target_node_id: str, run_condition: Optional[RunCondition] = None
     ) -> None:
@@ -717,3 +737,102 @@ class Graph(BaseModel):
                 return True
 
         return False
+
+
+class CompiledGraph:
+    """
+    Graph config of a workflow parsed once, with the graphs initialized from it memoized by root node id.
+
+    Compiled graphs are shared by all runs of the same graph in the process,
+    neither the graph config nor the graphs may be mutated.
+    """
+
+    def __init__(self, graph_config: Mapping[str, Any], graph: Graph) -> None:
+        self.graph_config = graph_config
+        self._lock = threading.Lock()
+        self._graphs: dict[str, Graph] = {}
+        self._add_graph(graph)
+        self.graph = graph
+
+    def get_graph(self, root_node_id: str) -> Graph:
+        """
+        Get the graph starting from the root node, initialized on first use
+
+        :param root_node_id: root node id
+        :return: graph
+        """
+        graph = self._graphs.get(root_node_id)
+        if graph is None:
+            with self._lock:
+                graph = self._graphs.get(root_node_id)
+                if graph is None:
+                    graph = Graph.init(graph_config=self.graph_config, root_node_id=root_node_id)
+                    self._add_graph(graph)
+        return graph
+
+    def _add_graph(self, graph: Graph) -> None:
+        graph._compiled_graph = self
+        self._graphs[graph.root_node_id] = graph
+
+
+class CompiledGraphCache:
+    """
+    Process wide LRU cache of compiled graphs keyed by the hash of the graph config.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._cache = ThreadSafeLRUCache(capacity)
+        self._lock = threading.Lock()
+        # graphs being compiled by hash, later callers of the same hash wait for the first one
+        self._compiling: dict[str, Future[CompiledGraph]] = {}
+
+    def get_or_compile(self, graph_hash: str, compile_graph: Callable[[], CompiledGraph]) -> CompiledGraph:
+        """
+        Get the compiled graph of the hash, compiling it once if it is not cached
+
+        :param graph_hash: hash of the graph config
+        :param compile_graph: compiles the graph on a cache miss
+        :return: compiled graph
+        """
+        if not self._capacity:
+            return compile_graph()
+
+        compiled_graph = self._cache.get(graph_hash)
+        if compiled_graph is not None:
+            return compiled_graph
+
+        with self._lock:
+            compiled_graph = self._cache.get(graph_hash)
+            if compiled_graph is not None:
+                return compiled_graph
+            future = self._compiling.get(graph_hash)
+            if future is None:
+                future = self._compiling[graph_hash] = Future()
+                compiling = True
+            else:
+                compiling = False
+
+        if not compiling:
+            return future.result()
+
+        # compiled out of the lock, graphs of other hashes are compiled at the same time
+        try:
+            compiled_graph = compile_graph()
+        except Exception as e:
+            with self._lock:
+                del self._compiling[graph_hash]
+            future.set_exception(e)
+            raise
+
+        self._cache.put(graph_hash, compiled_graph)
+        with self._lock:
+            del self._compiling[graph_hash]
+        future.set_result(compiled_graph)
+        return compiled_graph
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+compiled_graph_cache = CompiledGraphCache(dify_config.WORKFLOW_GRAPH_CACHE_SIZE)
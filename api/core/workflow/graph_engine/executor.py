@@ -0,0 +1,180 @@
+import os
+import threading
+from collections import defaultdict, deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from configs import dify_config
+
+
+class _Task:
+    def __init__(self, pool: "GraphEngineThreadPool", fn: Callable, args: tuple, kwargs: dict) -> None:
+        self.pool = pool
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+
+
+class GraphEngineExecutor:
+    """
+    Process wide executor running the parallel branches and parallel iterations of all workflow runs.
+
+    Threads are shared by all runs, the number of running tasks is limited globally, per tenant and per run.
+    Tasks over a limit are queued when they are submitted by the thread of a run. Tasks submitted by a task
+    already running on the executor run inline instead, so tasks waiting for their sub tasks can never hold
+    all the threads while the sub tasks wait for one.
+    """
+
+    def __init__(self, max_workers: int, max_workers_per_tenant: int) -> None:
+        self.max_workers = max_workers
+        self.max_workers_per_tenant = max_workers_per_tenant
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid: Optional[int] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._active_count = 0
+        self._tenant_active_counts: defaultdict[str, int] = defaultdict(int)
+        self._pending: deque[_Task] = deque()
+
+    def submit(self, pool: "GraphEngineThreadPool", fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        """
+        Submit a task of a run
+        :param pool: thread pool of the run
+        :param fn: task function
+        :return: future of the task
+        """
+        task = _Task(pool, fn, args, kwargs)
+        with self._lock:
+            self._check_pid()
+            if self._has_capacity(pool):
+                self._start(task)
+                return task.future
+
+            if not getattr(self._local, "in_worker", False):
+                self._pending.append(task)
+                return task.future
+
+        self._run(task)
+        return task.future
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Running and queued tasks of this process
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active_tasks": self._active_count,
+                "queued_tasks": len(self._pending),
+                "active_tasks_by_tenant": dict(self._tenant_active_counts),
+            }
+
+    def _has_capacity(self, pool: "GraphEngineThreadPool") -> bool:
+        if self._active_count >= self.max_workers:
+            return False
+        if pool.tenant_id and self._tenant_active_counts.get(pool.tenant_id, 0) >= self.max_workers_per_tenant:
+            return False
+        return pool.active_count < pool.max_workers
+
+    def _start(self, task: _Task) -> None:
+        self._active_count += 1
+        if task.pool.tenant_id:
+            self._tenant_active_counts[task.pool.tenant_id] += 1
+        task.pool.active_count += 1
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="GraphEngine")
+        self._executor.submit(self._run_worker, task)
+
+    def _release(self, task: _Task) -> None:
+        with self._lock:
+            self._active_count -= 1
+            tenant_id = task.pool.tenant_id
+            if tenant_id:
+                self._tenant_active_counts[tenant_id] -= 1
+                if not self._tenant_active_counts[tenant_id]:
+                    del self._tenant_active_counts[tenant_id]
+            task.pool.active_count -= 1
+
+            # start the queued tasks the released slot makes room for, in submission order
+            pending: deque[_Task] = deque()
+            while self._pending:
+                pending_task = self._pending.popleft()
+                if pending_task.future.cancelled():
+                    continue
+                if self._has_capacity(pending_task.pool):
+                    self._start(pending_task)
+                else:
+                    pending.append(pending_task)
+            self._pending = pending
+
+    def _run_worker(self, task: _Task) -> None:
+        self._local.in_worker = True
+        try:
+            self._run(task)
+        finally:
+            self._release(task)
+
+    @staticmethod
+    def _run(task: _Task) -> None:
+        if not task.future.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = task.fn(*task.args, **task.kwargs)
+        except BaseException as e:
+            task.future.set_exception(e)
+        else:
+            task.future.set_result(result)
+
+    def _check_pid(self) -> None:
+        # threads do not survive a fork, forked workers start with an empty executor
+        if self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._executor = None
+        self._active_count = 0
+        self._tenant_active_counts.clear()
+        self._pending.clear()
+
+
+graph_engine_executor = GraphEngineExecutor(
+    max_workers=dify_config.WORKFLOW_EXECUTOR_MAX_WORKERS,
+    max_workers_per_tenant=dify_config.WORKFLOW_EXECUTOR_MAX_WORKERS_PER_TENANT,
+)
+
+
+class GraphEngineThreadPool:
+    """
+    Thread pool of a workflow run, submits the tasks of the run to the process wide executor.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 10,
+        max_submit_count: int = dify_config.MAX_SUBMIT_COUNT,
+        tenant_id: Optional[str] = None,
+        executor: Optional[GraphEngineExecutor] = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_submit_count = max_submit_count
+        self.submit_count = 0
+        self.tenant_id = tenant_id
+        self.active_count = 0
+        self.executor = executor or graph_engine_executor
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        self.submit_count += 1
+        self.check_is_full()
+
+        return self.executor.submit(self, fn, *args, **kwargs)
+
+    def task_done_callback(self, future):
+        self.submit_count -= 1
+
+    def check_is_full(self) -> None:
+        if self.submit_count > self.max_submit_count:
+            raise ValueError(f"Max submit count {self.max_submit_count} of workflow thread pool reached.")
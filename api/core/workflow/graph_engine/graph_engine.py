@@ -3,7 +3,7 @@ import queue
 import time
 import uuid
 from collections.abc import Generator, Mapping
-from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import wait
 from copy import copy, deepcopy
 from datetime import UTC, datetime
 from typing import Any, Optional, cast
@@ -38,6 +38,7 @@ from core.workflow.graph_engine.entities.graph import Graph, GraphEdge
 from core.workflow.graph_engine.entities.graph_init_params import GraphInitParams
 from core.workflow.graph_engine.entities.graph_runtime_state import GraphRuntimeState
 from core.workflow.graph_engine.entities.runtime_route_state import RouteNodeState
+from core.workflow.graph_engine.executor import GraphEngineThreadPool
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.answer.answer_stream_processor import AnswerStreamProcessor
 from core.workflow.nodes.answer.base_stream_processor import StreamProcessor
@@ -54,33 +55,6 @@ from models.workflow import WorkflowNodeExecutionStatus, WorkflowType
 logger = logging.getLogger(__name__)
 
 
-class GraphEngineThreadPool(ThreadPoolExecutor):
-    def __init__(
-        self,
-        max_workers=None,
-        thread_name_prefix="",
-        initializer=None,
-        initargs=(),
-        max_submit_count=dify_config.MAX_SUBMIT_COUNT,
-    ) -> None:
-        super().__init__(max_workers, thread_name_prefix, initializer, initargs)
-        self.max_submit_count = max_submit_count
-        self.submit_count = 0
-
-    def submit(self, fn, /, *args, **kwargs):
-        self.submit_count += 1
-        self.check_is_full()
-
-        return super().submit(fn, *args, **kwargs)
-
-    def task_done_callback(self, future):
-        self.submit_count -= 1
-
-    def check_is_full(self) -> None:
-        if self.submit_count > self.max_submit_count:
-            raise ValueError(f"Max submit count {self.max_submit_count} of workflow thread pool reached.")
-
-
 class GraphEngine:
     workflow_thread_pool_mapping: dict[str, GraphEngineThreadPool] = {}
 
@@ -114,7 +88,9 @@ class GraphEngine:
             self.is_main_thread_pool = False
         else:
             self.thread_pool = GraphEngineThreadPool(
-                max_workers=thread_pool_max_workers, max_submit_count=thread_pool_max_submit_count
+                max_workers=thread_pool_max_workers,
+                max_submit_count=thread_pool_max_submit_count,
+                tenant_id=tenant_id,
             )
             self.thread_pool_id = str(uuid.uuid4())
             self.is_main_thread_pool = True
@@ -107,7 +107,7 @@ class IterationNode(BaseNode[IterationNodeData]):
         root_node_id = self.node_data.start_node_id
 
         # init graph
-        iteration_graph = Graph.init(graph_config=graph_config, root_node_id=root_node_id)
+        iteration_graph = self.graph.init_sub_graph(graph_config=graph_config, root_node_id=root_node_id)
 
         if not iteration_graph:
             raise IterationGraphNotFoundError("iteration graph not found")
@@ -119,7 +119,8 @@ class IterationNode(BaseNode[IterationNodeData]):
         variable_pool.add([self.node_id, "item"], iterator_list_value[0])
 
         # init graph engine
-        from core.workflow.graph_engine.graph_engine import GraphEngine, GraphEngineThreadPool
+        from core.workflow.graph_engine.executor import GraphEngineThreadPool
+        from core.workflow.graph_engine.graph_engine import GraphEngine
 
         graph_engine = GraphEngine(
             tenant_id=self.tenant_id,
@@ -167,7 +168,9 @@ class IterationNode(BaseNode[IterationNodeData]):
                 futures: list[Future] = []
                 q: Queue = Queue()
                 thread_pool = GraphEngineThreadPool(
-                    max_workers=self.node_data.parallel_nums, max_submit_count=dify_config.MAX_SUBMIT_COUNT
+                    max_workers=self.node_data.parallel_nums,
+                    max_submit_count=dify_config.MAX_SUBMIT_COUNT,
+                    tenant_id=self.tenant_id,
                 )
                 for index, item in enumerate(iterator_list_value):
                     future: Future = thread_pool.submit(
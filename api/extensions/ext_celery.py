@@ -70,6 +70,8 @@ def init_app(app: DifyApp) -> Celery:
         "schedule.update_tidb_serverless_status_task",
         "schedule.clean_messages",
         "schedule.mail_clean_document_notify_task",
+        "schedule.update_dataset_available_count_task",
+        "schedule.flush_retrieval_log_task",
     ]
     day = dify_config.CELERY_BEAT_SCHEDULER_TIME
     beat_schedule = {
@@ -89,6 +91,14 @@ def init_app(app: DifyApp) -> Celery:
             "task": "schedule.update_tidb_serverless_status_task.update_tidb_serverless_status_task",
             "schedule": timedelta(minutes=10),
         },
+        "update_dataset_available_count_task": {
+            "task": "schedule.update_dataset_available_count_task.update_dataset_available_count_task",
+            "schedule": timedelta(minutes=10),
+        },
+        "flush_retrieval_log_task": {
+            "task": "schedule.flush_retrieval_log_task.flush_retrieval_log_task",
+            "schedule": timedelta(seconds=dify_config.RETRIEVAL_LOG_FLUSH_INTERVAL),
+        },
         "clean_messages": {
             "task": "schedule.clean_messages.clean_messages",
             "schedule": timedelta(days=day),
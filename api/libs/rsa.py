@@ -1,13 +1,23 @@
 import hashlib
+import time
 
 from Crypto.Cipher import AES
 from Crypto.PublicKey import RSA
 from Crypto.Random import get_random_bytes
 
+from configs import dify_config
+from core.helper.lru_cache import ThreadSafeLRUCache
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
 from libs import gmpy2_pkcs10aep_cipher
 
+PRIVATE_KEY_VERSION_KEY = "tenant_privkey_version:{tenant_id}"
+# the decrypted session keys memoized per private key
+SESSION_KEY_CACHE_SIZE = 256
+
+# parsed private keys per tenant id, with the version of the key pair, their expiry time and their cipher
+private_key_cache = ThreadSafeLRUCache(capacity=dify_config.TENANT_KEY_CACHE_SIZE)
+
 
 def generate_key_pair(tenant_id):
     private_key = RSA.generate(2048)
@@ -20,6 +30,10 @@ def generate_key_pair(tenant_id):
 
     storage.save(filepath, pem_private)
 
+    # drop the previous private key from the caches of all processes
+    redis_client.delete(_get_private_key_cache_key(filepath))
+    redis_client.incr(PRIVATE_KEY_VERSION_KEY.format(tenant_id=tenant_id))
+
     return pem_public.decode()
 
 
@@ -46,9 +60,29 @@ def encrypt(text, public_key):
 
 
 def get_decrypt_decoding(tenant_id):
+    cache_ttl = dify_config.TENANT_KEY_CACHE_TTL
+    if not cache_ttl:
+        return _load_decrypt_decoding(tenant_id)
+
+    # the version changes with the key pair of the tenant, in any process
+    key_version = redis_client.get(PRIVATE_KEY_VERSION_KEY.format(tenant_id=tenant_id))
+    cached = private_key_cache.get(tenant_id)
+    if cached:
+        cached_key_version, expires_at, rsa_key, cipher_rsa = cached
+        if cached_key_version == key_version and expires_at > time.monotonic():
+            return rsa_key, cipher_rsa
+
+    expires_at = time.monotonic() + cache_ttl
+    rsa_key, cipher_rsa = _load_decrypt_decoding(tenant_id)
+    cipher_rsa = SessionKeyMemoCipher(cipher_rsa, expires_at)
+    private_key_cache.put(tenant_id, (key_version, expires_at, rsa_key, cipher_rsa))
+    return rsa_key, cipher_rsa
+
+
+def _load_decrypt_decoding(tenant_id):
     filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
 
-    cache_key = "tenant_privkey:{hash}".format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+    cache_key = _get_private_key_cache_key(filepath)
     private_key = redis_client.get(cache_key)
     if not private_key:
         try:
@@ -64,6 +98,40 @@ def get_decrypt_decoding(tenant_id):
     return rsa_key, cipher_rsa
 
 
+def _get_private_key_cache_key(filepath):
+    return "tenant_privkey:{hash}".format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+
+
+class SessionKeyMemoCipher:
+    """
+    Wraps the OAEP cipher of a cached private key and memoizes what it decrypts, the AES session keys of hybrid
+    encrypted credentials, by the hash of their ciphertext until the cached private key expires.
+    """
+
+    def __init__(self, cipher_rsa, expires_at: float):
+        """
+        :param cipher_rsa: OAEP cipher of the private key
+        :param expires_at: monotonic time the private key expires in the cache
+        """
+        self._cipher_rsa = cipher_rsa
+        self._expires_at = expires_at
+        self._decrypted = ThreadSafeLRUCache(capacity=SESSION_KEY_CACHE_SIZE)
+
+    def decrypt(self, ciphertext):
+        if self._expires_at <= time.monotonic():
+            return self._cipher_rsa.decrypt(ciphertext)
+
+        ciphertext_hash = hashlib.sha256(ciphertext).digest()
+        plaintext = self._decrypted.get(ciphertext_hash)
+        if plaintext is None:
+            plaintext = self._cipher_rsa.decrypt(ciphertext)
+            self._decrypted.put(ciphertext_hash, plaintext)
+        return plaintext
+
+    def __getattr__(self, name):
+        return getattr(self._cipher_rsa, name)
+
+
 def decrypt_token_with_decoding(encrypted_text, rsa_key, cipher_rsa):
     if encrypted_text.startswith(prefix_hybrid):
         encrypted_text = encrypted_text[len(prefix_hybrid) :]
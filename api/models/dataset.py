@@ -11,10 +11,13 @@ import time
 from json import JSONDecodeError
 from typing import Any, cast
 
+import numpy as np
 from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import JSONB
 
 from configs import dify_config
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
+from core.rag.embedding.embedding_codec import decode_embedding, encode_embedding, is_compact_embedding
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from extensions.ext_storage import storage
 from services.entities.knowledge_entities.knowledge_entities import ParentMode, Rule
@@ -108,6 +111,25 @@ class Dataset(db.Model):  # type: ignore[name-defined]
 
     @property
     def available_document_count(self):
+        return self.available_counts[0]
+
+    @property
+    def available_segment_count(self):
+        return self.available_counts[1]
+
+    @property
+    def available_counts(self) -> tuple[int, int]:
+        """
+        Available document and segment counts, cached until the documents or segments of the dataset change.
+        """
+        cache = DatasetAvailableCountCache(self.id)
+        counts = cache.get()
+        if counts is None:
+            counts = (self.count_available_documents(), self.count_available_segments())
+            cache.set(*counts)
+        return counts
+
+    def count_available_documents(self) -> int:
         return (
             db.session.query(func.count(Document.id))
             .filter(
@@ -119,8 +141,7 @@ class Dataset(db.Model):  # type: ignore[name-defined]
             .scalar()
         )
 
-    @property
-    def available_segment_count(self):
+    def count_available_segments(self) -> int:
         return (
             db.session.query(func.count(DocumentSegment.id))
             .filter(
@@ -748,6 +769,21 @@ class DatasetKeywordTable(db.Model):  # type: ignore[name-defined]
                 return None
 
 
+class DatasetKeywordIndex(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "dataset_keyword_indexes"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="dataset_keyword_index_pkey"),
+        db.UniqueConstraint("dataset_id", "keyword", "index_node_id", name="dataset_keyword_index_keyword_node_idx"),
+        db.Index("dataset_keyword_index_node_idx", "dataset_id", "index_node_id"),
+    )
+
+    id = db.Column(StringUUID, primary_key=True, server_default=db.text("uuid_generate_v4()"))
+    dataset_id = db.Column(StringUUID, nullable=False)
+    keyword = db.Column(db.String(255), nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.text("CURRENT_TIMESTAMP(0)"))
+
+
 class Embedding(db.Model):  # type: ignore[name-defined]
     __tablename__ = "embeddings"
     __table_args__ = (
@@ -766,11 +802,19 @@ class Embedding(db.Model):  # type: ignore[name-defined]
     provider_name = db.Column(db.String(255), nullable=False, server_default=db.text("''::character varying"))
 
     def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+        self.embedding = encode_embedding(embedding_data, dify_config.EMBEDDING_CACHE_STORAGE_DTYPE)
 
     def get_embedding(self) -> list[float]:
+        if is_compact_embedding(self.embedding):
+            return cast(list[float], decode_embedding(self.embedding).tolist())
+        # rows written before the compact format were pickled float lists
         return cast(list[float], pickle.loads(self.embedding))
 
+    def get_embedding_array(self) -> np.ndarray:
+        if is_compact_embedding(self.embedding):
+            return decode_embedding(self.embedding)
+        return np.array(pickle.loads(self.embedding))
+
 
 class DatasetCollectionBinding(db.Model):  # type: ignore[name-defined]
     __tablename__ = "dataset_collection_bindings"
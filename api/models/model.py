@@ -22,6 +22,7 @@ from models.workflow import WorkflowRunStatus
 
 from .account import Account, Tenant
 from .engine import db
+from .prefetch import prefetchable_property
 from .types import StringUUID
 
 if TYPE_CHECKING:
@@ -285,7 +286,7 @@ class AppModelConfig(db.Model):  # type: ignore[name-defined]
     def retriever_resource_dict(self) -> dict:
         return json.loads(self.retriever_resource) if self.retriever_resource else {"enabled": True}
 
-    @property
+    @prefetchable_property
     def annotation_reply_dict(self) -> dict:
         annotation_setting = (
             db.session.query(AppAnnotationSetting).filter(AppAnnotationSetting.app_id == self.app_id).first()
@@ -620,9 +621,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
                 else:
                     model_config["configs"] = override_model_configs
             else:
-                app_model_config = (
-                    db.session.query(AppModelConfig).filter(AppModelConfig.id == self.app_model_config_id).first()
-                )
+                app_model_config = self.app_model_config
                 if app_model_config:
                     model_config = app_model_config.to_dict()
 
@@ -631,6 +630,10 @@ class Conversation(db.Model):  # type: ignore[name-defined]
 
         return model_config
 
+    @prefetchable_property
+    def app_model_config(self) -> Optional["AppModelConfig"]:
+        return db.session.query(AppModelConfig).filter(AppModelConfig.id == self.app_model_config_id).first()
+
     @property
     def summary_or_query(self):
         if self.summary:
@@ -642,19 +645,19 @@ class Conversation(db.Model):  # type: ignore[name-defined]
             else:
                 return ""
 
-    @property
+    @prefetchable_property
     def annotated(self):
         return db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id == self.id).count() > 0
 
-    @property
+    @prefetchable_property
     def annotation(self):
         return db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id == self.id).first()
 
-    @property
+    @prefetchable_property
     def message_count(self):
         return db.session.query(Message).filter(Message.conversation_id == self.id).count()
 
-    @property
+    @prefetchable_property
     def user_feedback_stats(self):
         like = (
             db.session.query(MessageFeedback)
@@ -678,7 +681,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
 
         return {"like": like, "dislike": dislike}
 
-    @property
+    @prefetchable_property
     def admin_feedback_stats(self):
         like = (
             db.session.query(MessageFeedback)
@@ -702,7 +705,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
 
         return {"like": like, "dislike": dislike}
 
-    @property
+    @prefetchable_property
     def status_count(self):
         messages = db.session.query(Message).filter(Message.conversation_id == self.id).all()
         status_counts = {
@@ -727,7 +730,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
             else None
         )
 
-    @property
+    @prefetchable_property
     def first_message(self):
         return db.session.query(Message).filter(Message.conversation_id == self.id).first()
 
@@ -735,7 +738,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
     def app(self):
         return db.session.query(App).filter(App.id == self.app_id).first()
 
-    @property
+    @prefetchable_property
     def from_end_user_session_id(self):
         if self.from_end_user_id:
             end_user = db.session.query(EndUser).filter(EndUser.id == self.from_end_user_id).first()
@@ -744,7 +747,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
 
         return None
 
-    @property
+    @prefetchable_property
     def from_account_name(self):
         if self.from_account_id:
             account = db.session.query(Account).filter(Account.id == self.from_account_id).first()
@@ -911,7 +914,7 @@ class Message(db.Model):  # type: ignore[name-defined]
 
         return re_sign_file_url_answer
 
-    @property
+    @prefetchable_property
     def user_feedback(self):
         feedback = (
             db.session.query(MessageFeedback)
@@ -920,7 +923,7 @@ class Message(db.Model):  # type: ignore[name-defined]
         )
         return feedback
 
-    @property
+    @prefetchable_property
     def admin_feedback(self):
         feedback = (
             db.session.query(MessageFeedback)
@@ -929,17 +932,17 @@ class Message(db.Model):  # type: ignore[name-defined]
         )
         return feedback
 
-    @property
+    @prefetchable_property
     def feedbacks(self):
         feedbacks = db.session.query(MessageFeedback).filter(MessageFeedback.message_id == self.id).all()
         return feedbacks
 
-    @property
+    @prefetchable_property
     def annotation(self):
         annotation = db.session.query(MessageAnnotation).filter(MessageAnnotation.message_id == self.id).first()
         return annotation
 
-    @property
+    @prefetchable_property
     def annotation_hit_history(self):
         annotation_history = (
             db.session.query(AppAnnotationHitHistory).filter(AppAnnotationHitHistory.message_id == self.id).first()
@@ -971,7 +974,7 @@ class Message(db.Model):  # type: ignore[name-defined]
     def message_metadata_dict(self) -> dict:
         return json.loads(self.message_metadata) if self.message_metadata else {}
 
-    @property
+    @prefetchable_property
     def agent_thoughts(self):
         return (
             db.session.query(MessageAgentThought)
@@ -980,7 +983,7 @@ class Message(db.Model):  # type: ignore[name-defined]
             .all()
         )
 
-    @property
+    @prefetchable_property
     def retriever_resources(self):
         return (
             db.session.query(DatasetRetrieverResource)
@@ -1126,7 +1129,7 @@ class MessageFeedback(db.Model):  # type: ignore[name-defined]
     created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
     updated_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
 
-    @property
+    @prefetchable_property
     def from_account(self):
         account = db.session.query(Account).filter(Account.id == self.from_account_id).first()
         return account
@@ -1193,12 +1196,12 @@ class MessageAnnotation(db.Model):  # type: ignore[name-defined]
     created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
     updated_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
 
-    @property
+    @prefetchable_property
     def account(self):
         account = db.session.query(Account).filter(Account.id == self.account_id).first()
         return account
 
-    @property
+    @prefetchable_property
     def annotation_create_account(self):
         account = db.session.query(Account).filter(Account.id == self.account_id).first()
         return account
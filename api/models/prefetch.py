@@ -0,0 +1,35 @@
+import functools
+from collections.abc import Callable
+from typing import Any
+
+_PREFETCHED_VALUES_KEY = "_prefetched_values"
+
+
+def prefetchable_property(getter: Callable[[Any], Any]) -> property:
+    """
+    Property whose value can be prefetched for a page of rows with set_prefetched,
+    the getter only runs its own queries when no value was prefetched.
+
+    :param getter: property getter
+    :return: property
+    """
+
+    @functools.wraps(getter)
+    def wrapper(self):
+        prefetched_values = self.__dict__.get(_PREFETCHED_VALUES_KEY)
+        if prefetched_values is not None and getter.__name__ in prefetched_values:
+            return prefetched_values[getter.__name__]
+        return getter(self)
+
+    return property(wrapper)
+
+
+def set_prefetched(instance: Any, **values: Any) -> None:
+    """
+    Set prefetched values of the prefetchable properties of a row. The values live on the instance,
+    so they last as long as the session the row was loaded in, that is the request.
+
+    :param instance: model instance
+    :param values: property values by property name
+    """
+    instance.__dict__.setdefault(_PREFETCHED_VALUES_KEY, {}).update(values)
@@ -213,6 +213,15 @@ class Workflow(db.Model):  # type: ignore[name-defined]
 
         return variables
 
+    @property
+    def graph_hash(self) -> str:
+        """
+        Get hash of the raw graph, identifies the graph without parsing it.
+
+        :return: hash
+        """
+        return helper.generate_text_hash(self.graph or "")
+
     @property
     def unique_hash(self) -> str:
         """
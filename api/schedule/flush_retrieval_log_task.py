@@ -0,0 +1,26 @@
+import time
+
+import click
+
+import app
+from core.rag.retrieval.retrieval_log_buffer import RetrievalLogBuffer
+
+
+@app.celery.task(queue="dataset")
+def flush_retrieval_log_task():
+    start_at = time.perf_counter()
+    try:
+        segment_count, query_count = RetrievalLogBuffer.flush()
+    except Exception as e:
+        click.echo(click.style(f"Error: {e}", fg="red"))
+        return
+
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            "Flushed hit counts of {} segments and {} dataset queries latency: {}".format(
+                segment_count, query_count, end_at - start_at
+            ),
+            fg="green",
+        )
+    )
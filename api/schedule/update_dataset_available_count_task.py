@@ -0,0 +1,69 @@
+import time
+
+import click
+from sqlalchemy import func
+
+import app
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import Document, DocumentSegment
+
+
+@app.celery.task(queue="dataset")
+def update_dataset_available_count_task():
+    click.echo(click.style("Start update dataset available counts.", fg="green"))
+    start_at = time.perf_counter()
+    dataset_ids = [
+        dataset_id.decode("utf-8") for dataset_id in redis_client.smembers(DatasetAvailableCountCache.DATASET_IDS_KEY)
+    ]
+    updated_count = 0
+    try:
+        # batch 500
+        for i in range(0, len(dataset_ids), 500):
+            updated_count += update_available_counts(dataset_ids[i : i + 500])
+    except Exception as e:
+        click.echo(click.style(f"Error: {e}", fg="red"))
+
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            "Updated available counts of {} datasets latency: {}".format(updated_count, end_at - start_at), fg="green"
+        )
+    )
+
+
+def update_available_counts(dataset_ids: list[str]) -> int:
+    """
+    Count the available documents and segments of the datasets again, correcting the cached counts.
+    :param dataset_ids: dataset ids
+    :return: number of updated datasets
+    """
+    document_counts = dict(
+        db.session.query(Document.dataset_id, func.count(Document.id))
+        .filter(
+            Document.dataset_id.in_(dataset_ids),
+            Document.indexing_status == "completed",
+            Document.enabled == True,
+            Document.archived == False,
+        )
+        .group_by(Document.dataset_id)
+        .all()
+    )
+    segment_counts = dict(
+        db.session.query(DocumentSegment.dataset_id, func.count(DocumentSegment.id))
+        .filter(
+            DocumentSegment.dataset_id.in_(dataset_ids),
+            DocumentSegment.status == "completed",
+            DocumentSegment.enabled == True,
+        )
+        .group_by(DocumentSegment.dataset_id)
+        .all()
+    )
+
+    updated_count = 0
+    for dataset_id in dataset_ids:
+        cache = DatasetAvailableCountCache(dataset_id)
+        if cache.update(document_counts.get(dataset_id, 0), segment_counts.get(dataset_id, 0)):
+            updated_count += 1
+    return updated_count
@@ -0,0 +1,262 @@
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Sequence
+from typing import Optional
+
+from sqlalchemy import func
+
+from extensions.ext_database import db
+from models.account import Account
+from models.model import (
+    AppAnnotationHitHistory,
+    AppModelConfig,
+    Conversation,
+    DatasetRetrieverResource,
+    EndUser,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageFeedback,
+)
+from models.prefetch import set_prefetched
+from models.workflow import WorkflowRun, WorkflowRunStatus
+
+
+class BatchLoadService:
+    """
+    Prefetches the query backed properties of a page of conversations or messages with one grouped query
+    per property instead of queries per row, so that serializing the page does not query the database row by row.
+    """
+
+    @classmethod
+    def load_conversations(cls, conversations: Sequence[Conversation]) -> None:
+        """
+        Prefetch message counts, status counts, first messages, feedback stats, annotations, end user session ids,
+        account names and app model configs of conversations.
+
+        :param conversations: conversations of a page
+        """
+        if not conversations:
+            return
+
+        conversation_ids = [conversation.id for conversation in conversations]
+
+        message_counts: Counter[str] = Counter()
+        status_counts: defaultdict[str, Counter[str]] = defaultdict(Counter)
+        for conversation_id, status, count in (
+            db.session.query(Message.conversation_id, WorkflowRun.status, func.count(Message.id))
+            .outerjoin(WorkflowRun, WorkflowRun.id == Message.workflow_run_id)
+            .filter(Message.conversation_id.in_(conversation_ids))
+            .group_by(Message.conversation_id, WorkflowRun.status)
+            .all()
+        ):
+            message_counts[conversation_id] += count
+            if status:
+                status_counts[conversation_id][status] += count
+
+        first_messages = {message.conversation_id: message for message in cls._get_first_messages(conversation_ids)}
+
+        feedback_counts: Counter[tuple[str, str, str]] = Counter()
+        for conversation_id, from_source, rating, count in (
+            db.session.query(
+                MessageFeedback.conversation_id,
+                MessageFeedback.from_source,
+                MessageFeedback.rating,
+                func.count(MessageFeedback.id),
+            )
+            .filter(MessageFeedback.conversation_id.in_(conversation_ids))
+            .group_by(MessageFeedback.conversation_id, MessageFeedback.from_source, MessageFeedback.rating)
+            .all()
+        ):
+            feedback_counts[(conversation_id, from_source, rating)] = count
+
+        annotations: dict[str, MessageAnnotation] = {}
+        for annotation in (
+            db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id.in_(conversation_ids)).all()
+        ):
+            annotations.setdefault(annotation.conversation_id, annotation)
+
+        end_user_ids = {
+            conversation.from_end_user_id for conversation in conversations if conversation.from_end_user_id
+        }
+        end_user_session_ids: dict[str, str] = {}
+        if end_user_ids:
+            end_user_session_ids = dict(
+                db.session.query(EndUser.id, EndUser.session_id).filter(EndUser.id.in_(end_user_ids)).all()
+            )
+
+        accounts = cls._get_accounts(
+            [conversation.from_account_id for conversation in conversations]
+            + [annotation.account_id for annotation in annotations.values()]
+        )
+        cls._set_annotation_accounts(annotations.values(), accounts)
+
+        app_model_configs = cls._get_app_model_configs(
+            {conversation.app_model_config_id for conversation in conversations if conversation.app_model_config_id}
+        )
+
+        for conversation in conversations:
+            from_account = accounts.get(conversation.from_account_id) if conversation.from_account_id else None
+            set_prefetched(
+                conversation,
+                message_count=message_counts[conversation.id],
+                status_count=(
+                    {
+                        "success": status_counts[conversation.id][WorkflowRunStatus.SUCCEEDED],
+                        "failed": status_counts[conversation.id][WorkflowRunStatus.FAILED],
+                        "partial_success": status_counts[conversation.id][WorkflowRunStatus.PARTIAL_SUCCESSED],
+                    }
+                    if message_counts[conversation.id]
+                    else None
+                ),
+                first_message=first_messages.get(conversation.id),
+                user_feedback_stats={
+                    "like": feedback_counts[(conversation.id, "user", "like")],
+                    "dislike": feedback_counts[(conversation.id, "user", "dislike")],
+                },
+                admin_feedback_stats={
+                    "like": feedback_counts[(conversation.id, "admin", "like")],
+                    "dislike": feedback_counts[(conversation.id, "admin", "dislike")],
+                },
+                annotated=conversation.id in annotations,
+                annotation=annotations.get(conversation.id),
+                from_end_user_session_id=(
+                    end_user_session_ids.get(conversation.from_end_user_id) if conversation.from_end_user_id else None
+                ),
+                from_account_name=from_account.name if from_account else None,
+                app_model_config=(
+                    app_model_configs.get(conversation.app_model_config_id)
+                    if conversation.app_model_config_id
+                    else None
+                ),
+            )
+
+    @classmethod
+    def load_messages(cls, messages: Sequence[Message]) -> None:
+        """
+        Prefetch feedbacks, annotations, annotation hit histories, agent thoughts and retriever resources of messages.
+
+        :param messages: messages of a page
+        """
+        if not messages:
+            return
+
+        message_ids = [message.id for message in messages]
+
+        feedbacks: defaultdict[str, list[MessageFeedback]] = defaultdict(list)
+        for feedback in db.session.query(MessageFeedback).filter(MessageFeedback.message_id.in_(message_ids)).all():
+            feedbacks[feedback.message_id].append(feedback)
+
+        annotations: dict[str, MessageAnnotation] = {}
+        for annotation in (
+            db.session.query(MessageAnnotation).filter(MessageAnnotation.message_id.in_(message_ids)).all()
+        ):
+            annotations.setdefault(annotation.message_id, annotation)
+
+        hit_annotations: dict[str, MessageAnnotation] = {}
+        for message_id, annotation in (
+            db.session.query(AppAnnotationHitHistory.message_id, MessageAnnotation)
+            .join(MessageAnnotation, MessageAnnotation.id == AppAnnotationHitHistory.annotation_id)
+            .filter(AppAnnotationHitHistory.message_id.in_(message_ids))
+            .all()
+        ):
+            hit_annotations.setdefault(message_id, annotation)
+
+        agent_thoughts: defaultdict[str, list[MessageAgentThought]] = defaultdict(list)
+        for agent_thought in (
+            db.session.query(MessageAgentThought)
+            .filter(MessageAgentThought.message_id.in_(message_ids))
+            .order_by(MessageAgentThought.message_id, MessageAgentThought.position.asc())
+            .all()
+        ):
+            agent_thoughts[agent_thought.message_id].append(agent_thought)
+
+        retriever_resources: defaultdict[str, list[DatasetRetrieverResource]] = defaultdict(list)
+        for retriever_resource in (
+            db.session.query(DatasetRetrieverResource)
+            .filter(DatasetRetrieverResource.message_id.in_(message_ids))
+            .order_by(DatasetRetrieverResource.message_id, DatasetRetrieverResource.position.asc())
+            .all()
+        ):
+            retriever_resources[retriever_resource.message_id].append(retriever_resource)
+
+        all_feedbacks = [feedback for message_feedbacks in feedbacks.values() for feedback in message_feedbacks]
+        all_annotations = list(annotations.values()) + list(hit_annotations.values())
+        accounts = cls._get_accounts(
+            [feedback.from_account_id for feedback in all_feedbacks]
+            + [annotation.account_id for annotation in all_annotations]
+        )
+        for feedback in all_feedbacks:
+            set_prefetched(
+                feedback, from_account=accounts.get(feedback.from_account_id) if feedback.from_account_id else None
+            )
+        cls._set_annotation_accounts(all_annotations, accounts)
+
+        for message in messages:
+            message_feedbacks = feedbacks[message.id]
+            set_prefetched(
+                message,
+                feedbacks=message_feedbacks,
+                user_feedback=next(
+                    (feedback for feedback in message_feedbacks if feedback.from_source == "user"), None
+                ),
+                admin_feedback=next(
+                    (feedback for feedback in message_feedbacks if feedback.from_source == "admin"), None
+                ),
+                annotation=annotations.get(message.id),
+                annotation_hit_history=hit_annotations.get(message.id),
+                agent_thoughts=agent_thoughts[message.id],
+                retriever_resources=retriever_resources[message.id],
+            )
+
+    @staticmethod
+    def _get_first_messages(conversation_ids: list[str]) -> list[Message]:
+        ranked_messages = (
+            db.session.query(
+                Message.id.label("id"),
+                func.row_number()
+                .over(partition_by=Message.conversation_id, order_by=Message.created_at.asc())
+                .label("rank"),
+            )
+            .filter(Message.conversation_id.in_(conversation_ids))
+            .subquery()
+        )
+        return (
+            db.session.query(Message)
+            .join(ranked_messages, ranked_messages.c.id == Message.id)
+            .filter(ranked_messages.c.rank == 1)
+            .all()
+        )
+
+    @staticmethod
+    def _get_accounts(account_ids: Iterable[Optional[str]]) -> dict[str, Account]:
+        ids = {account_id for account_id in account_ids if account_id}
+        if not ids:
+            return {}
+        return {account.id: account for account in db.session.query(Account).filter(Account.id.in_(ids)).all()}
+
+    @staticmethod
+    def _set_annotation_accounts(annotations: Iterable[MessageAnnotation], accounts: dict[str, Account]) -> None:
+        for annotation in annotations:
+            account = accounts.get(annotation.account_id)
+            set_prefetched(annotation, account=account, annotation_create_account=account)
+
+    @staticmethod
+    def _get_app_model_configs(app_model_config_ids: set[str]) -> dict[str, AppModelConfig]:
+        if not app_model_config_ids:
+            return {}
+
+        app_model_configs = {
+            app_model_config.id: app_model_config
+            for app_model_config in db.session.query(AppModelConfig)
+            .filter(AppModelConfig.id.in_(app_model_config_ids))
+            .all()
+        }
+
+        # the annotation reply setting belongs to the app, read it once for the configs of the same app
+        annotation_reply_dicts: dict[str, dict] = {}
+        for app_model_config in app_model_configs.values():
+            if app_model_config.app_id not in annotation_reply_dicts:
+                annotation_reply_dicts[app_model_config.app_id] = app_model_config.annotation_reply_dict
+            set_prefetched(app_model_config, annotation_reply_dict=annotation_reply_dicts[app_model_config.app_id])
+
+        return app_model_configs
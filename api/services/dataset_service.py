@@ -12,6 +12,7 @@ from werkzeug.exceptions import NotFound
 
 from configs import dify_config
 from core.errors.error import LLMBadRequestError, ProviderTokenNotInitError
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.rag.index_processor.constant.index_type import IndexType
@@ -637,6 +638,7 @@ class DocumentService:
 
         db.session.delete(document)
         db.session.commit()
+        DatasetAvailableCountCache(document.dataset_id).delete()
 
     @staticmethod
     def delete_documents(dataset: Dataset, document_ids: list[str]):
@@ -651,6 +653,7 @@ class DocumentService:
         for document in documents:
             db.session.delete(document)
         db.session.commit()
+        DatasetAvailableCountCache(dataset.id).delete()
 
     @staticmethod
     def rename_document(dataset_id: str, document_id: str, name: str) -> Document:
@@ -1496,6 +1499,7 @@ class SegmentService:
                 segment_document.status = "error"
                 segment_document.error = str(e)
                 db.session.commit()
+            DatasetAvailableCountCache(document.dataset_id).delete()
             segment = db.session.query(DocumentSegment).filter(DocumentSegment.id == segment_document.id).first()
             return segment
 
@@ -1575,6 +1579,7 @@ class SegmentService:
                     segment_document.status = "error"
                     segment_document.error = str(e)
             db.session.commit()
+            DatasetAvailableCountCache(document.dataset_id).delete()
             return segment_data_list
 
     @classmethod
@@ -1592,6 +1597,7 @@ class SegmentService:
                     segment.disabled_by = current_user.id
                     db.session.add(segment)
                     db.session.commit()
+                    DatasetAvailableCountCache(segment.dataset_id).delete()
                     # Set cache to prevent indexing the same segment multiple times
                     redis_client.setex(indexing_cache_key, 600, 1)
                     disable_segment_from_index_task.delay(segment.id)
@@ -1743,6 +1749,7 @@ class SegmentService:
             segment.status = "error"
             segment.error = str(e)
             db.session.commit()
+        DatasetAvailableCountCache(segment.dataset_id).delete()
         new_segment = db.session.query(DocumentSegment).filter(DocumentSegment.id == segment.id).first()
         return new_segment
 
@@ -1763,6 +1770,7 @@ class SegmentService:
         document.word_count -= segment.word_count
         db.session.add(document)
         db.session.commit()
+        DatasetAvailableCountCache(dataset.id).delete()
 
     @classmethod
     def delete_segments(cls, segment_ids: list, document: Document, dataset: Dataset):
@@ -1781,6 +1789,7 @@ class SegmentService:
         delete_segment_from_index_task.delay(index_node_ids, dataset.id, document.id)
         db.session.query(DocumentSegment).filter(DocumentSegment.id.in_(segment_ids)).delete()
         db.session.commit()
+        DatasetAvailableCountCache(dataset.id).delete()
 
     @classmethod
     def update_segments_status(cls, segment_ids: list, action: str, dataset: Dataset, document: Document):
@@ -1809,6 +1818,7 @@ class SegmentService:
                 db.session.add(segment)
                 real_deal_segmment_ids.append(segment.id)
             db.session.commit()
+            DatasetAvailableCountCache(dataset.id).delete()
 
             enable_segments_to_index_task.delay(real_deal_segmment_ids, dataset.id, document.id)
         elif action == "disable":
@@ -1836,6 +1846,7 @@ class SegmentService:
                 db.session.add(segment)
                 real_deal_segmment_ids.append(segment.id)
             db.session.commit()
+            DatasetAvailableCountCache(dataset.id).delete()
 
             disable_segments_from_index_task.delay(real_deal_segmment_ids, dataset.id, document.id)
         else:
@@ -14,6 +14,7 @@ from extensions.ext_database import db
 from libs.infinite_scroll_pagination import InfiniteScrollPagination
 from models.account import Account
 from models.model import App, AppMode, AppModelConfig, EndUser, Message, MessageFeedback
+from services.batch_load_service import BatchLoadService
 from services.conversation_service import ConversationService
 from services.errors.conversation import ConversationCompletedError, ConversationNotExistsError
 from services.errors.message import (
@@ -94,6 +95,7 @@ class MessageService:
 
         if order == "asc":
             history_messages = list(reversed(history_messages))
+        BatchLoadService.load_messages(history_messages)
 
         return InfiniteScrollPagination(data=history_messages, limit=limit, has_more=has_more)
 
@@ -147,6 +149,8 @@ class MessageService:
             if rest_count > 0:
                 has_more = True
 
+        BatchLoadService.load_messages(history_messages)
+
         return InfiniteScrollPagination(data=history_messages, limit=limit, has_more=has_more)
 
     @classmethod
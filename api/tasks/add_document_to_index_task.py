@@ -6,6 +6,7 @@ import click
 from celery import shared_task  # type: ignore
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from core.rag.models.document import ChildDocument, Document
@@ -101,6 +102,8 @@ def add_document_to_index_task(dataset_document_id: str):
         )
         db.session.commit()
 
+        DatasetAvailableCountCache(dataset_document.dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(
             click.style(
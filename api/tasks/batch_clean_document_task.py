@@ -4,6 +4,7 @@ import time
 import click
 from celery import shared_task  # type: ignore
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from core.tools.utils.web_reader_tool import get_image_upload_file_ids
 from extensions.ext_database import db
@@ -65,6 +66,8 @@ def batch_clean_document_task(document_ids: list[str], dataset_id: str, doc_form
                 db.session.delete(file)
             db.session.commit()
 
+        DatasetAvailableCountCache(dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(
             click.style(
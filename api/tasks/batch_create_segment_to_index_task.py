@@ -7,6 +7,7 @@ import click
 from celery import shared_task  # type: ignore
 from sqlalchemy import func
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from extensions.ext_database import db
@@ -99,6 +100,9 @@ def batch_create_segment_to_index_task(
         VectorService.create_segments_vector(None, document_segments, dataset, dataset_document.doc_form)
         db.session.commit()
         redis_client.setex(indexing_cache_key, 600, "completed")
+
+        DatasetAvailableCountCache(dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(
             click.style("Segment batch created job: {} latency: {}".format(job_id, end_at - start_at), fg="green")
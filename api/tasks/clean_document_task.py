@@ -5,6 +5,7 @@ from typing import Optional
 import click
 from celery import shared_task  # type: ignore
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from core.tools.utils.web_reader_tool import get_image_upload_file_ids
 from extensions.ext_database import db
@@ -67,6 +68,8 @@ def clean_document_task(document_id: str, dataset_id: str, doc_form: str, file_i
                 db.session.delete(file)
                 db.session.commit()
 
+        DatasetAvailableCountCache(dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(
             click.style(
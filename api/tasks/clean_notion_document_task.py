@@ -4,6 +4,7 @@ import time
 import click
 from celery import shared_task  # type: ignore
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from extensions.ext_database import db
 from models.dataset import Dataset, Document, DocumentSegment
@@ -42,6 +43,9 @@ def clean_notion_document_task(document_ids: list[str], dataset_id: str):
             for segment in segments:
                 db.session.delete(segment)
         db.session.commit()
+
+        DatasetAvailableCountCache(dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(
             click.style(
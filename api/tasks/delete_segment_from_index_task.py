@@ -4,6 +4,7 @@ import time
 import click
 from celery import shared_task  # type: ignore
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from extensions.ext_database import db
 from models.dataset import Dataset, Document
@@ -37,6 +38,8 @@ def delete_segment_from_index_task(index_node_ids: list, dataset_id: str, docume
         index_processor = IndexProcessorFactory(index_type).init_index_processor()
         index_processor.clean(dataset, index_node_ids, with_keywords=True, delete_child_chunks=True)
 
+        DatasetAvailableCountCache(dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(click.style("Segment deleted from index latency: {}".format(end_at - start_at), fg="green"))
     except Exception:
@@ -5,6 +5,7 @@ import click
 from celery import shared_task  # type: ignore
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -52,6 +53,8 @@ def disable_segment_from_index_task(segment_id: str):
         index_processor = IndexProcessorFactory(index_type).init_index_processor()
         index_processor.clean(dataset, [segment.index_node_id])
 
+        DatasetAvailableCountCache(segment.dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(
             click.style("Segment removed from index: {} latency: {}".format(segment.id, end_at - start_at), fg="green")
@@ -4,6 +4,7 @@ import time
 import click
 from celery import shared_task  # type: ignore
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -54,6 +55,8 @@ def disable_segments_from_index_task(segment_ids: list, dataset_id: str, documen
         index_node_ids = [segment.index_node_id for segment in segments]
         index_processor.clean(dataset, index_node_ids, with_keywords=True, delete_child_chunks=False)
 
+        DatasetAvailableCountCache(dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(click.style("Segments removed from index latency: {}".format(end_at - start_at), fg="green"))
     except Exception:
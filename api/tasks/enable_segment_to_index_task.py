@@ -6,6 +6,7 @@ import click
 from celery import shared_task  # type: ignore
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from core.rag.models.document import ChildDocument, Document
@@ -81,6 +82,8 @@ def enable_segment_to_index_task(segment_id: str):
         # save vector index
         index_processor.load(dataset, [document])
 
+        DatasetAvailableCountCache(segment.dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(
             click.style("Segment enabled to index: {} latency: {}".format(segment.id, end_at - start_at), fg="green")
@@ -1,11 +1,13 @@
 import json
 import logging
+import time
+from collections import defaultdict
 
 from celery import shared_task  # type: ignore
 from flask import current_app
 
 from core.ops.entities.config_entity import OPS_FILE_PATH, OPS_TRACE_FAILED_KEY
-from core.ops.entities.trace_entity import trace_info_info_map
+from core.ops.entities.trace_entity import BaseTraceInfo, trace_info_info_map
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
@@ -31,20 +33,10 @@ def process_trace_tasks(file_info):
     trace_info_type = file_data.get("trace_info_type")
     trace_instance = OpsTraceManager.get_ops_trace_instance(app_id)
 
-    if trace_info.get("message_data"):
-        trace_info["message_data"] = Message.from_dict(data=trace_info["message_data"])
-    if trace_info.get("workflow_data"):
-        trace_info["workflow_data"] = WorkflowRun.from_dict(data=trace_info["workflow_data"])
-    if trace_info.get("documents"):
-        trace_info["documents"] = [Document(**doc) for doc in trace_info["documents"]]
-
     try:
         if trace_instance:
             with current_app.app_context():
-                trace_type = trace_info_info_map.get(trace_info_type)
-                if trace_type:
-                    trace_info = trace_type(**trace_info)
-                trace_instance.trace(trace_info)
+                trace_instance.trace(_build_trace_info(trace_info, trace_info_type))
         logging.info(f"Processing trace tasks success, app_id: {app_id}")
     except Exception:
         failed_key = f"{OPS_TRACE_FAILED_KEY}_{app_id}"
@@ -52,3 +44,81 @@ def process_trace_tasks(file_info):
         logging.info(f"Processing trace tasks failed, app_id: {app_id}")
     finally:
         storage.delete(file_path)
+
+
+@shared_task(queue="ops_trace")
+def process_trace_batch(file_info):
+    """
+    Async process a batch of trace tasks collected by the trace queue manager,
+    the traces of an app are sent with one trace instance and flushed once.
+    :param file_info: file id of the batch
+
+    Usage: process_trace_batch.delay(file_info)
+    """
+    from core.ops.ops_trace_manager import OpsTraceManager
+
+    file_id = file_info.get("file_id")
+    file_path = f"{OPS_FILE_PATH}batches/{file_id}.json"
+    start_at = time.perf_counter()
+    trace_count = 0
+    failed_count = 0
+    try:
+        tasks_by_app_id = defaultdict(list)
+        for task_data in json.loads(storage.load(file_path)).get("tasks", []):
+            tasks_by_app_id[task_data["app_id"]].append(task_data)
+
+        for app_id, tasks in tasks_by_app_id.items():
+            try:
+                trace_instance = OpsTraceManager.get_ops_trace_instance(app_id)
+            except Exception:
+                # the traces of the other apps of the batch are still sent
+                logging.exception(f"Getting the trace instance failed, app_id: {app_id}")
+                redis_client.incrby(f"{OPS_TRACE_FAILED_KEY}_{app_id}", len(tasks))
+                trace_count += len(tasks)
+                failed_count += len(tasks)
+                continue
+            if not trace_instance:
+                continue
+
+            app_failed_count = 0
+            with current_app.app_context():
+                for task_data in tasks:
+                    try:
+                        trace_instance.trace(_build_trace_info(task_data["trace_info"], task_data["trace_info_type"]))
+                    except Exception:
+                        logging.exception(f"Processing trace task failed, app_id: {app_id}")
+                        app_failed_count += 1
+
+                try:
+                    # the exporters send the queued traces in bulk, wait for them once per batch
+                    trace_instance.flush()
+                except Exception:
+                    logging.exception(f"Flushing traces failed, app_id: {app_id}")
+                    app_failed_count = len(tasks)
+
+            if app_failed_count:
+                redis_client.incrby(f"{OPS_TRACE_FAILED_KEY}_{app_id}", app_failed_count)
+            trace_count += len(tasks)
+            failed_count += app_failed_count
+    finally:
+        storage.delete(file_path)
+
+    elapsed = time.perf_counter() - start_at
+    logging.info(
+        f"Processing trace batch {file_id} done, {trace_count} traces, {failed_count} failed, "
+        f"latency: {elapsed:.3f}s, throughput: {trace_count / elapsed if elapsed else 0:.1f} traces/s"
+    )
+
+
+def _build_trace_info(trace_info: dict, trace_info_type: str) -> BaseTraceInfo:
+    if trace_info.get("message_data"):
+        trace_info["message_data"] = Message.from_dict(data=trace_info["message_data"])
+    if trace_info.get("workflow_data"):
+        trace_info["workflow_data"] = WorkflowRun.from_dict(data=trace_info["workflow_data"])
+    if trace_info.get("documents"):
+        trace_info["documents"] = [Document(**doc) for doc in trace_info["documents"]]
+
+    trace_type = trace_info_info_map.get(trace_info_type)
+    if trace_type:
+        return trace_type(**trace_info)
+    return trace_info  # type: ignore
@@ -6,6 +6,7 @@ import click
 from celery import shared_task  # type: ignore
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
 from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -58,6 +59,8 @@ def remove_document_from_index_task(document_id: str):
         )
         db.session.commit()
 
+        DatasetAvailableCountCache(document.dataset_id).delete()
+
         end_at = time.perf_counter()
         logging.info(
             click.style(
@@ -0,0 +1,84 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import redis
+
+from configs import dify_config
+from core.app.features.rate_limiting.rate_limit import RateLimit
+from core.errors.error import AppInvokeQuotaExceededError
+from extensions.ext_redis import redis_client
+
+CONCURRENCY = 64
+MAX_ACTIVE_REQUESTS = 10
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _redis():
+    client = redis.Redis(
+        host=dify_config.REDIS_HOST,
+        port=dify_config.REDIS_PORT,
+        username=dify_config.REDIS_USERNAME,
+        password=dify_config.REDIS_PASSWORD,
+        db=dify_config.REDIS_DB,
+    )
+    redis_client.initialize(client)
+    return client
+
+
+def _contend(enter) -> int:
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        return sum(executor.map(lambda _: enter(), range(CONCURRENCY)))
+
+
+def test_enter_never_admits_over_the_limit():
+    app_id = str(uuid.uuid4())
+    rate_limit = RateLimit(app_id, MAX_ACTIVE_REQUESTS, max_requests_per_second=0)
+
+    def enter_with_script() -> int:
+        try:
+            rate_limit.enter()
+            return 1
+        except AppInvokeQuotaExceededError:
+            return 0
+
+    # the previous admission, HLEN and HSET in separate round trips
+    legacy_key = f"dify:rate_limit:{app_id}:active_requests"
+
+    def enter_with_hlen_hset() -> int:
+        if redis_client.hlen(legacy_key) >= MAX_ACTIVE_REQUESTS:
+            return 0
+        redis_client.hset(legacy_key, RateLimit.gen_request_key(), str(time.time()))
+        return 1
+
+    try:
+        admitted = _contend(enter_with_script)
+        legacy_admitted = _contend(enter_with_hlen_hset)
+    finally:
+        redis_client.delete(rate_limit.active_requests_key, rate_limit.max_active_requests_key, legacy_key)
+
+    assert admitted == MAX_ACTIVE_REQUESTS
+    # the separate round trips race, the previous admission can only admit more
+    assert legacy_admitted >= MAX_ACTIVE_REQUESTS
+
+
+def test_token_bucket_limits_request_rate():
+    app_id = str(uuid.uuid4())
+    rate_limit = RateLimit(app_id, 0, max_requests_per_second=5, burst=5)
+
+    def enter() -> int:
+        try:
+            rate_limit.enter()
+            return 1
+        except AppInvokeQuotaExceededError:
+            return 0
+
+    try:
+        admitted = _contend(enter)
+        assert admitted == 5
+
+        time.sleep(0.5)
+        assert sum(enter() for _ in range(5)) in {2, 3}
+    finally:
+        redis_client.delete(rate_limit.request_bucket_key, rate_limit.max_active_requests_key)
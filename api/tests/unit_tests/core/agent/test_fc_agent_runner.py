@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+import contexts
+from core.agent.fc_agent_runner import FunctionCallAgentRunner
+from core.tools.entities.tool_entities import ToolInvokeMeta
+
+# latencies of the stub tools, like several web searches called in one turn
+TOOL_LATENCIES = {"search_a": 0.3, "search_b": 0.1, "search_c": 0.2, "search_d": 0.1}
+
+
+def _agent_invoke(tool, tool_parameters, **kwargs):
+    if tool.barrier:
+        # passed only once all the tool calls run at the same time
+        tool.barrier.wait(timeout=5)
+    time.sleep(tool.latency)
+    return f"{tool.name}: {tool_parameters['query']} from {contexts.tenant_id.get()}", [], ToolInvokeMeta.empty()
+
+
+@pytest.fixture
+def runner():
+    runner = FunctionCallAgentRunner.__new__(FunctionCallAgentRunner)
+    runner.user_id = "user"
+    runner.tenant_id = "tenant"
+    runner.message = MagicMock()
+    runner.application_generate_entity = MagicMock()
+    runner.agent_callback = MagicMock()
+    contexts.tenant_id.set("tenant")
+    with (
+        Flask(__name__).app_context(),
+        patch("core.agent.fc_agent_runner.ToolEngine.agent_invoke", side_effect=_agent_invoke),
+    ):
+        yield runner
+
+
+def _tool_instances(barrier: Optional[threading.Barrier] = None):
+    tool_instances = {}
+    for name, latency in TOOL_LATENCIES.items():
+        tool_instances[name] = MagicMock(latency=latency, barrier=barrier)
+        tool_instances[name].name = name
+    return tool_instances
+
+
+def _tool_calls(names):
+    return [(f"call-{index}", name, {"query": f"query {index}"}) for index, name in enumerate(names)]
+
+
+def test_parallel_tool_calls(runner):
+    tool_calls = _tool_calls(TOOL_LATENCIES)
+    tool_instances = _tool_instances(threading.Barrier(len(tool_calls)))
+
+    results = runner._invoke_tool_calls(tool_calls, tool_instances, None)
+
+    # the responses keep the order of the tool calls, whatever the order the tools finished in
+    assert [(tool_response["tool_call_id"], tool_response["tool_response"]) for tool_response, _ in results] == [
+        (f"call-{index}", f"{name}: query {index} from tenant") for index, name in enumerate(TOOL_LATENCIES)
+    ]
+
+
+def test_parallel_tool_call_timeout(runner):
+    with patch("core.agent.fc_agent_runner.dify_config.AGENT_TOOL_CALL_TIMEOUT", 0.15):
+        results = runner._invoke_tool_calls(_tool_calls(["search_b", "search_a"]), _tool_instances(), None)
+
+    (first_response, _), (second_response, second_message_files) = results
+    assert first_response["tool_response"] == "search_b: query 0 from tenant"
+    assert second_response["tool_response"] == "tool invoke timeout: no response in 0.15s"
+    assert second_response["meta"]["error"] == second_response["tool_response"]
+    assert second_message_files == []
+
+
+def test_unknown_tool_call(runner):
+    results = runner._invoke_tool_calls(_tool_calls(["search_b", "missing"]), _tool_instances(), None)
+
+    assert results[1][0]["tool_response"] == "there is not a tool named missing"
+    assert results[1][0]["meta"]["error"] == "there is not a tool named missing"
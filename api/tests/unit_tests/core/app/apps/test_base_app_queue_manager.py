@@ -0,0 +1,152 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.app.apps import base_app_queue_manager
+from core.app.apps.base_app_queue_manager import AppQueueManager, GenerateTaskStoppedError, PublishFrom
+from core.app.apps.message_based_app_queue_manager import MessageBasedAppQueueManager
+from core.app.apps.task_stop_subscriber import TaskStopSubscriber
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.queue_entities import (
+    QueueErrorEvent,
+    QueueLLMChunkEvent,
+    QueueNodeSucceededEvent,
+    QueueTextChunkEvent,
+    QueueWorkflowSucceededEvent,
+)
+from models.account import Account
+
+
+@pytest.fixture
+def stop_backends():
+    subscriber = TaskStopSubscriber()
+    redis = MagicMock()
+    redis.get.return_value = None
+    with (
+        patch.object(TaskStopSubscriber, "_ensure_started"),
+        patch.object(base_app_queue_manager, "task_stop_subscriber", subscriber),
+        patch.object(base_app_queue_manager, "redis_client", redis),
+    ):
+        yield subscriber, redis
+
+
+def _queue_manager() -> MessageBasedAppQueueManager:
+    return MessageBasedAppQueueManager(
+        task_id="task-1",
+        user_id="user-1",
+        invoke_from=InvokeFrom.SERVICE_API,
+        conversation_id="conversation-1",
+        app_mode="chat",
+        message_id="message-1",
+    )
+
+
+def _stream_chunks(queue_manager: MessageBasedAppQueueManager, count: int) -> int:
+    for i in range(count):
+        queue_manager.publish(QueueTextChunkEvent(text=str(i)), PublishFrom.APPLICATION_MANAGER)
+    queue_manager.stop_listen()
+    return sum(1 for _ in queue_manager.listen())
+
+
+def _mark_subscribed(subscriber: TaskStopSubscriber):
+    subscriber._pid = os.getpid()
+    subscriber._generation += 1
+    subscriber._subscribed.set()
+
+
+def test_stop_checks_are_local_while_subscribed(stop_backends):
+    subscriber, redis = stop_backends
+    _mark_subscribed(subscriber)
+    queue_manager = _queue_manager()
+
+    assert _stream_chunks(queue_manager, 2000) == 2000
+    # previously every published chunk and every consumed message issued one GET,
+    # now once before listening and once after registering to the pushed signals
+    assert redis.get.call_count == 2
+
+
+def test_stop_checks_fall_back_to_throttled_polling(stop_backends):
+    subscriber, redis = stop_backends
+    queue_manager = _queue_manager()
+
+    assert _stream_chunks(queue_manager, 2000) == 2000
+    assert redis.get.call_count <= 2
+
+
+def test_pushed_stop_signal_stops_task(stop_backends):
+    subscriber, redis = stop_backends
+    _mark_subscribed(subscriber)
+    queue_manager = _queue_manager()
+    listener = queue_manager.listen()
+    queue_manager.publish(QueueTextChunkEvent(text="a"), PublishFrom.APPLICATION_MANAGER)
+    next(listener)
+
+    subscriber.handle_message({"type": "message", "channel": TaskStopSubscriber.CHANNEL, "data": b"task-1"})
+
+    with pytest.raises(GenerateTaskStoppedError):
+        queue_manager.publish(QueueTextChunkEvent(text="b"), PublishFrom.APPLICATION_MANAGER)
+
+
+def test_stop_signal_of_other_task_is_ignored(stop_backends):
+    subscriber, redis = stop_backends
+    _mark_subscribed(subscriber)
+    queue_manager = _queue_manager()
+
+    subscriber.handle_message({"type": "message", "channel": TaskStopSubscriber.CHANNEL, "data": b"task-2"})
+
+    assert not queue_manager._is_stopped()
+
+
+def test_registered_only_while_listening(stop_backends):
+    subscriber, redis = stop_backends
+    _mark_subscribed(subscriber)
+
+    # a queue manager never listened to leaves no registration behind
+    _queue_manager()
+    assert not subscriber._events
+
+    queue_manager = _queue_manager()
+    queue_manager.publish(QueueTextChunkEvent(text="a"), PublishFrom.APPLICATION_MANAGER)
+    listener = queue_manager.listen()
+    next(listener)
+    assert list(subscriber._events) == ["task-1"]
+
+    queue_manager.stop_listen()
+    assert list(listener) == []
+    assert not subscriber._events
+
+
+def test_set_stop_flag_publishes_signal(stop_backends):
+    subscriber, redis = stop_backends
+    redis.get.return_value = b"end-user-user-1"
+
+    AppQueueManager.set_stop_flag("task-1", InvokeFrom.SERVICE_API, "user-1")
+
+    redis.setex.assert_called_once()
+    redis.publish.assert_called_once_with(TaskStopSubscriber.CHANNEL, "task-1")
+
+
+def test_model_check_skips_events_with_safe_schema():
+    assert AppQueueManager._get_model_unsafe_fields(QueueTextChunkEvent) == ()
+    assert AppQueueManager._get_model_unsafe_fields(QueueLLMChunkEvent) == ()
+    assert AppQueueManager._get_model_unsafe_fields(QueueErrorEvent) == ("error",)
+    assert "outputs" in AppQueueManager._get_model_unsafe_fields(QueueNodeSucceededEvent)
+
+
+def test_publish_does_not_dump_safe_events(stop_backends):
+    queue_manager = _queue_manager()
+
+    with patch.object(QueueTextChunkEvent, "model_dump") as model_dump:
+        queue_manager.publish(QueueTextChunkEvent(text="a"), PublishFrom.APPLICATION_MANAGER)
+
+    model_dump.assert_not_called()
+
+
+@pytest.mark.parametrize("debug", [False, True])
+def test_publish_rejects_sqlalchemy_models(stop_backends, debug):
+    queue_manager = _queue_manager()
+    event = QueueWorkflowSucceededEvent(outputs={"nested": [{"account": Account(name="test")}]})
+
+    with patch.object(base_app_queue_manager.dify_config, "DEBUG", debug), pytest.raises(TypeError):
+        queue_manager.publish(event, PublishFrom.APPLICATION_MANAGER)
@@ -0,0 +1,74 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.app.features.rate_limiting.rate_limit import RateLimit
+from core.errors.error import AppInvokeQuotaExceededError
+
+
+@pytest.fixture
+def redis_client():
+    with patch("core.app.features.rate_limiting.rate_limit.redis_client", new=MagicMock()) as redis_client:
+        redis_client.register_script.return_value = MagicMock(return_value=1)
+        RateLimit._instance_dict.clear()
+        RateLimit._enter_script = None
+        yield redis_client
+        RateLimit._instance_dict.clear()
+        RateLimit._enter_script = None
+
+
+def test_enter_admits_with_one_script_call(redis_client):
+    rate_limit = RateLimit("app", max_active_requests=2, max_requests_per_second=0)
+    enter_script = redis_client.register_script.return_value
+    redis_client.reset_mock()
+
+    assert rate_limit.enter("request") == "request"
+
+    enter_script.assert_called_once()
+    keys = enter_script.call_args.kwargs["keys"]
+    args = enter_script.call_args.kwargs["args"]
+    assert keys == ["dify:rate_limit:{app}:active_request_set", "dify:rate_limit:{app}:request_bucket"]
+    assert args[0] == 2
+    assert args[1] == "request"
+    # the admission is one atomic script call, no separate count and insert round trips
+    assert [name for name, _, _ in redis_client.method_calls if name != "register_script"] == []
+
+    rate_limit.exit("request")
+    redis_client.zrem.assert_called_once_with("dify:rate_limit:{app}:active_request_set", "request")
+
+
+def test_enter_rejects_over_limits(redis_client):
+    rate_limit = RateLimit("app", max_active_requests=2, max_requests_per_second=5)
+    enter_script = redis_client.register_script.return_value
+    assert rate_limit.burst == 5
+
+    enter_script.return_value = 0
+    with pytest.raises(AppInvokeQuotaExceededError, match="concurrent requests allowed is 2"):
+        rate_limit.enter()
+
+    enter_script.return_value = -1
+    with pytest.raises(AppInvokeQuotaExceededError, match="requests per second allowed is 5"):
+        rate_limit.enter()
+
+
+def test_unlimited_requests_skip_redis(redis_client):
+    rate_limit = RateLimit("app", max_active_requests=0, max_requests_per_second=0)
+
+    assert rate_limit.enter() == RateLimit._UNLIMITED_REQUEST_ID
+    redis_client.register_script.assert_not_called()
+
+    # only the request rate is limited, requests are not tracked
+    rate_limit = RateLimit("app", max_active_requests=0, max_requests_per_second=1)
+    assert rate_limit.enter() == RateLimit._UNLIMITED_REQUEST_ID
+    redis_client.register_script.return_value.assert_called_once()
+
+
+def test_flush_cache_does_not_scan_active_requests(redis_client):
+    rate_limit = RateLimit("app", max_active_requests=2, max_requests_per_second=0)
+    redis_client.exists.return_value = True
+    redis_client.get.return_value = b"3"
+
+    rate_limit.flush_cache()
+
+    assert rate_limit.max_active_requests == 3
+    redis_client.hgetall.assert_not_called()
@@ -0,0 +1,131 @@
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.helper.code_executor.code_executor import CodeExecutionError, CodeExecutor, CodeLanguage
+from core.helper.code_executor.jinja2.jinja2_sandbox import Jinja2LocalRenderer
+
+TEMPLATE = "{% for item in items %}{{ loop.index }}. {{ item.name | upper }}: {{ item.score }}\n{% endfor %}"
+INPUTS = {"items": [{"name": f"item {i}", "score": i * 10} for i in range(5)]}
+
+
+@pytest.fixture
+def local_render():
+    with patch("core.helper.code_executor.code_executor.dify_config.JINJA2_LOCAL_RENDER_ENABLED", True):
+        yield
+
+
+def _sandbox_post(url, json, **kwargs):
+    # the code execution service runs the runner script in a new python interpreter
+    process = subprocess.run([sys.executable, "-c", json["code"]], capture_output=True, text=True)
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"code": 0, "message": "success", "data": {"stdout": process.stdout, "error": ""}}
+    return response
+
+
+def test_local_render_matches_sandbox(local_render):
+    result = CodeExecutor.execute_workflow_code_template(language=CodeLanguage.JINJA2, code=TEMPLATE, inputs=INPUTS)
+
+    with (
+        patch("core.helper.code_executor.code_executor.dify_config.JINJA2_LOCAL_RENDER_ENABLED", False),
+        patch("core.helper.code_executor.code_executor.post", side_effect=_sandbox_post),
+    ):
+        assert (
+            CodeExecutor.execute_workflow_code_template(language=CodeLanguage.JINJA2, code=TEMPLATE, inputs=INPUTS)
+            == result
+        )
+    assert result["result"].startswith("1. ITEM 0: 0\n2. ITEM 1: 10\n")
+
+
+@pytest.mark.parametrize(
+    ("template", "error"),
+    [
+        ("{{ ''.__class__.__mro__ }}", "SecurityError"),
+        ("{% set _ = items.append(1) %}", "SecurityError"),
+        ("{{ 'a' * 100000000 }}", "exceeds"),
+        ("{{ 10 ** 100000000 }}", "too large"),
+        ("{% for i in range(100000) %}{{ 'a' * 100 }}{% endfor %}", "Output length exceeds"),
+        ("{{ items", "TemplateSyntaxError"),
+        # values built in a single expression, without yielding output
+        ("{{ 'a'.ljust(50000000) }}", "exceeds"),
+        ("{{ 'a'.zfill(50000000) | length }}", "exceeds"),
+        ("{{ ('a' * 1000).join('b' * 1000) | length }}", "exceeds"),
+        ("{{ ('a' * 1000).replace('', 'b' * 1000) | length }}", "exceeds"),
+        ("{{ '{:>50000000}'.format(1) | length }}", "exceeds"),
+        ("{{ ('%50000000s' % 1) | length }}", "exceeds"),
+        ("{{ '%50000000s' | format(1) | length }}", "exceeds"),
+        ("{{ 'a' | center(50000000) | length }}", "exceeds"),
+        ("{{ range(1000) | join('b' * 1000) | length }}", "exceeds"),
+        # the joined items count, not only the separators
+        (
+            "{% set a = 'x' * 400000 %}{% set b = [a, a, a, a] | join %}{% set c = [b, b, b, b] | join %}"
+            "{{ c | length }}",
+            "exceeds",
+        ),
+        ("{% set a = 'x' * 200000 %}{{ [a, a, a] | map('upper') | join | length }}", "exceeds"),
+        (
+            "{% set i = {'name': 'x' * 200000} %}{{ [i, i, i] | join(attribute='name') | length }}",
+            "exceeds",
+        ),
+        ("{{ lipsum(20000, False, 100, 200) | length }}", "lipsum"),
+        (
+            "{% set ns = namespace(s='a' * 1000) %}{% for i in range(20) %}{% set ns.s = ns.s ~ ns.s %}{% endfor %}",
+            "exceeds",
+        ),
+        (
+            "{% set ns = namespace(s='a' * 1000) %}{% for i in range(20) %}{% set ns.s = ns.s + ns.s %}{% endfor %}",
+            "exceeds",
+        ),
+    ],
+)
+def test_local_render_limits(local_render, template, error):
+    with pytest.raises(CodeExecutionError, match=error):
+        CodeExecutor.execute_workflow_code_template(language=CodeLanguage.JINJA2, code=template, inputs={"items": []})
+
+
+def test_local_render_string_operations_within_limits(local_render):
+    template = (
+        "{{ 'ab'.ljust(4) }}|{{ 'x' | center(5) }}|{{ '{:>3}'.format(1) }}|{{ '%3d' % 7 }}|"
+        "{{ items | join(', ') }}|{{ [{'n': 1}, {'n': 2}] | join('+', attribute='n') }}|{{ '-'.join(items) }}|"
+        "{{ 'a' ~ 'b' }}|{{ 'a' + 'b' }}|{{ 'aa'.replace('a', 'bb') }}"
+    )
+    result = CodeExecutor.execute_workflow_code_template(
+        language=CodeLanguage.JINJA2, code=template, inputs={"items": ["a", "b"]}
+    )
+    assert result["result"] == "ab  |  x  |  1|  7|a, b|1+2|a-b|ab|ab|bbbb"
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        # loops without output and without calls in the inner loop
+        "{% for i in range(100000) %}{% for j in range(100000) %}{% endfor %}.{% endfor %}",
+        "{% for i in range(3000) %}{% for j in range(3000) %}{% endfor %}{% endfor %}",
+        "{% for i in range(3000) %}{% for j in items %}{% endfor %}{% endfor %}",
+    ],
+)
+def test_local_render_cpu_time_limit(local_render, template):
+    with (
+        patch("core.helper.code_executor.jinja2.jinja2_sandbox.dify_config.JINJA2_LOCAL_RENDER_CPU_TIME_LIMIT", 0.05),
+        pytest.raises(CodeExecutionError, match="CPU time limit"),
+    ):
+        CodeExecutor.execute_workflow_code_template(
+            language=CodeLanguage.JINJA2, code=template, inputs={"items": list(range(3000))}
+        )
+
+
+def test_local_render_compiles_templates_once(local_render):
+    Jinja2LocalRenderer._templates.clear()
+    with (
+        patch.object(
+            Jinja2LocalRenderer._environment, "from_string", wraps=Jinja2LocalRenderer._environment.from_string
+        ) as from_string,
+        patch("core.helper.code_executor.code_executor.post") as post,
+    ):
+        for _ in range(100):
+            CodeExecutor.execute_workflow_code_template(language=CodeLanguage.JINJA2, code=TEMPLATE, inputs=INPUTS)
+
+    assert from_string.call_count == 1
+    post.assert_not_called()
@@ -0,0 +1,56 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from core.helper.dataset_count_cache import DatasetAvailableCountCache
+from models.dataset import Dataset
+
+
+@patch.object(Dataset, "count_available_segments", return_value=12)
+@patch.object(Dataset, "count_available_documents", return_value=3)
+def test_available_counts_are_counted_once(mock_count_documents, mock_count_segments):
+    cached = {}
+    redis_client = MagicMock()
+    redis_client.get.side_effect = cached.get
+    redis_client.setex.side_effect = lambda key, ttl, value: cached.__setitem__(key, value.encode())
+
+    with patch("core.helper.dataset_count_cache.redis_client", new=redis_client):
+        dataset = Dataset(id="dataset-1")
+        assert dataset.available_document_count == 3
+        assert dataset.available_segment_count == 12
+        assert Dataset(id="dataset-1").available_counts == (3, 12)
+
+        mock_count_documents.assert_called_once()
+        mock_count_segments.assert_called_once()
+        redis_client.sadd.assert_called_once_with(DatasetAvailableCountCache.DATASET_IDS_KEY, "dataset-1")
+
+        DatasetAvailableCountCache("dataset-1").delete()
+        redis_client.delete.assert_called_once_with("dataset_available_count:dataset_id:dataset-1")
+
+
+@patch.object(Dataset, "count_available_segments", return_value=12)
+@patch.object(Dataset, "count_available_documents", return_value=3)
+def test_available_counts_without_cache(mock_count_documents, mock_count_segments):
+    redis_client = MagicMock()
+    with (
+        patch("core.helper.dataset_count_cache.redis_client", new=redis_client),
+        patch("core.helper.dataset_count_cache.dify_config.DATASET_AVAILABLE_COUNT_CACHE_TTL", 0),
+    ):
+        assert Dataset(id="dataset-1").available_counts == (3, 12)
+        assert Dataset(id="dataset-1").available_counts == (3, 12)
+
+    assert mock_count_documents.call_count == 2
+    redis_client.get.assert_not_called()
+    redis_client.setex.assert_not_called()
+
+
+def test_update_drops_expired_datasets():
+    redis_client = MagicMock()
+    redis_client.set.side_effect = [True, None]
+    with patch("core.helper.dataset_count_cache.redis_client", new=redis_client):
+        assert DatasetAvailableCountCache("dataset-1").update(1, 2)
+        assert not DatasetAvailableCountCache("dataset-2").update(0, 0)
+
+    redis_client.set.assert_any_call(
+        "dataset_available_count:dataset_id:dataset-1", json.dumps([1, 2]), xx=True, keepttl=True
+    )
+    redis_client.srem.assert_called_once_with(DatasetAvailableCountCache.DATASET_IDS_KEY, "dataset-2")
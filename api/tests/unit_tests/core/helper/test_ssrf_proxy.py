@@ -1,9 +1,22 @@
+import asyncio
 import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
-from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, make_request
+from core.helper import ssrf_proxy
+from core.helper.ssrf_proxy import (
+    SSRF_DEFAULT_MAX_RETRIES,
+    STATUS_FORCELIST,
+    get_async_client,
+    get_client,
+    get_connection_metrics,
+    make_request,
+    make_request_async,
+)
 
 
 @patch("httpx.Client.request")
@@ -50,3 +63,95 @@ def test_retry_logic_success(mock_request):
     assert response.status_code == 200
     assert mock_request.call_count == SSRF_DEFAULT_MAX_RETRIES + 1
     assert mock_request.call_args_list[0][1].get("method") == "GET"
+
+
+class _CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):  # noqa: N802
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=secret; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    _CountingHandler.connections = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CountingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_pooled_connections(local_server):
+    for _ in range(20):
+        assert make_request("GET", local_server).status_code == 200
+
+    # a fresh client per request, like before pooling
+    for _ in range(20):
+        with httpx.Client() as client:
+            assert client.get(local_server).status_code == 200
+
+    assert _CountingHandler.connections == 1 + 20
+
+    metrics = get_connection_metrics()["127.0.0.1"]
+    assert metrics["requests"] >= 20
+    assert metrics["open_connections"] == 1
+
+
+def test_pooled_client_does_not_keep_cookies(local_server):
+    make_request("GET", local_server)
+
+    request = make_request("GET", local_server).request
+
+    assert "cookie" not in request.headers
+    assert not get_client().cookies
+
+
+def test_async_requests_reuse_pooled_connections(local_server):
+    async def fetch_all():
+        return [await make_request_async("GET", local_server) for _ in range(5)], get_async_client()
+
+    responses, client = asyncio.run(fetch_all())
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert _CountingHandler.connections == 1
+    # closed by the shutdown of its event loop
+    assert client.is_closed
+
+
+def test_pooled_client_uses_environment_proxies(monkeypatch):
+    monkeypatch.setenv("HTTP_PROXY", "http://proxy.local:3128")
+    monkeypatch.delenv("NO_PROXY", raising=False)
+    monkeypatch.delenv("no_proxy", raising=False)
+    monkeypatch.setattr(ssrf_proxy, "_clients", {})
+
+    client = get_client()
+
+    proxy_transports = [transport for transport in client._mounts.values() if transport is not None]
+    assert [transport._pool._proxy_url.host for transport in proxy_transports] == [b"proxy.local"]
+
+
+def test_host_metrics_are_bounded():
+    metrics = ssrf_proxy._HostMetrics(max_hosts=2)
+
+    for host in ["a.example.com", "b.example.com", "a.example.com", "c.example.com"]:
+        metrics.record(f"http://{host}/", 0.1, False)
+
+    assert metrics.snapshot() == {
+        "a.example.com": {"requests": 2, "failures": 0, "total_time": 0.2},
+        "c.example.com": {"requests": 1, "failures": 0, "total_time": 0.1},
+    }
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from core.memory.token_buffer_memory import TokenBufferMemory
+from core.model_runtime.entities import AssistantPromptMessage, UserPromptMessage
+from models.model import AppMode, MessageFile
+from models.workflow import WorkflowRun
+
+
+def _memory(message_count: int, cache: dict) -> tuple[TokenBufferMemory, MagicMock, MagicMock, MagicMock]:
+    # newest first, every message is a four token query and a six token answer
+    messages = [
+        SimpleNamespace(
+            id=f"message-{i}",
+            query=f"q{i}",
+            answer=f"a{i}",
+            created_at=None,
+            workflow_run_id=None,
+            parent_message_id=f"message-{i - 1}" if i else None,
+        )
+        for i in reversed(range(message_count))
+    ]
+
+    def query(*entities):
+        query = MagicMock()
+        if entities == (MessageFile,):
+            query.filter.return_value.__iter__.return_value = iter([])
+        elif entities == (WorkflowRun,):
+            raise AssertionError("messages without files do not load their workflow runs")
+        else:
+            query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = messages
+        return query
+
+    db = MagicMock()
+    db.session.query.side_effect = query
+
+    redis_client = MagicMock()
+    redis_client.mget.side_effect = lambda keys: [cache.get(key) for key in keys]
+    redis_client.pipeline.return_value.setex.side_effect = lambda key, ttl, value: cache.__setitem__(key, value)
+
+    model_instance = MagicMock(provider="openai", model="gpt-4o")
+    model_instance.get_llm_num_tokens.side_effect = lambda prompt_messages: sum(
+        4 if isinstance(prompt_message, UserPromptMessage) else 6 for prompt_message in prompt_messages
+    )
+    conversation = MagicMock(id="conversation", mode=AppMode.CHAT)
+    return TokenBufferMemory(conversation=conversation, model_instance=model_instance), db, redis_client, model_instance
+
+
+def test_history_is_pruned_with_cached_token_counts():
+    cache: dict = {}
+    memory, db, redis_client, model_instance = _memory(100, cache)
+    with (
+        patch("core.memory.token_buffer_memory.db", db),
+        patch("core.memory.token_buffer_memory.redis_client", new=redis_client),
+    ):
+        prompt_messages = memory.get_history_prompt_messages(max_token_limit=36)
+
+        # the last three messages fit in 36 tokens, the one before is dropped with its answer
+        assert [prompt_message.content for prompt_message in prompt_messages] == [
+            "q97",
+            "a97",
+            "q98",
+            "a98",
+            "q99",
+            "a99",
+        ]
+        assert isinstance(prompt_messages[0], UserPromptMessage)
+        # the whole history once, then one count per message up to the limit, one query for the files
+        assert model_instance.get_llm_num_tokens.call_count == 5
+        assert db.session.query.call_count == 2
+
+        model_instance.get_llm_num_tokens.reset_mock()
+        assert memory.get_history_prompt_messages(max_token_limit=36) == prompt_messages
+        model_instance.get_llm_num_tokens.assert_not_called()
+
+        prompt_messages = memory.get_history_prompt_messages(max_token_limit=1)
+        assert len(prompt_messages) == 1
+        assert isinstance(prompt_messages[0], AssistantPromptMessage)
+        assert len(memory.get_history_prompt_messages(max_token_limit=1000)) == 200
+
+
+def test_history_within_limit_is_counted_at_once():
+    cache: dict = {}
+    memory, db, redis_client, model_instance = _memory(100, cache)
+    with (
+        patch("core.memory.token_buffer_memory.db", db),
+        patch("core.memory.token_buffer_memory.redis_client", new=redis_client),
+    ):
+        assert len(memory.get_history_prompt_messages(max_token_limit=1000)) == 200
+
+        # one count of the whole history, nothing to cache
+        model_instance.get_llm_num_tokens.assert_called_once()
+        assert len(model_instance.get_llm_num_tokens.call_args.args[0]) == 200
+        assert cache == {}
@@ -0,0 +1,77 @@
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from core.model_runtime.model_providers.__base.tokenizers import tokenizer_service
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+from core.model_runtime.model_providers.__base.tokenizers.tokenizer_service import TokenizerService
+
+
+def _texts(count: int, prefix: str = "") -> list[str]:
+    # like the segments of an indexed document
+    return [f"{prefix}{index} The quick brown fox jumps over the lazy dog. " * 20 for index in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def count_cache():
+    tokenizer_service._count_cache.clear()
+    yield tokenizer_service._count_cache
+    tokenizer_service._count_cache.clear()
+
+
+def test_count_many():
+    texts = [*_texts(3), "", _texts(1)[0]]
+
+    with patch.object(tokenizer_service, "_count_tokens", wraps=tokenizer_service._count_tokens) as count_tokens:
+        counts = TokenizerService.count_many(texts)
+        assert TokenizerService.count_many(texts) == counts
+
+    assert counts == [GPT2Tokenizer.get_num_tokens(text) for text in texts]
+    assert counts[3] == 0
+    # the same text is tokenized once, the second batch is read from the cache
+    count_tokens.assert_called_once_with(texts[:3])
+
+
+def test_count_many_process_pool():
+    texts = _texts(8)
+
+    with (
+        patch.object(tokenizer_service.dify_config, "TOKENIZER_PROCESS_POOL_MAX_WORKERS", 2),
+        patch.object(tokenizer_service.dify_config, "TOKENIZER_PROCESS_POOL_MIN_CHARS", 1000),
+        patch.object(
+            tokenizer_service, "get_tokenizer_process_pool", wraps=tokenizer_service.get_tokenizer_process_pool
+        ) as get_tokenizer_process_pool,
+    ):
+        counts = TokenizerService.count_many(texts)
+
+    assert counts == [GPT2Tokenizer.get_num_tokens(text) for text in texts]
+    get_tokenizer_process_pool.assert_called_once()
+    # spawned, forking from gevent or threaded workers is unsafe
+    assert tokenizer_service._process_pool._mp_context.get_start_method() == "spawn"
+
+
+def test_count_many_tokenizes_missing_texts_once():
+    texts = _texts(300)
+
+    with patch.object(tokenizer_service, "_count_tokens", wraps=tokenizer_service._count_tokens) as count_tokens:
+        counts = TokenizerService.count_many(texts)
+        # the same segments counted again, like the memory and the prompt counted on every turn
+        for _ in range(10):
+            assert TokenizerService.count_many(texts) == counts
+        assert TokenizerService.count_many([*texts[:5], *_texts(2, prefix="new ")])[:5] == counts[:5]
+
+    assert counts == [GPT2Tokenizer.get_num_tokens(text) for text in texts]
+    # one batch for the first call, the cached texts are not tokenized again
+    assert [call.args[0] for call in count_tokens.call_args_list] == [texts, _texts(2, prefix="new ")]
+
+
+def test_tokenizer_process_imports():
+    # the module of the pool tasks, imported by every spawned process, does not import the model providers
+    assert tokenizer_service.count_gpt2_tokens.__module__ == "core.model_runtime.utils.gpt2_encoder"
+    code = (
+        "import sys, core.model_runtime.utils.gpt2_encoder;"
+        "assert 'core.model_runtime.model_providers' not in sys.modules, sorted(sys.modules)"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,164 @@
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from core.ops.base_trace_instance import BaseTraceInstance
+from core.ops.entities.config_entity import OPS_FILE_PATH
+from core.ops.entities.trace_entity import BaseTraceInfo, GenerateNameTraceInfo, TaskData
+from core.ops.ops_trace_manager import TraceQueueManager
+from tasks.ops_trace_task import process_trace_batch, process_trace_tasks
+
+
+class _StubStorage:
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+        self.operation_count = 0
+
+    def _operate(self):
+        self.operation_count += 1
+
+    def save(self, filename, data):
+        self._operate()
+        self.files[filename] = data
+
+    def load(self, filename):
+        self._operate()
+        return self.files[filename]
+
+    def delete(self, filename):
+        self._operate()
+        del self.files[filename]
+
+
+class _StubTraceInstance(BaseTraceInstance):
+    """Queues traces like the langfuse, langsmith and opik clients do and ingests them on flush."""
+
+    traced: list[BaseTraceInfo] = []
+    ingestion_count = 0
+
+    def __init__(self):
+        super().__init__(MagicMock())
+        self.queued: list[BaseTraceInfo] = []
+
+    def trace(self, trace_info: BaseTraceInfo):
+        if trace_info.metadata.get("fail"):
+            raise ValueError("invalid trace")
+        self.queued.append(trace_info)
+
+    def flush(self):
+        if self.queued:
+            _StubTraceInstance.ingestion_count += 1
+            _StubTraceInstance.traced.extend(self.queued)
+            self.queued = []
+
+
+class _OneByOneTraceInstance(_StubTraceInstance):
+    def trace(self, trace_info: BaseTraceInfo):
+        super().trace(trace_info)
+        self.flush()
+
+
+@pytest.fixture
+def pipeline():
+    storage = _StubStorage()
+    redis_client = MagicMock()
+    _StubTraceInstance.traced = []
+    _StubTraceInstance.ingestion_count = 0
+    with (
+        patch("core.ops.ops_trace_manager.storage", new=storage),
+        patch("tasks.ops_trace_task.storage", new=storage),
+        patch("tasks.ops_trace_task.redis_client", new=redis_client),
+        patch(
+            "core.ops.ops_trace_manager.OpsTraceManager.get_ops_trace_instance",
+            side_effect=lambda app_id: _StubTraceInstance(),
+        ),
+        patch.object(TraceQueueManager, "start_timer"),
+        # celery runs the task right away
+        patch.object(process_trace_batch, "delay", side_effect=process_trace_batch),
+    ):
+        yield storage, redis_client
+
+
+def _trace_tasks(count: int, app_count: int = 1):
+    tasks = []
+    for index in range(count):
+        task = MagicMock(app_id=f"app-{index % app_count}")
+        task.execute.return_value = GenerateNameTraceInfo(
+            tenant_id="tenant", inputs=f"query {index}", metadata={"fail": index == 3}
+        )
+        tasks.append(task)
+    return tasks
+
+
+def _send_one_by_one(tasks, storage):
+    # the previous pipeline, one file and one celery task per trace
+    for task in tasks:
+        file_id = uuid4().hex
+        trace_info = task.execute()
+        task_data = TaskData(
+            app_id=task.app_id, trace_info_type=type(trace_info).__name__, trace_info=trace_info.model_dump()
+        )
+        storage.save(f"{OPS_FILE_PATH}{task.app_id}/{file_id}.json", task_data.model_dump_json().encode("utf-8"))
+        process_trace_tasks({"file_id": file_id, "app_id": task.app_id})
+
+
+def test_send_batch(pipeline):
+    storage, redis_client = pipeline
+    manager = TraceQueueManager(app_id="app-0")
+
+    manager.send_to_celery(_trace_tasks(10, app_count=2))
+
+    # one save, load and delete for the batch, one bulk ingestion per app
+    assert storage.operation_count == 3
+    assert not storage.files
+    assert _StubTraceInstance.ingestion_count == 2
+    assert sorted(trace_info.inputs for trace_info in _StubTraceInstance.traced) == sorted(
+        f"query {index}" for index in range(10) if index != 3
+    )
+    redis_client.incrby.assert_called_once_with("FAILED_OPS_TRACE_app-1", 1)
+
+
+def test_send_batch_with_failing_trace_instance(pipeline):
+    storage, redis_client = pipeline
+    manager = TraceQueueManager(app_id="app-0")
+
+    def get_ops_trace_instance(app_id):
+        if app_id == "app-0":
+            raise ConnectionError("tracing provider unavailable")
+        return _StubTraceInstance()
+
+    with patch("core.ops.ops_trace_manager.OpsTraceManager.get_ops_trace_instance", side_effect=get_ops_trace_instance):
+        manager.send_to_celery(_trace_tasks(10, app_count=2))
+
+    # the traces of the other app are still sent, the batch file is deleted
+    assert sorted(trace_info.inputs for trace_info in _StubTraceInstance.traced) == sorted(
+        f"query {index}" for index in range(1, 10, 2) if index != 3
+    )
+    assert not storage.files
+    redis_client.incrby.assert_any_call("FAILED_OPS_TRACE_app-0", 5)
+    redis_client.incrby.assert_any_call("FAILED_OPS_TRACE_app-1", 1)
+
+
+def test_send_batch_operation_counts(pipeline):
+    storage, _ = pipeline
+    manager = TraceQueueManager(app_id="app-0")
+    trace_count = 100
+    one_by_one_tasks = _trace_tasks(trace_count)
+    batch_tasks = _trace_tasks(trace_count)
+
+    with patch("core.ops.ops_trace_manager.OpsTraceManager.get_ops_trace_instance") as get_ops_trace_instance:
+        # the previous task neither shared nor flushed the exporter, count its ingestion per trace
+        get_ops_trace_instance.side_effect = lambda app_id: _OneByOneTraceInstance()
+        _send_one_by_one(one_by_one_tasks, storage)
+    # one save, load and delete and one ingestion per trace
+    assert storage.operation_count == 3 * trace_count
+    assert _StubTraceInstance.ingestion_count == trace_count - 1
+
+    storage.operation_count = 0
+    _StubTraceInstance.ingestion_count = 0
+    manager.send_to_celery(batch_tasks)
+
+    # one save, load and delete and one ingestion for the batch
+    assert storage.operation_count == 3
+    assert _StubTraceInstance.ingestion_count == 1
@@ -0,0 +1,75 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.ops import ops_trace_manager
+from core.ops.ops_trace_manager import OpsTraceManager
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+
+@pytest.fixture
+def create_instance():
+    ops_trace_manager.trace_instance_cache.clear()
+    trace_instances = {"app-traced": MagicMock()}
+    with (
+        patch.object(ops_trace_manager, "redis_client", new=_FakeRedis()),
+        patch.object(ops_trace_manager.dify_config, "OPS_TRACE_INSTANCE_CACHE_TTL", 300),
+        patch.object(
+            OpsTraceManager, "_create_ops_trace_instance", side_effect=lambda app_id: trace_instances.get(app_id)
+        ) as create_instance,
+    ):
+        yield create_instance
+    ops_trace_manager.trace_instance_cache.clear()
+
+
+def test_trace_instance_cached(create_instance):
+    trace_instance = OpsTraceManager.get_ops_trace_instance("app-traced")
+
+    assert trace_instance is not None
+    assert all(OpsTraceManager.get_ops_trace_instance("app-traced") is trace_instance for _ in range(10))
+    assert create_instance.call_count == 1
+
+
+def test_app_without_tracing_cached(create_instance):
+    assert all(OpsTraceManager.get_ops_trace_instance("app-untraced") is None for _ in range(10))
+    assert create_instance.call_count == 1
+
+
+def test_trace_instance_invalidated(create_instance):
+    OpsTraceManager.get_ops_trace_instance("app-traced")
+    OpsTraceManager.get_ops_trace_instance("app-untraced")
+
+    OpsTraceManager.invalidate_ops_trace_instance("app-traced")
+    OpsTraceManager.get_ops_trace_instance("app-traced")
+    OpsTraceManager.get_ops_trace_instance("app-untraced")
+
+    assert [call.args[0] for call in create_instance.call_args_list] == ["app-traced", "app-untraced", "app-traced"]
+
+
+def test_trace_instance_expired(create_instance):
+    with patch.object(ops_trace_manager.time, "monotonic", return_value=1000.0):
+        OpsTraceManager.get_ops_trace_instance("app-traced")
+    with patch.object(ops_trace_manager.time, "monotonic", return_value=1301.0):
+        OpsTraceManager.get_ops_trace_instance("app-traced")
+
+    assert create_instance.call_count == 2
+
+
+def test_trace_instance_cache_disabled(create_instance):
+    with patch.object(ops_trace_manager.dify_config, "OPS_TRACE_INSTANCE_CACHE_TTL", 0):
+        OpsTraceManager.get_ops_trace_instance("app-traced")
+        OpsTraceManager.get_ops_trace_instance("app-traced")
+
+    assert create_instance.call_count == 2
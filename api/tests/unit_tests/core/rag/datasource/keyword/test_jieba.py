@@ -0,0 +1,61 @@
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from core.rag.datasource.keyword.jieba import jieba
+from core.rag.datasource.keyword.jieba.jieba import Jieba
+from core.rag.models.document import Document
+from models.dataset import Dataset, DocumentSegment
+
+
+def _extract_keywords(text: str, max_keywords_per_chunk=10) -> set[str]:
+    return set(text.split())
+
+
+@pytest.fixture
+def keyword_store():
+    db = MagicMock()
+    redis = MagicMock()
+    dataset = Dataset(id="dataset-1", tenant_id="tenant-1")
+    keyword_table = MagicMock(data_source_type="database", keyword_table_dict=None)
+    with (
+        patch.object(jieba, "db", db),
+        patch.object(jieba, "redis_client", redis),
+        patch.object(jieba.JiebaKeywordTableHandler, "__init__", return_value=None),
+        patch.object(jieba.JiebaKeywordTableHandler, "extract_keywords", side_effect=_extract_keywords),
+        patch.object(Dataset, "dataset_keyword_table", new_callable=PropertyMock, return_value=keyword_table),
+    ):
+        yield Jieba(dataset), db
+
+
+def _segment(node_id: str) -> DocumentSegment:
+    return DocumentSegment(
+        dataset_id="dataset-1", document_id="document-1", index_node_id=node_id, index_node_hash="h", content=node_id
+    )
+
+
+def test_search_hydrates_segments_with_one_query_in_rank_order(keyword_store):
+    keyword_store, db = keyword_store
+    query = db.session.query.return_value.filter.return_value
+    query.all.return_value = [_segment("node-1"), _segment("node-3"), _segment("node-2")]
+
+    with patch.object(Jieba, "_retrieve_ids_by_query", return_value=["node-2", "node-missing", "node-3", "node-1"]):
+        documents = keyword_store.search("query", top_k=4)
+
+    assert [document.metadata["doc_id"] for document in documents] == ["node-2", "node-3", "node-1"]
+    assert db.session.query.call_count == 1
+    assert query.first.call_count == 0
+
+
+def test_add_texts_updates_segment_keywords_in_one_statement(keyword_store):
+    keyword_store, db = keyword_store
+    texts = [Document(page_content=f"keyword-{i} common", metadata={"doc_id": f"node-{i}"}) for i in range(20)]
+
+    keyword_store.add_texts(texts)
+
+    (statement,) = [call.args[0] for call in db.session.execute.call_args_list]
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE document_segments SET keywords=CASE document_segments.index_node_id")
+    # one commit for the segment keywords and one for the keyword table, instead of one per segment
+    assert db.session.commit.call_count == 2
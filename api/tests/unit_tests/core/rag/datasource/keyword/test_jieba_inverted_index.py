@@ -0,0 +1,82 @@
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from core.rag.datasource.keyword.jieba import jieba_inverted_index
+from core.rag.datasource.keyword.jieba.jieba_inverted_index import JiebaInvertedIndex
+from core.rag.datasource.keyword.keyword_factory import Keyword
+from core.rag.datasource.keyword.keyword_type import KeyWordType
+from core.rag.models.document import Document
+from models.dataset import Dataset
+
+
+def _extract_keywords(text: str, max_keywords_per_chunk=10) -> set[str]:
+    return set(text.split())
+
+
+@pytest.fixture
+def keyword_index():
+    db = MagicMock()
+    dataset = Dataset(id="dataset-1", tenant_id="tenant-1")
+    with (
+        patch.object(jieba_inverted_index, "db", db),
+        patch("core.rag.datasource.keyword.jieba.jieba.db", db),
+        patch.object(jieba_inverted_index.JiebaKeywordTableHandler, "__init__", return_value=None),
+        patch.object(jieba_inverted_index.JiebaKeywordTableHandler, "extract_keywords", side_effect=_extract_keywords),
+        patch.object(Dataset, "dataset_keyword_table", new_callable=PropertyMock) as dataset_keyword_table,
+    ):
+        yield JiebaInvertedIndex(dataset), db, dataset_keyword_table
+
+
+def _executed_sql(db: MagicMock) -> list[str]:
+    return [
+        str(call.args[0].compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        for call in db.session.execute.call_args_list
+        if not call.args[0].is_update
+    ]
+
+
+def test_factory_returns_inverted_index():
+    assert Keyword.get_keyword_factory(KeyWordType.JIEBA_INVERTED_INDEX) is JiebaInvertedIndex
+
+
+def test_add_texts_inserts_postings_without_loading_keyword_table(keyword_index):
+    keyword_index, db, dataset_keyword_table = keyword_index
+    texts = [
+        Document(page_content="apple banana", metadata={"doc_id": "node-1"}),
+        Document(page_content="banana cherry", metadata={"doc_id": "node-2"}),
+    ]
+
+    keyword_index.add_texts(texts)
+
+    dataset_keyword_table.assert_not_called()
+    inserts = [sql for sql in _executed_sql(db) if sql.startswith("INSERT INTO dataset_keyword_indexes")]
+    assert len(inserts) == 1
+    assert inserts[0].count("'dataset-1'") == 4
+    assert "ON CONFLICT ON CONSTRAINT dataset_keyword_index_keyword_node_idx DO NOTHING" in inserts[0]
+
+
+def test_delete_by_ids_only_touches_given_segments(keyword_index):
+    keyword_index, db, dataset_keyword_table = keyword_index
+
+    keyword_index.delete_by_ids(["node-1", "node-2"])
+
+    dataset_keyword_table.assert_not_called()
+    (sql,) = _executed_sql(db)
+    assert sql.startswith("DELETE FROM dataset_keyword_indexes")
+    assert "index_node_id IN ('node-1', 'node-2')" in sql
+
+
+def test_search_ranks_by_matching_keywords(keyword_index):
+    keyword_index, db, dataset_keyword_table = keyword_index
+    db.session.execute.return_value = [MagicMock(index_node_id="node-2"), MagicMock(index_node_id="node-1")]
+
+    with patch.object(JiebaInvertedIndex, "_get_documents_by_index_node_ids", return_value=[]) as hydrate:
+        keyword_index.search("banana cherry", top_k=2)
+
+    hydrate.assert_called_once_with(["node-2", "node-1"])
+    (sql,) = _executed_sql(db)
+    assert "GROUP BY dataset_keyword_indexes.index_node_id" in sql
+    assert "ORDER BY match_count DESC" in sql
+    assert "LIMIT 2" in sql
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock, patch
+
+from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.index_processor.constant.index_type import IndexType
+from core.rag.models.document import Document
+from models.dataset import ChildChunk, DocumentSegment
+from models.dataset import Document as DatasetDocument
+
+
+def _mock_session(dataset_documents: list, child_chunk_results: list, segments: list) -> MagicMock:
+    def query(*entities):
+        query = MagicMock()
+        if entities == (DatasetDocument,):
+            query.filter.return_value.all.return_value = dataset_documents
+        elif entities == (ChildChunk, DocumentSegment):
+            query.join.return_value.filter.return_value.all.return_value = child_chunk_results
+        else:
+            query.filter.return_value.all.return_value = segments
+        return query
+
+    session = MagicMock()
+    session.query.side_effect = query
+    return session
+
+
+def test_format_retrieval_documents_loads_in_bulk():
+    dataset_documents = [
+        DatasetDocument(id="document-1", dataset_id="dataset-1", doc_form=IndexType.PARAGRAPH_INDEX),
+        DatasetDocument(id="document-2", dataset_id="dataset-2", doc_form=IndexType.PARENT_CHILD_INDEX),
+    ]
+    segments = [
+        DocumentSegment(id=f"segment-{i}", dataset_id="dataset-1", index_node_id=f"node-{i}") for i in range(10)
+    ]
+    parent_segments = [DocumentSegment(id=f"parent-{i}", dataset_id="dataset-2") for i in range(2)]
+    child_chunk_results = [
+        (
+            ChildChunk(id=f"chunk-{i}", index_node_id=f"child-{i}", content=f"chunk {i}", position=i),
+            parent_segments[i % 2],
+        )
+        for i in range(10)
+    ]
+
+    documents = []
+    for i in range(10):
+        documents.append(
+            Document(
+                page_content="",
+                metadata={"document_id": "document-1", "doc_id": f"node-{i}", "score": 1 - i * 0.1},
+            )
+        )
+        documents.append(
+            Document(
+                page_content="",
+                metadata={"document_id": "document-2", "doc_id": f"child-{i}", "score": 0.95 - i * 0.1},
+            )
+        )
+    # disabled segments and deleted documents are skipped
+    documents.append(Document(page_content="", metadata={"document_id": "document-1", "doc_id": "node-missing"}))
+    documents.append(Document(page_content="", metadata={"document_id": "document-3", "doc_id": "node-0"}))
+
+    session = _mock_session(dataset_documents, child_chunk_results, segments)
+    with patch("core.rag.datasource.retrieval_service.db.session", session):
+        records = RetrievalService.format_retrieval_documents(documents)
+
+    # one query each for the documents, the child chunks and the segments, whatever the number of results
+    assert session.query.call_count == 3
+
+    assert [record.segment.id for record in records] == [
+        "segment-0",
+        "parent-0",
+        "segment-1",
+        "parent-1",
+        *[f"segment-{i}" for i in range(2, 10)],
+    ]
+    parent = records[1]
+    assert [child_chunk.id for child_chunk in parent.child_chunks] == [f"chunk-{i}" for i in range(0, 10, 2)]
+    assert parent.score == 0.95
+    assert records[2].score == 0.9
+
+
+def test_format_retrieval_documents_without_documents():
+    session = _mock_session([], [], [])
+    with patch("core.rag.datasource.retrieval_service.db.session", session):
+        assert RetrievalService.format_retrieval_documents([]) == []
+    session.query.assert_not_called()
@@ -0,0 +1,214 @@
+import gc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from unittest.mock import MagicMock, patch
+
+import psycopg2.pool  # type: ignore
+import pytest
+
+from core.rag.datasource.vdb.pgvector.pgvector import BlockingConnectionPool, PGVector, PGVectorConfig
+from core.rag.datasource.vdb.vector_client_registry import VectorClientRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = VectorClientRegistry(max_size=2, idle_timeout=60, health_check_interval=10)
+    with patch("core.rag.datasource.vdb.pgvector.pgvector.vector_client_registry", registry):
+        yield registry
+
+
+def test_clients_are_shared_per_config(registry):
+    create = MagicMock(side_effect=lambda: object())
+
+    client = registry.get_client("pgvector", "config-a", create)
+    assert registry.get_client("pgvector", "config-a", create) is client
+    assert registry.get_client("pgvector", "config-b", create) is not client
+    assert create.call_count == 2
+
+    metrics = registry.metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 2
+    assert metrics["size"] == 2
+    assert [client["uses"] for client in metrics["clients"]] == [2, 1]
+    assert "config-a" not in str(metrics)
+
+
+def test_least_recently_used_and_idle_clients_are_closed(registry):
+    close = MagicMock()
+    clients = {key: registry.get_client("qdrant", key, lambda: MagicMock(), close) for key in ("a", "b")}
+    registry.get_client("qdrant", "a", MagicMock())
+
+    registry.get_client("qdrant", "c", lambda: MagicMock(), close)
+    close.assert_called_once_with(clients["b"])
+
+    with patch("core.rag.datasource.vdb.vector_client_registry.time.monotonic", return_value=time.monotonic() + 61):
+        registry.get_client("qdrant", "d", lambda: MagicMock(), close)
+    assert close.call_count == 3
+    assert registry.metrics()["size"] == 1
+    assert registry.metrics()["evictions"] == 3
+
+
+def test_unhealthy_clients_are_recreated(registry):
+    close = MagicMock()
+    health_check = MagicMock(return_value=True)
+    client = registry.get_client("opensearch", "a", lambda: MagicMock(), close, health_check)
+
+    # checked at most once per interval
+    assert registry.get_client("opensearch", "a", MagicMock(), close, health_check) is client
+    health_check.assert_not_called()
+
+    health_check.side_effect = ConnectionError("connection reset")
+    with patch("core.rag.datasource.vdb.vector_client_registry.time.monotonic", return_value=time.monotonic() + 11):
+        new_client = registry.get_client("opensearch", "a", lambda: MagicMock(), close, health_check)
+    assert new_client is not client
+    close.assert_called_once_with(client)
+    assert registry.metrics()["health_check_failures"] == 1
+
+
+def test_held_clients_are_closed_when_released(registry):
+    class Vector:
+        pass
+
+    close = MagicMock()
+    holder = Vector()
+    client = registry.get_client("qdrant", "a", lambda: MagicMock(), close, owner=holder)
+    idle_client = registry.get_client("qdrant", "b", lambda: MagicMock(), close)
+    registry.get_client("qdrant", "c", lambda: MagicMock(), close)
+
+    # evicted as least recently used, but still held
+    assert registry.metrics()["evictions"] == 1
+    close.assert_not_called()
+
+    # idle eviction skips held clients
+    other_holder = Vector()
+    registry.get_client("qdrant", "c", lambda: MagicMock(), close, owner=other_holder)
+    with patch("core.rag.datasource.vdb.vector_client_registry.time.monotonic", return_value=time.monotonic() + 61):
+        registry.get_client("qdrant", "d", lambda: MagicMock(), close)
+    assert [client["holders"] for client in registry.metrics()["clients"]] == [1, 0]
+    close.assert_called_once_with(idle_client)
+
+    del holder
+    gc.collect()
+    close.assert_called_with(client)
+    assert close.call_count == 2
+
+
+def test_health_check_and_create_run_out_of_the_registry_lock(registry):
+    checking = threading.Event()
+    resume = threading.Event()
+
+    def health_check(client):
+        checking.set()
+        assert resume.wait(5)
+
+    registry.get_client("opensearch", "a", lambda: MagicMock(), health_check=health_check)
+    with patch("core.rag.datasource.vdb.vector_client_registry.time.monotonic", return_value=time.monotonic() + 11):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            checked = executor.submit(registry.get_client, "opensearch", "a", MagicMock(), health_check=health_check)
+            assert checking.wait(5)
+            # other configs are not blocked by the running health check
+            registry.get_client("opensearch", "b", lambda: MagicMock())
+            registry.metrics()
+            resume.set()
+            checked.result()
+
+    assert registry.metrics()["misses"] == 2
+
+
+def _pg_vector_config(**kwargs) -> PGVectorConfig:
+    return PGVectorConfig(
+        **{
+            "host": "localhost",
+            "port": 5432,
+            "user": "postgres",
+            "password": "difyai123456",
+            "database": "dify",
+            "min_connection": 1,
+            "max_connection": 5,
+            **kwargs,
+        }
+    )
+
+
+def test_pgvector_pool_waits_for_a_free_connection():
+    with patch("psycopg2.connect", side_effect=lambda *args, **kwargs: MagicMock(closed=0)):
+        pool = BlockingConnectionPool(1, 1)
+        conn = pool.getconn()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            waiting = executor.submit(pool.getconn)
+            with pytest.raises(FuturesTimeoutError):
+                waiting.result(timeout=0.1)
+            pool.putconn(conn)
+            assert waiting.result(timeout=5) is not None
+
+        with patch("core.rag.datasource.vdb.pgvector.pgvector.GET_CONNECTION_TIMEOUT", 0.01):
+            with pytest.raises(psycopg2.pool.PoolError):
+                pool.getconn()
+
+
+class _FakeConnection:
+    closed = 0
+
+    def cursor(self):
+        cursor = MagicMock()
+        cursor.__iter__.return_value = iter([])
+        cursor.__enter__.return_value = cursor
+        return cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _FakeConnectionPool:
+    created = 0
+
+    def __init__(self, min_connection, *args, **kwargs):
+        _FakeConnectionPool.created += 1
+        self._connection = _FakeConnection()
+        self.getconn = MagicMock(return_value=self._connection)
+
+    def putconn(self, conn, close=False):
+        pass
+
+    def closeall(self):
+        pass
+
+
+def test_pgvector_pool_shared_between_retrievals(registry):
+    config = _pg_vector_config()
+
+    def retrieve():
+        PGVector(collection_name="collection", config=config).search_by_vector([0.1, 0.2], top_k=4)
+
+    with patch("core.rag.datasource.vdb.pgvector.pgvector.BlockingConnectionPool", _FakeConnectionPool):
+        _FakeConnectionPool.created = 0
+        for _ in range(200):
+            retrieve()
+        assert _FakeConnectionPool.created == 1
+
+        with patch.object(registry, "get_client", side_effect=lambda backend, key, create, **kwargs: create()):
+            for _ in range(200):
+                retrieve()
+        assert _FakeConnectionPool.created == 201
+
+
+def test_pgvector_health_check_does_not_take_a_pool_connection(registry):
+    config = _pg_vector_config()
+
+    with (
+        patch("core.rag.datasource.vdb.pgvector.pgvector.BlockingConnectionPool", _FakeConnectionPool),
+        patch("core.rag.datasource.vdb.pgvector.pgvector.psycopg2.connect") as connect,
+    ):
+        pool = PGVector(collection_name="collection", config=config).pool
+        with patch("core.rag.datasource.vdb.vector_client_registry.time.monotonic", return_value=time.monotonic() + 11):
+            assert PGVector(collection_name="collection", config=config).pool is pool
+
+    connect.assert_called_once()
+    connect.return_value.close.assert_called_once()
+    pool.getconn.assert_not_called()
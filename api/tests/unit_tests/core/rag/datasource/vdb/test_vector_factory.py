@@ -0,0 +1,25 @@
+from unittest.mock import MagicMock, patch
+
+from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.models.document import Document
+
+
+def test_filter_duplicate_texts_checks_ids_per_batch():
+    vector = Vector.__new__(Vector)
+    vector._vector_processor = MagicMock()
+    vector._vector_processor.existing_ids.side_effect = lambda ids: {id for id in ids if int(id) % 3 == 0}
+    documents = [Document(page_content=f"text {i}", metadata={"doc_id": str(i)}) for i in range(25)]
+    documents.append(Document(page_content="no doc id", metadata={"doc_id": ""}))
+
+    with patch.object(Vector, "EXISTING_IDS_BATCH_SIZE", 10):
+        filtered = vector._filter_duplicate_texts(documents)
+
+    assert [call.args[0] for call in vector._vector_processor.existing_ids.call_args_list] == [
+        [str(i) for i in range(0, 10)],
+        [str(i) for i in range(10, 20)],
+        [str(i) for i in range(20, 25)],
+    ]
+    vector._vector_processor.text_exists.assert_not_called()
+    assert [document.page_content for document in filtered] == [f"text {i}" for i in range(25) if i % 3 != 0] + [
+        "no doc id"
+    ]
@@ -0,0 +1,107 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from core.model_runtime.entities.text_embedding_entities import EmbeddingUsage, TextEmbeddingResult
+from core.rag.embedding import cached_embedding
+from core.rag.embedding.cached_embedding import CacheEmbedding, embedding_cache_stats
+from libs import helper
+from models.dataset import Embedding
+
+
+def _vector(seed: int) -> list[float]:
+    vector = np.arange(1, 5, dtype="float") * (seed + 1)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def _model_instance(call_log: list[list[str]]) -> MagicMock:
+    model_instance = MagicMock()
+    model_instance.provider = "openai"
+    model_instance.model = "text-embedding-3-small"
+    model_instance.model_type_instance.get_model_schema.return_value = None
+
+    def invoke_text_embedding(texts, user=None, input_type=None):
+        call_log.append(texts)
+        return TextEmbeddingResult(
+            model="text-embedding-3-small",
+            embeddings=[_vector(int(text.split("-")[1])) for text in texts],
+            usage=MagicMock(spec=EmbeddingUsage),
+        )
+
+    model_instance.invoke_text_embedding.side_effect = invoke_text_embedding
+    return model_instance
+
+
+@pytest.fixture
+def mock_backends():
+    cached_embedding._document_embedding_memory_cache.clear()
+    embedding_cache_stats.reset()
+    rows: dict[str, Embedding] = {}
+    db = MagicMock()
+
+    def query_all():
+        hashes = db.session.query.return_value.filter.call_args[0][2].right.value
+        return [rows[hash] for hash in hashes if hash in rows]
+
+    db.session.query.return_value.filter.return_value.all.side_effect = query_all
+    redis = MagicMock()
+    redis.mget.side_effect = lambda keys: [None] * len(keys)
+    with patch.object(cached_embedding, "db", db), patch.object(cached_embedding, "redis_client", redis):
+        yield db, redis, rows
+
+
+def _store_rows(rows: dict[str, Embedding], texts: list[str]):
+    for text in texts:
+        hash = helper.generate_text_hash(text)
+        embedding = Embedding(model_name="text-embedding-3-small", hash=hash, provider_name="openai")
+        embedding.set_embedding(_vector(int(text.split("-")[1])))
+        rows[hash] = embedding
+
+
+def test_embed_documents_reads_table_in_bulk(mock_backends):
+    db, redis, rows = mock_backends
+    texts = [f"chunk-{i}" for i in range(1200)]
+    _store_rows(rows, texts)
+    call_log: list[list[str]] = []
+
+    result = CacheEmbedding(_model_instance(call_log)).embed_documents(texts)
+
+    assert result[7] == pytest.approx(_vector(7))
+    assert call_log == []
+    # the per-row path issued one query per text, the batched path one per EMBEDDING_CACHE_BATCH_SIZE hashes
+    assert db.session.query.return_value.filter.return_value.all.call_count == 3
+    assert embedding_cache_stats.database_hits == 1200
+
+
+def test_embed_documents_serves_repeated_texts_from_memory(mock_backends):
+    db, redis, rows = mock_backends
+    texts = [f"chunk-{i}" for i in range(10)]
+    call_log: list[list[str]] = []
+    cache_embedding = CacheEmbedding(_model_instance(call_log))
+
+    first = cache_embedding.embed_documents(texts)
+    second = cache_embedding.embed_documents(texts)
+
+    assert len(call_log) == 10
+    assert second[4] == pytest.approx(first[4])
+    # one bulk upsert for the misses of the first call, no table access for the second call
+    assert db.session.execute.call_count == 1
+    assert db.session.query.return_value.filter.return_value.all.call_count == 1
+    assert embedding_cache_stats.misses == 10
+    assert embedding_cache_stats.memory_hits == 10
+    assert embedding_cache_stats.hit_rate == 0.5
+
+
+def test_embed_documents_promotes_redis_hits(mock_backends):
+    db, redis, rows = mock_backends
+    cached_vector = np.array(_vector(3))
+    redis.mget.side_effect = lambda keys: [cached_embedding.base64.b64encode(cached_vector.tobytes())] * len(keys)
+    call_log: list[list[str]] = []
+
+    result = CacheEmbedding(_model_instance(call_log)).embed_documents(["chunk-3"])
+
+    assert result[0] == pytest.approx(_vector(3))
+    assert call_log == []
+    db.session.query.assert_not_called()
+    assert embedding_cache_stats.redis_hits == 1
@@ -0,0 +1,65 @@
+import base64
+import pickle
+
+import numpy as np
+import pytest
+
+from core.rag.embedding.cached_embedding import _decode_cached_vector
+from core.rag.embedding.embedding_codec import decode_embedding, encode_embedding, is_compact_embedding
+from models.dataset import Embedding
+
+
+def _vector(dimension: int = 1536) -> list[float]:
+    vector = np.random.default_rng(0).standard_normal(dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@pytest.mark.parametrize(("dtype", "tolerance"), [("float32", 1e-7), ("float16", 1e-3)])
+def test_encode_decode_roundtrip(dtype, tolerance):
+    vector = _vector()
+
+    data = encode_embedding(vector, dtype)
+    decoded = decode_embedding(data)
+
+    assert is_compact_embedding(data)
+    assert decoded.shape == (1536,)
+    assert np.allclose(decoded, vector, atol=tolerance)
+
+
+def test_compact_format_is_smaller_than_legacy_formats():
+    vector = _vector()
+    legacy_pickle = pickle.dumps(vector, protocol=pickle.HIGHEST_PROTOCOL)
+    legacy_redis = base64.b64encode(np.array(vector).tobytes())
+
+    assert len(encode_embedding(vector, "float32")) * 2 < len(legacy_pickle)
+    assert len(encode_embedding(vector, "float32")) * 2 < len(legacy_redis)
+    assert len(encode_embedding(vector, "float16")) * 4 < len(legacy_redis)
+
+
+def test_legacy_values_are_not_detected_as_compact():
+    vector = _vector(8)
+
+    assert not is_compact_embedding(pickle.dumps(vector, protocol=pickle.HIGHEST_PROTOCOL))
+    assert not is_compact_embedding(base64.b64encode(np.array(vector).tobytes()))
+    with pytest.raises(ValueError):
+        decode_embedding(pickle.dumps(vector))
+
+
+def test_embedding_model_reads_legacy_and_compact_rows():
+    vector = _vector(8)
+    legacy = Embedding(model_name="m", hash="h", provider_name="p")
+    legacy.embedding = pickle.dumps(vector, protocol=pickle.HIGHEST_PROTOCOL)
+    compact = Embedding(model_name="m", hash="h", provider_name="p")
+    compact.set_embedding(vector)
+
+    assert legacy.get_embedding() == vector
+    assert compact.get_embedding() == pytest.approx(vector)
+    assert is_compact_embedding(compact.embedding)
+    assert np.allclose(legacy.get_embedding_array(), compact.get_embedding_array())
+
+
+def test_redis_values_decode_in_both_formats():
+    vector = _vector(8)
+
+    assert np.allclose(_decode_cached_vector(base64.b64encode(np.array(vector).tobytes())), vector)
+    assert np.allclose(_decode_cached_vector(encode_embedding(vector)), vector)
@@ -0,0 +1,77 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from core.rag.models.document import Document
+from core.rag.retrieval.dataset_retrieval import DatasetRetrieval
+from models.dataset import Dataset
+
+
+def _dataset(dataset_id: str, embedding_model: str, tenant_id: str = "tenant") -> Dataset:
+    return Dataset(
+        id=dataset_id,
+        tenant_id=tenant_id,
+        provider="vendor",
+        indexing_technique="high_quality",
+        embedding_model_provider="openai",
+        embedding_model=embedding_model,
+    )
+
+
+def test_multiple_retrieve_embeds_query_once_per_embedding_model(app: Flask):
+    datasets = [
+        _dataset("dataset-1", "text-embedding-3-small"),
+        _dataset("dataset-2", "text-embedding-3-small"),
+        _dataset("dataset-3", "text-embedding-3-small"),
+        _dataset("dataset-4", "text-embedding-3-large"),
+    ]
+    query_vectors = {"text-embedding-3-small": [0.1, 0.2], "text-embedding-3-large": [0.3, 0.4]}
+    embedded_models = []
+    retrieval_threads = set()
+    searched_vectors = {}
+
+    def embed_query(flask_app, tenant_id, provider, model, query):
+        embedded_models.append(model)
+        return query_vectors[model]
+
+    def retrieve(dataset_id, query_vector, **kwargs):
+        retrieval_threads.add(threading.current_thread().name)
+        searched_vectors[dataset_id] = query_vector
+        return [Document(page_content=dataset_id, metadata={"score": 0.5}, provider="dify")]
+
+    datasets_by_id = {dataset.id: dataset for dataset in datasets}
+    db = MagicMock()
+    db.session.query.return_value.filter.side_effect = lambda condition: MagicMock(
+        first=MagicMock(return_value=datasets_by_id[condition.right.value])
+    )
+    with (
+        app.app_context(),
+        patch("core.rag.retrieval.dataset_retrieval.db", db),
+        patch.object(DatasetRetrieval, "_embed_query", side_effect=embed_query),
+        patch("core.rag.retrieval.dataset_retrieval.RetrievalService.retrieve", side_effect=retrieve),
+        patch.object(DatasetRetrieval, "_on_query"),
+        patch.object(DatasetRetrieval, "_on_retrieval_end"),
+    ):
+        documents = DatasetRetrieval().multiple_retrieve(
+            app_id="app",
+            tenant_id="tenant",
+            user_id="user",
+            user_from="account",
+            available_datasets=datasets,
+            query="query",
+            top_k=4,
+            score_threshold=0.0,
+            reranking_mode="reranking_model",
+            reranking_enable=False,
+        )
+
+    assert sorted(embedded_models) == ["text-embedding-3-large", "text-embedding-3-small"]
+    assert searched_vectors == {
+        "dataset-1": [0.1, 0.2],
+        "dataset-2": [0.1, 0.2],
+        "dataset-3": [0.1, 0.2],
+        "dataset-4": [0.3, 0.4],
+    }
+    assert len(documents) == 4
+    assert all(name.startswith("DatasetRetrieval") for name in retrieval_threads)
@@ -0,0 +1,204 @@
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from redis.exceptions import ResponseError
+
+from core.rag.models.document import Document
+from core.rag.retrieval.retrieval_log_buffer import RetrievalLogBuffer
+from models.dataset import DatasetQuery
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._commands.append((name, args, kwargs))
+
+    def execute(self):
+        with self._redis.mutex:
+            return [getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._commands]
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.mutex = threading.RLock()
+        self.hashes: defaultdict[str, Counter] = defaultdict(Counter)
+        self.lists: defaultdict[str, list] = defaultdict(list)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def hincrby(self, key, field, amount=1):
+        with self.mutex:
+            self.hashes[key][field.encode()] += amount
+            return self.hashes[key][field.encode()]
+
+    def hgetall(self, key):
+        return {field: str(count).encode() for field, count in self.hashes.get(key, {}).items()}
+
+    def exists(self, key):
+        return int(key in self.hashes or bool(self.lists.get(key)))
+
+    def hdel(self, key, *fields):
+        with self.mutex:
+            for field in fields:
+                self.hashes[key].pop(field.encode(), None)
+
+    def lock(self, name, timeout=None):
+        return MagicMock(acquire=MagicMock(return_value=True))
+
+    def rename(self, key, new_key):
+        with self.mutex:
+            if key not in self.hashes:
+                raise ResponseError("no such key")
+            self.hashes[new_key] = self.hashes.pop(key)
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+        self.lists.pop(key, None)
+
+    def rpush(self, key, *values):
+        with self.mutex:
+            self.lists[key].extend(value.encode() for value in values)
+
+    def lrange(self, key, start, end):
+        return self.lists[key][start : None if end == -1 else end + 1]
+
+    def lmove(self, source, destination, source_side, destination_side):
+        with self.mutex:
+            if not self.lists.get(source):
+                return None
+            value = self.lists[source].pop(0)
+            self.lists[destination].append(value)
+            return value
+
+
+@pytest.fixture
+def write_behind():
+    redis = _FakeRedis()
+    with (
+        patch("core.rag.retrieval.retrieval_log_buffer.redis_client", new=redis),
+        patch("core.rag.retrieval.retrieval_log_buffer.dify_config.RETRIEVAL_LOG_WRITE_BEHIND_ENABLED", True),
+    ):
+        yield redis
+
+
+def _documents(count: int) -> list[Document]:
+    return [
+        Document(page_content="", metadata={"doc_id": f"node-{i}", "dataset_id": "dataset-1"}, provider="dify")
+        for i in range(count)
+    ]
+
+
+def test_buffered_queries_are_flushed_in_batches(write_behind):
+    db = MagicMock()
+    with patch("core.rag.retrieval.retrieval_log_buffer.db", db):
+        RetrievalLogBuffer.record_dataset_queries(
+            [
+                DatasetQuery(
+                    dataset_id=f"dataset-{i}",
+                    content="query",
+                    source="app",
+                    source_app_id="app",
+                    created_by_role="end_user",
+                    created_by="user",
+                )
+                for i in range(3)
+            ]
+        )
+        db.session.add_all.assert_not_called()
+
+        assert RetrievalLogBuffer.flush(batch_size=2) == (0, 3)
+
+    assert db.session.commit.call_count == 2
+    dataset_queries = [query for call in db.session.add_all.call_args_list for query in call.args[0]]
+    assert [query.dataset_id for query in dataset_queries] == ["dataset-0", "dataset-1", "dataset-2"]
+    assert all(query.created_at is not None for query in dataset_queries)
+    assert not write_behind.lists[RetrievalLogBuffer.DATASET_QUERIES_KEY]
+
+
+def _dataset_queries(count: int) -> list[DatasetQuery]:
+    return [
+        DatasetQuery(
+            dataset_id=f"dataset-{i}",
+            content="query",
+            source="app",
+            source_app_id="app",
+            created_by_role="end_user",
+            created_by="user",
+        )
+        for i in range(count)
+    ]
+
+
+def test_queries_of_a_failed_flush_are_flushed_again(write_behind):
+    db = MagicMock()
+    db.session.commit.side_effect = [ConnectionError("database unavailable"), None, None]
+    with patch("core.rag.retrieval.retrieval_log_buffer.db", db):
+        RetrievalLogBuffer.record_dataset_queries(_dataset_queries(3))
+        with pytest.raises(ConnectionError):
+            RetrievalLogBuffer.flush(batch_size=2)
+        RetrievalLogBuffer.record_dataset_queries(_dataset_queries(1))
+
+        assert RetrievalLogBuffer.flush(batch_size=2) == (0, 4)
+
+    batches = [[query.dataset_id for query in call.args[0]] for call in db.session.add_all.call_args_list]
+    assert batches == [["dataset-0", "dataset-1"], ["dataset-0", "dataset-1"], ["dataset-2", "dataset-0"]]
+    assert not write_behind.lists[RetrievalLogBuffer.DATASET_QUERIES_KEY]
+    assert not write_behind.lists[RetrievalLogBuffer.FLUSHING_DATASET_QUERIES_KEY]
+
+
+def test_hits_of_a_failed_flush_are_flushed_again(write_behind):
+    db = MagicMock()
+    db.session.commit.side_effect = [None, ConnectionError("database unavailable"), None, None]
+    updates = db.session.query.return_value.filter.return_value.filter.return_value.update
+    with patch("core.rag.retrieval.retrieval_log_buffer.db", db):
+        RetrievalLogBuffer.record_segment_hits(_documents(2))
+        RetrievalLogBuffer.record_segment_hits(_documents(1))
+        with pytest.raises(ConnectionError):
+            RetrievalLogBuffer.flush()
+        RetrievalLogBuffer.record_segment_hits(_documents(1))
+
+        # the committed update is not applied again, the hits recorded meanwhile are flushed next
+        assert RetrievalLogBuffer.flush() == (1, 0)
+        assert RetrievalLogBuffer.flush() == (1, 0)
+
+    increments = [call.args[0][next(iter(call.args[0]))].right.value for call in updates.call_args_list]
+    assert increments == [2, 1, 1, 1]
+    assert not write_behind.hashes
+
+
+def test_concurrent_retrievals_of_the_same_segments(write_behind):
+    db = MagicMock()
+
+    def retrieve(_):
+        RetrievalLogBuffer.record_segment_hits(_documents(10))
+
+    with patch("core.rag.retrieval.retrieval_log_buffer.db", db), ThreadPoolExecutor(max_workers=20) as executor:
+        list(executor.map(retrieve, range(200)))
+        db.session.query.assert_not_called()
+
+        with patch("core.rag.retrieval.retrieval_log_buffer.dify_config.RETRIEVAL_LOG_WRITE_BEHIND_ENABLED", False):
+            list(executor.map(retrieve, range(200)))
+        # one update and commit per synchronous retrieval
+        assert db.session.commit.call_count == 200
+
+        flushed_hits = []
+        with patch.object(
+            RetrievalLogBuffer,
+            "_update_hit_count",
+            side_effect=lambda dataset_id, count, index_node_ids: flushed_hits.append(
+                (dataset_id, count, sorted(index_node_ids))
+            ),
+        ):
+            assert RetrievalLogBuffer.flush() == (10, 0)
+            assert RetrievalLogBuffer.flush() == (0, 0)
+
+    # the hits of all the buffered retrievals are written with one update
+    assert flushed_hits == [("dataset-1", 200, sorted(f"node-{i}" for i in range(10)))]
+    assert not write_behind.hashes
@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from flask import Flask
+
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.workflow.entities.node_entities import NodeRunResult
+from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.enums import SystemVariableKey
+from core.workflow.graph_engine.entities.event import GraphRunSucceededEvent, ParallelBranchRunSucceededEvent
+from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.executor import GraphEngineExecutor, GraphEngineThreadPool
+from core.workflow.graph_engine.graph_engine import GraphEngine
+from core.workflow.nodes.event import RunCompletedEvent
+from core.workflow.nodes.llm.node import LLMNode
+from models.enums import UserFrom
+from models.workflow import WorkflowNodeExecutionStatus, WorkflowType
+
+
+def test_executor_enforces_run_tenant_and_global_limits():
+    executor = GraphEngineExecutor(max_workers=3, max_workers_per_tenant=2)
+    release = threading.Event()
+    tenant_a_run = GraphEngineThreadPool(max_workers=1, tenant_id="a", executor=executor)
+    tenant_a_run2 = GraphEngineThreadPool(max_workers=5, tenant_id="a", executor=executor)
+    tenant_b_run = GraphEngineThreadPool(max_workers=5, tenant_id="b", executor=executor)
+
+    futures = [
+        tenant_a_run.submit(release.wait),
+        tenant_a_run.submit(release.wait),  # over the run limit
+        tenant_a_run2.submit(release.wait),
+        tenant_a_run2.submit(release.wait),  # over the tenant limit
+        tenant_b_run.submit(release.wait),
+        tenant_b_run.submit(release.wait),  # over the global limit
+    ]
+
+    metrics = executor.metrics()
+    assert metrics["active_tasks"] == 3
+    assert metrics["queued_tasks"] == 3
+    assert metrics["active_tasks_by_tenant"] == {"a": 2, "b": 1}
+
+    release.set()
+    assert all(future.result(timeout=5) for future in futures)
+    assert executor.metrics()["active_tasks"] == 0
+    assert executor.metrics()["queued_tasks"] == 0
+
+
+def test_executor_runs_sub_tasks_inline_when_full():
+    executor = GraphEngineExecutor(max_workers=1, max_workers_per_tenant=1)
+    pool = GraphEngineThreadPool(max_workers=1, tenant_id="a", executor=executor)
+
+    def parent():
+        # the only thread is taken by this task, waiting for a queued sub task would never return
+        return pool.submit(lambda: threading.current_thread().name).result(timeout=5)
+
+    parent_thread_name = threading.current_thread().name
+    sub_task_thread_name = pool.submit(parent).result(timeout=5)
+    assert sub_task_thread_name.startswith("GraphEngine")
+    assert sub_task_thread_name != parent_thread_name
+
+
+def test_executor_skips_cancelled_queued_tasks():
+    executor = GraphEngineExecutor(max_workers=1, max_workers_per_tenant=1)
+    pool = GraphEngineThreadPool(max_workers=1, executor=executor)
+    release = threading.Event()
+    called = []
+
+    running = pool.submit(release.wait)
+    queued = pool.submit(called.append, 1)
+    assert queued.cancel()
+
+    release.set()
+    running.result(timeout=5)
+    assert executor.metrics()["queued_tasks"] == 0
+    assert not called
+
+
+def _parallel_graph_config() -> dict:
+    def llm_node(node_id: str) -> dict:
+        return {
+            "data": {
+                "type": "llm",
+                "title": node_id,
+                "context": {"enabled": False, "variable_selector": []},
+                "model": {"completion_params": {}, "mode": "chat", "name": "gpt-4o", "provider": "openai"},
+                "prompt_template": [{"role": "user", "text": "{{#start.query#}}"}],
+                "vision": {"configs": {"detail": "high", "variable_selector": []}, "enabled": False},
+            },
+            "id": node_id,
+        }
+
+    return {
+        "edges": [
+            {"id": "1", "source": "start", "target": "llm1"},
+            {"id": "2", "source": "start", "target": "llm2"},
+            {"id": "3", "source": "start", "target": "llm3"},
+            {"id": "4", "source": "llm1", "target": "end"},
+            {"id": "5", "source": "llm2", "target": "end"},
+            {"id": "6", "source": "llm3", "target": "end"},
+        ],
+        "nodes": [
+            {"data": {"type": "start", "title": "start", "variables": []}, "id": "start"},
+            llm_node("llm1"),
+            llm_node("llm2"),
+            llm_node("llm3"),
+            {"data": {"type": "end", "title": "end", "outputs": []}, "id": "end"},
+        ],
+    }
+
+
+@patch("extensions.ext_database.db.session.remove")
+@patch("extensions.ext_database.db.session.close")
+def test_concurrent_workflows_share_bounded_threads(mock_close, mock_remove, app: Flask):
+    graph_config = _parallel_graph_config()
+    graph = Graph.init(graph_config=graph_config)
+    executor = GraphEngineExecutor(max_workers=16, max_workers_per_tenant=8)
+    max_active_tasks = 0
+
+    def llm_run(self):
+        nonlocal max_active_tasks
+        max_active_tasks = max(max_active_tasks, executor.metrics()["active_tasks"])
+        time.sleep(0.005)
+        yield RunCompletedEvent(
+            run_result=NodeRunResult(status=WorkflowNodeExecutionStatus.SUCCEEDED, inputs={}, outputs={"text": "hi"})
+        )
+
+    def run_workflow(index: int) -> list:
+        with app.app_context():
+            graph_engine = GraphEngine(
+                tenant_id=f"tenant-{index % 4}",
+                app_id="app",
+                workflow_type=WorkflowType.WORKFLOW,
+                workflow_id="workflow",
+                graph_config=graph_config,
+                user_id="user",
+                user_from=UserFrom.ACCOUNT,
+                invoke_from=InvokeFrom.WEB_APP,
+                call_depth=0,
+                graph=graph,
+                variable_pool=VariablePool(
+                    system_variables={SystemVariableKey.FILES: [], SystemVariableKey.USER_ID: "user"},
+                    user_inputs={"query": "hi"},
+                ),
+                max_execution_steps=500,
+                max_execution_time=1200,
+            )
+            return list(graph_engine.run())
+
+    threads_before = threading.active_count()
+    with (
+        patch("core.workflow.graph_engine.executor.graph_engine_executor", executor),
+        patch.object(LLMNode, "_run", new=llm_run),
+        ThreadPoolExecutor(max_workers=200) as runs,
+    ):
+        results = list(runs.map(run_workflow, range(200)))
+
+    for events in results:
+        assert isinstance(events[-1], GraphRunSucceededEvent)
+        assert sum(isinstance(event, ParallelBranchRunSucceededEvent) for event in events) == 3
+
+    branch_threads = [thread for thread in threading.enumerate() if thread.name.startswith("GraphEngine")]
+    assert max_active_tasks <= 16
+    assert len(branch_threads) <= 16
+    assert executor.metrics() == {
+        "max_workers": 16,
+        "active_tasks": 0,
+        "queued_tasks": 0,
+        "active_tasks_by_tenant": {},
+    }
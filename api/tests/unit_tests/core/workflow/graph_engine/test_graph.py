@@ -1,6 +1,15 @@
-from core.workflow.graph_engine.entities.graph import Graph
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.app.apps.workflow_app_runner import WorkflowBasedAppRunner
+from core.workflow.graph_engine.entities.graph import CompiledGraph, CompiledGraphCache, Graph
 from core.workflow.graph_engine.entities.run_condition import RunCondition
 from core.workflow.utils.condition.entities import Condition
+from models.workflow import Workflow
 
 
 def test_init():
@@ -789,3 +798,128 @@ def test_parallels_graph6():
 
     for node_id in ["code1", "code2"]:
         assert graph.node_parallel_mapping[node_id] == child_parallel.id
+
+
+def _make_parallel_graph_config(branch_count: int, branch_length: int) -> dict:
+    nodes = [
+        {"data": {"type": "start"}, "id": "start"},
+        {"data": {"type": "end", "title": "end", "outputs": []}, "id": "end"},
+    ]
+    edges = []
+    for branch in range(branch_count):
+        previous_node_id = "start"
+        for step in range(branch_length):
+            node_id = f"llm-{branch}-{step}"
+            nodes.append({"data": {"type": "llm"}, "id": node_id})
+            edges.append({"id": f"{previous_node_id}-{node_id}", "source": previous_node_id, "target": node_id})
+            previous_node_id = node_id
+        edges.append({"id": f"{previous_node_id}-end", "source": previous_node_id, "target": "end"})
+    return {"nodes": nodes, "edges": edges}
+
+
+def test_compiled_graph_cache_compiles_once():
+    graph_config = _make_parallel_graph_config(branch_count=3, branch_length=2)
+    cache = CompiledGraphCache(capacity=2)
+    compile_count = 0
+
+    def compile_graph():
+        nonlocal compile_count
+        compile_count += 1
+        return CompiledGraph(graph_config=graph_config, graph=Graph.init(graph_config=graph_config))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        compiled_graphs = list(executor.map(lambda _: cache.get_or_compile("hash", compile_graph), range(32)))
+
+    assert compile_count == 1
+    assert all(compiled_graph is compiled_graphs[0] for compiled_graph in compiled_graphs)
+    assert compiled_graphs[0].graph.root_node_id == "start"
+    assert len(compiled_graphs[0].graph.parallel_mapping) == 1
+
+    # least recently used graphs are evicted
+    cache.get_or_compile("hash-2", compile_graph)
+    cache.get_or_compile("hash-3", compile_graph)
+    cache.get_or_compile("hash", compile_graph)
+    assert compile_count == 4
+
+
+def test_compiled_graph_reuses_sub_graphs():
+    graph_config = _make_parallel_graph_config(branch_count=2, branch_length=3)
+    # nodes of an iteration are not connected to the start node
+    graph_config["nodes"] += [
+        {"data": {"type": "llm", "iteration_id": "iteration"}, "id": "iteration-llm"},
+        {"data": {"type": "answer", "title": "answer", "answer": "1", "iteration_id": "iteration"}, "id": "answer"},
+    ]
+    graph_config["edges"].append({"id": "iteration-llm-answer", "source": "iteration-llm", "target": "answer"})
+    graph = Graph.init(graph_config=graph_config)
+    compiled_graph = CompiledGraph(graph_config=graph_config, graph=graph)
+
+    # iteration nodes get a copy of the config from their init params
+    sub_graph = graph.init_sub_graph(graph_config=dict(graph_config), root_node_id="iteration-llm")
+    assert sub_graph.node_ids == ["iteration-llm", "answer"]
+    assert graph.init_sub_graph(graph_config=graph_config, root_node_id="iteration-llm") is sub_graph
+    assert sub_graph.init_sub_graph(graph_config=graph_config, root_node_id="iteration-llm") is sub_graph
+    assert compiled_graph.get_graph("start") is graph
+
+    # graphs that are not compiled are initialized on every call
+    uncompiled_graph = Graph.init(graph_config=graph_config)
+    assert uncompiled_graph.init_sub_graph(graph_config=graph_config, root_node_id="iteration-llm") is not sub_graph
+
+
+def test_compiled_workflow_graph_startup_latency():
+    graph_config = _make_parallel_graph_config(branch_count=4, branch_length=25)
+    assert len(graph_config["nodes"]) == 102
+    workflow = Workflow(
+        tenant_id="tenant",
+        app_id="app",
+        type="workflow",
+        version="draft",
+        graph=json.dumps(graph_config),
+        features="{}",
+        created_by="account",
+        environment_variables=[],
+        conversation_variables=[],
+    )
+    runner = WorkflowBasedAppRunner(queue_manager=MagicMock())
+
+    with (
+        patch("core.app.apps.workflow_app_runner.compiled_graph_cache", CompiledGraphCache(capacity=8)),
+        patch("models.workflow.json.loads", wraps=json.loads) as json_loads,
+        patch.object(Graph, "init", wraps=Graph.init) as graph_init,
+    ):
+        compiled_graphs = [runner._get_compiled_graph(workflow) for _ in range(20)]
+
+    # the graph is parsed and analyzed once, later runs only hash the raw graph
+    assert json_loads.call_count == 1
+    assert graph_init.call_count == 1
+    assert all(compiled_graph is compiled_graphs[0] for compiled_graph in compiled_graphs)
+    assert compiled_graphs[0].graph.node_ids == Graph.init(graph_config=graph_config).node_ids
+
+
+@pytest.mark.parametrize(("capacity", "graph_hashes"), [(0, ["hash", "hash"]), (2, ["hash", "hash-2"])])
+def test_compiled_graph_cache_compiles_concurrently(capacity, graph_hashes):
+    graph_config = _make_parallel_graph_config(branch_count=1, branch_length=1)
+    cache = CompiledGraphCache(capacity=capacity)
+    # both compilations have to run at the same time to get past the barrier
+    barrier = threading.Barrier(len(graph_hashes), timeout=5)
+
+    def compile_graph():
+        barrier.wait()
+        return CompiledGraph(graph_config=graph_config, graph=Graph.init(graph_config=graph_config))
+
+    with ThreadPoolExecutor(max_workers=len(graph_hashes)) as executor:
+        compiled_graphs = list(
+            executor.map(lambda graph_hash: cache.get_or_compile(graph_hash, compile_graph), graph_hashes)
+        )
+
+    assert compiled_graphs[0] is not compiled_graphs[1]
+
+
+def test_compiled_graph_cache_compile_error():
+    cache = CompiledGraphCache(capacity=2)
+
+    with pytest.raises(ValueError):
+        cache.get_or_compile("hash", MagicMock(side_effect=ValueError("invalid graph")))
+
+    # a failed compilation is not cached
+    compiled_graph = MagicMock()
+    assert cache.get_or_compile("hash", lambda: compiled_graph) is compiled_graph
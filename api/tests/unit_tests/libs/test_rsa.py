@@ -1,7 +1,12 @@
+import base64
+from unittest.mock import MagicMock, patch
+
+import pytest
 import rsa as pyrsa
 from Crypto.PublicKey import RSA
 
-from libs import gmpy2_pkcs10aep_cipher
+from core.helper import encrypter
+from libs import gmpy2_pkcs10aep_cipher, rsa
 
 
 def test_gmpy2_pkcs10aep_cipher() -> None:
@@ -27,3 +32,99 @@ def test_gmpy2_pkcs10aep_cipher() -> None:
     encrypted_by_private_key = private_cipher_rsa.encrypt(message=raw_text_bytes)
     decrypted_by_private_key = private_cipher_rsa.decrypt(encrypted_by_private_key)
     assert decrypted_by_private_key == raw_text_bytes
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def incr(self, key):
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+
+@pytest.fixture
+def tenant_key():
+    storage = MagicMock()
+    storage.files = {}
+    storage.save.side_effect = storage.files.__setitem__
+    storage.load.side_effect = lambda filename: storage.files[filename]
+    rsa.private_key_cache.clear()
+    with (
+        patch.object(rsa, "storage", new=storage),
+        patch.object(rsa, "redis_client", new=_FakeRedis()),
+        patch.object(rsa.dify_config, "TENANT_KEY_CACHE_TTL", 120),
+    ):
+        yield rsa.generate_key_pair("tenant"), storage
+    rsa.private_key_cache.clear()
+
+
+def test_decrypt_decoding_cached(tenant_key):
+    public_key, storage = tenant_key
+    encrypted_token = rsa.encrypt("token", public_key)
+
+    with patch.object(rsa.RSA, "import_key", wraps=rsa.RSA.import_key) as import_key:
+        assert all(rsa.decrypt(encrypted_token, "tenant") == "token" for _ in range(10))
+
+    assert import_key.call_count == 1
+    assert storage.load.call_count == 1
+
+
+def test_session_key_memoized(tenant_key):
+    public_key, _ = tenant_key
+    encrypted_tokens = [rsa.encrypt(f"token-{index}", public_key) for index in range(3)]
+    rsa_key, cipher_rsa = rsa.get_decrypt_decoding("tenant")
+
+    with patch.object(cipher_rsa, "_cipher_rsa", wraps=cipher_rsa._cipher_rsa) as oaep_cipher:
+        for _ in range(5):
+            assert [
+                rsa.decrypt_token_with_decoding(encrypted_token, rsa_key, cipher_rsa)
+                for encrypted_token in encrypted_tokens
+            ] == ["token-0", "token-1", "token-2"]
+
+    assert oaep_cipher.decrypt.call_count == 3
+
+
+def test_decrypt_decoding_invalidated_by_key_rotation(tenant_key):
+    rsa.decrypt(rsa.encrypt("token", tenant_key[0]), "tenant")
+
+    public_key = rsa.generate_key_pair("tenant")
+
+    assert rsa.decrypt(rsa.encrypt("rotated token", public_key), "tenant") == "rotated token"
+
+
+def test_batch_decrypt_token_key_operations(tenant_key):
+    public_key, _ = tenant_key
+    tokens = [base64.b64encode(rsa.encrypt(f"token-{index}", public_key)).decode() for index in range(10)]
+    # like the credentials of the providers of a tenant, decrypted on every request
+    request_count = 20
+
+    def decrypt_requests() -> tuple[int, int]:
+        with (
+            patch.object(rsa.RSA, "import_key", wraps=rsa.RSA.import_key) as import_key,
+            patch.object(
+                gmpy2_pkcs10aep_cipher.PKCS1OAepCipher,
+                "decrypt",
+                autospec=True,
+                side_effect=gmpy2_pkcs10aep_cipher.PKCS1OAepCipher.decrypt,
+            ) as oaep_decrypt,
+        ):
+            for _ in range(request_count):
+                assert encrypter.batch_decrypt_token("tenant", tokens)[0] == "token-0"
+        return import_key.call_count, oaep_decrypt.call_count
+
+    with patch.object(rsa.dify_config, "TENANT_KEY_CACHE_TTL", 0):
+        # the private key is imported and every session key decrypted on each request
+        assert decrypt_requests() == (request_count, request_count * len(tokens))
+    # imported and decrypted once
+    assert decrypt_requests() == (1, len(tokens))
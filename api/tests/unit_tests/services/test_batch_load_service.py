@@ -0,0 +1,212 @@
+from datetime import datetime
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+from flask_restful import marshal  # type: ignore
+
+from controllers.console.app.message import ChatMessageListApi
+from controllers.service_api.app.message import MessageListApi as ServiceApiMessageListApi
+from controllers.web.message import MessageListApi as WebMessageListApi
+from fields.conversation_fields import conversation_pagination_fields, conversation_with_summary_pagination_fields
+from libs.infinite_scroll_pagination import InfiniteScrollPagination
+from models.account import Account
+from models.model import (
+    AppModelConfig,
+    Conversation,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageFeedback,
+)
+from models.workflow import WorkflowRunStatus
+from services.batch_load_service import BatchLoadService
+
+PAGE_SIZE = 50
+# one query per prefetched property, whatever the page size
+CONVERSATION_QUERY_BUDGET = 9
+MESSAGE_QUERY_BUDGET = 6
+
+
+class _FakeQuery:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __getattr__(self, name):
+        # filter, join, group_by, order_by... only narrow the rows of the real query
+        return lambda *args, **kwargs: self
+
+    def subquery(self):
+        return MagicMock()
+
+    def all(self):
+        return self._rows
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+    def count(self):
+        return len(self._rows)
+
+
+class _FakeSession:
+    """Counts queries and answers them with the rows registered for their first entity."""
+
+    def __init__(self, rows: dict):
+        self.rows = rows
+        self.query_count = 0
+
+    def query(self, *entities):
+        self.query_count += 1
+        key = entities[0] if isinstance(entities[0], type) else str(entities[0])
+        return _FakeQuery(self.rows.get(key, []))
+
+
+def _conversations():
+    created_at = datetime(2024, 1, 1)
+    conversations = []
+    for index in range(PAGE_SIZE):
+        conversations.append(
+            Conversation(
+                id=f"conversation-{index}",
+                mode="chat",
+                app_model_config_id="config-1",
+                from_account_id="account-1",
+                from_end_user_id="end-user-1" if index % 2 else None,
+                created_at=created_at,
+                updated_at=created_at,
+            )
+        )
+    return conversations
+
+
+def _messages():
+    return [
+        Message(
+            id=f"message-{index}",
+            conversation_id="conversation-1",
+            query="query",
+            answer="answer",
+            _inputs={},
+            created_at=datetime(2024, 1, 1),
+        )
+        for index in range(PAGE_SIZE)
+    ]
+
+
+@pytest.fixture
+def conversation_session():
+    return _FakeSession(
+        {
+            "Message.conversation_id": [
+                ("conversation-0", WorkflowRunStatus.SUCCEEDED, 2),
+                ("conversation-0", None, 1),
+                ("conversation-1", WorkflowRunStatus.FAILED, 1),
+            ],
+            "messages.id": [],
+            Message: [Message(id="message-0", conversation_id="conversation-0", query="first query", _inputs={})],
+            "EndUser.id": [("end-user-1", "session-1")],
+            "MessageFeedback.conversation_id": [("conversation-0", "user", "like", 3)],
+            MessageAnnotation: [
+                MessageAnnotation(id="annotation-0", conversation_id="conversation-0", account_id="account-1")
+            ],
+            Account: [Account(id="account-1", name="Dify")],
+            AppModelConfig: [AppModelConfig(id="config-1", app_id="app-1")],
+        }
+    )
+
+
+@pytest.fixture
+def message_session():
+    return _FakeSession(
+        {
+            MessageFeedback: [
+                MessageFeedback(message_id="message-0", from_source="user", rating="like"),
+                MessageFeedback(
+                    message_id="message-0", from_source="admin", rating="dislike", from_account_id="account-1"
+                ),
+            ],
+            MessageAnnotation: [MessageAnnotation(id="annotation-0", message_id="message-1", account_id="account-1")],
+            MessageAgentThought: [
+                MessageAgentThought(message_id="message-0", position=1),
+                MessageAgentThought(message_id="message-0", position=2),
+            ],
+            Account: [Account(id="account-1", name="Dify")],
+        }
+    )
+
+
+def _load_and_marshal_conversations(session, fields):
+    conversations = _conversations()
+    pagination = MagicMock(items=conversations, page=1, per_page=PAGE_SIZE, total=PAGE_SIZE, has_next=False)
+    with (
+        patch("services.batch_load_service.db.session", new=session),
+        patch("models.model.db.session", new=session),
+    ):
+        BatchLoadService.load_conversations(conversations)
+        return marshal(pagination, fields)
+
+
+def test_console_completion_conversations_query_budget(conversation_session):
+    result = _load_and_marshal_conversations(conversation_session, conversation_pagination_fields)
+
+    assert conversation_session.query_count <= CONVERSATION_QUERY_BUDGET
+    first = result["data"][0]
+    assert first["from_account_name"] == "Dify"
+    assert (first["from_end_user_session_id"], result["data"][1]["from_end_user_session_id"]) == (None, "session-1")
+    assert first["annotation"]["id"] == "annotation-0"
+    assert first["user_feedback_stats"] == {"like": 3, "dislike": 0}
+    assert first["message"]["query"] == "first query"
+    assert result["data"][1]["annotation"] is None
+
+
+def test_console_chat_conversations_query_budget(conversation_session):
+    result = _load_and_marshal_conversations(conversation_session, conversation_with_summary_pagination_fields)
+
+    assert conversation_session.query_count <= CONVERSATION_QUERY_BUDGET
+    first, second, third = result["data"][:3]
+    assert (first["message_count"], first["annotated"], first["summary"]) == (3, True, "first query")
+    assert first["status_count"] == {"success": 2, "failed": 0, "partial_success": 0}
+    assert second["status_count"] == {"success": 0, "failed": 1, "partial_success": 0}
+    assert (third["message_count"], third["annotated"]) == (0, False)
+    assert third["status_count"] == {"success": 0, "failed": 0, "partial_success": 0}
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        ChatMessageListApi.message_infinite_scroll_pagination_fields,
+        ServiceApiMessageListApi.message_infinite_scroll_pagination_fields,
+        WebMessageListApi.message_infinite_scroll_pagination_fields,
+    ],
+    ids=["console", "service_api", "web"],
+)
+def test_message_list_query_budget(message_session, fields):
+    messages = _messages()
+    with (
+        patch("services.batch_load_service.db.session", new=message_session),
+        patch("models.model.db.session", new=message_session),
+        # files are built from their upload files, that is not part of the prefetched properties
+        patch.object(Message, "message_files", new_callable=PropertyMock, return_value=[]),
+    ):
+        BatchLoadService.load_messages(messages)
+        result = marshal(InfiniteScrollPagination(data=messages, limit=PAGE_SIZE, has_more=False), fields)
+
+    assert message_session.query_count <= MESSAGE_QUERY_BUDGET
+    first, second = result["data"][:2]
+    assert [agent_thought["position"] for agent_thought in first["agent_thoughts"]] == [1, 2]
+    if "feedbacks" in first:
+        assert [feedback["rating"] for feedback in first["feedbacks"]] == ["like", "dislike"]
+        assert first["feedbacks"][1]["from_account"]["name"] == "Dify"
+        assert second["annotation"]["account"]["name"] == "Dify"
+    else:
+        assert first["feedback"] == {"rating": "like"}
+        assert second["feedback"] is None
+
+
+def test_properties_query_without_prefetch(message_session):
+    message = _messages()[0]
+    with patch("models.model.db.session", new=message_session):
+        assert [feedback.rating for feedback in message.feedbacks] == ["like", "dislike"]
+        assert len(message.agent_thoughts) == 2
+
+    assert message_session.query_count == 2
@@ -0,0 +1,38 @@
+from unittest.mock import MagicMock, patch
+
+from services.dataset_service import SegmentService
+
+
+@patch("services.dataset_service.enable_segments_to_index_task")
+@patch("services.dataset_service.db")
+@patch("services.dataset_service.DatasetAvailableCountCache")
+def test_enabling_segments_deletes_available_counts(mock_count_cache, mock_db, mock_task):
+    segment = MagicMock(id="segment-1", enabled=False)
+    mock_db.session.query.return_value.filter.return_value.all.return_value = [segment]
+    document = MagicMock(id="document-1")
+
+    with patch("services.dataset_service.redis_client", new=MagicMock(get=MagicMock(return_value=None))):
+        SegmentService.update_segments_status(["segment-1"], "enable", MagicMock(id="dataset-1"), document)
+
+    assert segment.enabled
+    mock_count_cache.assert_called_once_with("dataset-1")
+    mock_count_cache.return_value.delete.assert_called_once()
+    mock_task.delay.assert_called_once_with(["segment-1"], "dataset-1", "document-1")
+
+
+@patch("services.dataset_service.VectorService")
+@patch("services.dataset_service.db")
+@patch("services.dataset_service.current_user")
+@patch("services.dataset_service.DatasetAvailableCountCache")
+def test_creating_a_segment_deletes_available_counts(mock_count_cache, mock_current_user, mock_db, mock_vector_service):
+    mock_db.session.query.return_value.filter.return_value.scalar.return_value = 3
+    document = MagicMock(id="document-1", dataset_id="dataset-1", doc_form="text_model", word_count=0)
+
+    with patch("services.dataset_service.redis_client", new=MagicMock()):
+        SegmentService.create_segment(
+            {"content": "content", "keywords": None}, document, MagicMock(indexing_technique="economy")
+        )
+
+    mock_vector_service.create_segments_vector.assert_called_once()
+    mock_count_cache.assert_called_once_with("dataset-1")
+    mock_count_cache.return_value.delete.assert_called_once()
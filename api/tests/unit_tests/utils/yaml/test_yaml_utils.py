@@ -1,9 +1,12 @@
+from pathlib import Path
 from textwrap import dedent
+from unittest.mock import patch
 
 import pytest
 from yaml import YAMLError  # type: ignore
 
-from core.tools.utils.yaml_utils import load_yaml_file
+from core.tools.utils import yaml_utils
+from core.tools.utils.yaml_utils import build_yaml_bundle, load_yaml_file
 
 EXAMPLE_YAML_FILE = "example_yaml.yaml"
 INVALID_YAML_FILE = "invalid_yaml.yaml"
@@ -81,3 +84,49 @@ def test_load_invalid_yaml_file(prepare_invalid_yaml_file):
 
     # ignore error
     assert load_yaml_file(file_path=prepare_invalid_yaml_file) == {}
+
+
+@pytest.fixture
+def yaml_bundle(tmp_path, monkeypatch):
+    monkeypatch.setattr(yaml_utils, "YAML_BUNDLE_ROOT", tmp_path)
+    monkeypatch.setattr(yaml_utils, "YAML_BUNDLE_PATH", tmp_path / ".yaml_bundle.pickle")
+    yaml_utils._load_yaml_bundle.cache_clear()
+    yield tmp_path / ".yaml_bundle.pickle"
+    yaml_utils._load_yaml_bundle.cache_clear()
+
+
+def test_load_yaml_file_from_bundle(prepare_example_yaml_file, prepare_invalid_yaml_file, yaml_bundle):
+    assert build_yaml_bundle(source_dir=yaml_bundle.parent) == 1
+
+    # yaml is shared with other threads of the process, only the parses of the file are checked
+    example_content = Path(prepare_example_yaml_file).read_text()
+    with patch("core.tools.utils.yaml_utils.yaml.safe_load", wraps=yaml_utils.yaml.safe_load) as safe_load:
+        yaml_data = load_yaml_file(file_path=prepare_example_yaml_file)
+        yaml_data["age"] = 31
+        assert load_yaml_file(file_path=prepare_example_yaml_file)["age"] == 30
+    assert not [call for call in safe_load.call_args_list if call.args == (example_content,)]
+
+    # invalid files are not bundled, changed files are parsed again
+    with pytest.raises(YAMLError):
+        load_yaml_file(file_path=prepare_invalid_yaml_file, ignore_error=False)
+    Path(prepare_example_yaml_file).write_text("age: 32\n")
+    assert load_yaml_file(file_path=prepare_example_yaml_file) == {"age": 32}
+
+
+def test_yaml_bundle_serves_provider_files(yaml_bundle, monkeypatch):
+    # the YAML files of a model provider, read when a worker starts
+    api_dir = Path(__file__).resolve().parents[4]
+    provider_dir = api_dir / "core" / "model_runtime" / "model_providers" / "bedrock"
+    yaml_paths = [str(path) for path in sorted(provider_dir.rglob("*.yaml"))]
+    monkeypatch.setattr(yaml_utils, "YAML_BUNDLE_ROOT", api_dir)
+    parsed = [load_yaml_file(file_path=yaml_path) for yaml_path in yaml_paths]
+
+    assert build_yaml_bundle(source_dir=provider_dir) == len(yaml_paths)
+    yaml_utils._load_yaml_bundle.cache_clear()
+    contents = {Path(yaml_path).read_text() for yaml_path in yaml_paths}
+    with patch("core.tools.utils.yaml_utils.yaml.safe_load", wraps=yaml_utils.yaml.safe_load) as safe_load:
+        bundled = [load_yaml_file(file_path=yaml_path) for yaml_path in yaml_paths]
+
+    assert bundled == parsed
+    # every file is read from the bundle, none is parsed again
+    assert not [call for call in safe_load.call_args_list if call.args and call.args[0] in contents]